@@ -0,0 +1,65 @@
+"""
+Times the BSP compiler and its queries on random wall layouts.
+
+Run from the repository root:
+    python -m benchmarks.bsp_benchmark
+"""
+
+import sys
+import time
+import numpy as np
+from world.bsp import build_bsp
+
+SIZES = (32, 64, 128)
+WALL_DENSITY = 0.25
+QUERIES = 2000
+
+
+def random_map(size, rng):
+    """(X, Y, Z) voxels with random wall-layer blocks and a closed border"""
+    voxels = np.zeros((size, 3, size), dtype=np.int32)
+    voxels[:, 0, :] = rng.random((size, size)) < WALL_DENSITY
+    voxels[0, 0, :] = voxels[-1, 0, :] = voxels[:, 0, 0] = voxels[:, 0, -1] = 1
+    return voxels
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes=SIZES):
+    rng = np.random.default_rng(0)
+    print(f"{'map':>8} {'segs':>6} {'nodes':>6} {'depth':>5} {'build ms':>9} "
+          f"{'f2b ms':>7} {'order ms':>8} {'point us':>8} {'trace us':>8}")
+    for size in sizes:
+        voxels = random_map(size, rng)
+        tree, build_time = timed(build_bsp, voxels)
+        eyes = rng.random((QUERIES, 2)) * size
+        ends = rng.random((QUERIES, 2)) * size
+
+        start = time.perf_counter()
+        for x, z in eyes[:100]:
+            tree.front_to_back(x, z)
+        traversal = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for x, z in eyes[:100]:
+            tree.segment_order(x, z)
+        ordering = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for x, z in eyes:
+            tree.point_contents(x, z)
+        point = (time.perf_counter() - start) / QUERIES
+        start = time.perf_counter()
+        for (x0, z0), (x1, z1) in zip(eyes, ends):
+            tree.trace(x0, z0, x1, z1)
+        trace = (time.perf_counter() - start) / QUERIES
+
+        print(f"{size:>4}x{size:<3} {len(tree.segments):>6} {len(tree.nodes):>6} {tree.depth():>5} "
+              f"{build_time * 1e3:>9.1f} {traversal * 1e3:>7.2f} {ordering * 1e3:>8.2f} "
+              f"{point * 1e6:>8.1f} {trace * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or SIZES)
@@ -0,0 +1,102 @@
+"""
+Times mesh picking three ways: the per-triangle Vector3 loop
+RayIntersectionHandler used to run, one NumPy Möller–Trumbore over every
+triangle, and the SAH BVH in rendering/bvh.py (with its one-off build).
+No GL context needed.
+
+Run from the repository root:
+    python -m benchmarks.bvh_benchmark [triangles ...]
+"""
+
+import sys
+import time
+import numpy as np
+from pyrr import Vector3
+from benchmarks.software_raster_benchmark import SphereMesh
+from rendering.bvh import MeshBVH
+
+COUNTS = (1000, 10000, 100000)
+RAYS = 200
+LOOP_RAYS = 3  # the per-triangle loop takes seconds per ray on big meshes
+
+
+def python_pick(vertices, indices, origin, direction):
+    """Nearest hit distance the way the old handler found it: Vector3s per triangle"""
+    nearest = None
+    origin, direction = Vector3(origin), Vector3(direction)
+    for i in range(0, len(indices), 3):
+        v0 = Vector3(vertices[indices[i] * 3:indices[i] * 3 + 3])
+        v1 = Vector3(vertices[indices[i + 1] * 3:indices[i + 1] * 3 + 3])
+        v2 = Vector3(vertices[indices[i + 2] * 3:indices[i + 2] * 3 + 3])
+        edge1, edge2 = v1 - v0, v2 - v0
+        h = direction.cross(edge2)
+        a = edge1.dot(h)
+        if abs(a) < 1e-6:
+            continue
+        f = 1.0 / a
+        s = origin - v0
+        u = f * s.dot(h)
+        if u < 0.0 or u > 1.0:
+            continue
+        q = s.cross(edge1)
+        v = f * direction.dot(q)
+        if v < 0.0 or u + v > 1.0:
+            continue
+        t = f * edge2.dot(q)
+        if t > 1e-6 and (nearest is None or t < nearest):
+            nearest = t
+    return nearest
+
+
+def random_rays(count, rng):
+    """Rays from a shell around the unit sphere aimed near its centre; most hit"""
+    origins = rng.normal(size=(count, 3))
+    origins *= 3.0 / np.linalg.norm(origins, axis=1, keepdims=True)
+    directions = rng.normal(scale=0.3, size=(count, 3)) - origins
+    return origins, directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+
+def bumpy_sphere(triangles, rng):
+    """SphereMesh with jittered vertices, so the surface is not one smooth shape"""
+    mesh = SphereMesh(triangles)
+    vertices = np.asarray(mesh.vertices).reshape(-1, 3)
+    mesh.vertices = (vertices + rng.normal(scale=0.02, size=vertices.shape)).reshape(-1).tolist()
+    return mesh
+
+
+def main(counts=COUNTS):
+    rng = np.random.default_rng(0)
+    print(f"{'triangles':>9} {'loop ms':>9} {'numpy us':>9} {'build ms':>8} {'bvh us':>7} {'nodes':>6} {'match':>5}")
+    for count in counts:
+        mesh = bumpy_sphere(count, rng)
+        origins, directions = random_rays(RAYS, rng)
+
+        start = time.perf_counter()
+        bvh = MeshBVH(mesh.vertices, mesh.indices)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = [bvh.intersect(o, d) for o, d in zip(origins, directions)]
+        bvh_time = (time.perf_counter() - start) / RAYS
+
+        # Every stored triangle in one batch, the brute-force NumPy answer
+        triangles = len(bvh.v0)
+        start = time.perf_counter()
+        brute = [bvh.intersect_triangles(0, triangles, o, d, np.inf) for o, d in zip(origins, directions)]
+        numpy_time = (time.perf_counter() - start) / RAYS
+
+        start = time.perf_counter()
+        loop = [python_pick(mesh.vertices, mesh.indices, o, d)
+                for o, d in zip(origins[:LOOP_RAYS], directions[:LOOP_RAYS])]
+        loop_time = (time.perf_counter() - start) / LOOP_RAYS
+
+        match = all((a is None and b is None) or (a is not None and b is not None and abs(a[0] - b[0]) < 1e-9)
+                    for a, b in zip(hits, brute))
+        match = match and all((a is None and b is None) or (a is not None and b is not None and abs(a[0] - b) < 1e-6)
+                              for a, b in zip(hits, loop))
+        print(f"{triangles:>9} {loop_time * 1e3:>9.1f} {numpy_time * 1e6:>9.0f} {build * 1e3:>8.0f} "
+              f"{bvh_time * 1e6:>7.0f} {len(bvh.node_first):>6} {'yes' if match else 'NO':>5}")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or COUNTS)
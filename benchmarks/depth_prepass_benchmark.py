@@ -0,0 +1,98 @@
+"""
+Times the PBR pass with and without the depth pre-pass on a synthetic scene
+of sphere layers drawn back to front (the worst case for overdraw), and
+reports the overdraw the "auto" heuristic measures. Needs a GL 3.3 context;
+one is made with a hidden GLFW window.
+
+Run from the repository root:
+    python -m benchmarks.depth_prepass_benchmark [layers ...]
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+import glfw
+from OpenGL.GL import *
+from pyrr import Matrix44, Vector3
+from benchmarks.gl_context import create_context
+from benchmarks.software_raster_benchmark import SphereMesh
+from rendering.rasteriser import Rasteriser
+from rendering.static_batcher import StaticBatcher
+from rendering.dynamic_resolution import SceneFramebuffer
+from rendering.lighting import Light
+from rendering.my_shaders import Material
+
+SIZE = (640, 360)
+LAYERS = (1, 4, 16)
+GRID = 6
+LIGHTS = 32
+FRAMES = 20
+
+
+def layered_scene(layers):
+    """GRID x GRID overlapping spheres per layer, layers stacked away from the camera"""
+    mesh = SphereMesh(800)
+    objects = []
+    for layer in reversed(range(layers)):
+        material = Material(base_color=(0.2 + 0.6 * layer / max(layers - 1, 1), 0.4, 0.6), roughness=0.35)
+        for i in range(GRID):
+            for j in range(GRID):
+                location = [(i - (GRID - 1) / 2) * 1.2, (j - (GRID - 1) / 2) * 0.7, -layer * 0.5]
+                objects.append(SimpleNamespace(mesh=mesh, static=False, location=location,
+                                               rotation=[0, 0, 0], scale=[1, 1, 1], material=material))
+    lights = [([(k % 8 - 3.5) * 1.5, (k // 8 - 1.5) * 1.2, 2.0], Light(color=(1.0, 0.9, 0.8), intensity=2.0, radius=6.0))
+              for k in range(LIGHTS)]
+    return objects, lights
+
+
+def time_frames(rasteriser, batcher, framebuffer, objects, view, projection, camera):
+    width, height = SIZE
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        rasteriser.begin_frame()
+        framebuffer.bind(width, height, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        rasteriser.draw_objects(objects, batcher, view, projection, camera)
+        glFinish()
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main(layer_counts=LAYERS):
+    width, height = SIZE
+    rasteriser = Rasteriser(hdr_output=True)
+    batcher = StaticBatcher(rasteriser.mesh_arena)
+    batcher.update([])
+    framebuffer = SceneFramebuffer()
+    framebuffer.allocate(width, height)
+    glEnable(GL_DEPTH_TEST)
+
+    camera = Vector3([0.0, 0.0, 6.0])
+    view = Matrix44.look_at(camera, Vector3([0.0, 0.0, 0.0]), Vector3([0.0, 1.0, 0.0]))
+    projection = Matrix44.perspective_projection(60.0, width / height, 0.1, 100.0)
+    prepass = rasteriser.depth_prepass
+
+    print(f"{'layers':>6} {'objects':>7} {'overdraw':>8} {'auto':>5} {'off ms':>7} {'on ms':>7} {'speedup':>7}")
+    for layers in layer_counts:
+        objects, lights = layered_scene(layers)
+        rasteriser.update_lights(lights, view, projection, width, height)
+
+        prepass.mode = "off"
+        time_frames(rasteriser, batcher, framebuffer, objects, view, projection, camera)
+        off = time_frames(rasteriser, batcher, framebuffer, objects, view, projection, camera)
+        prepass.mode = "on"
+        on = time_frames(rasteriser, batcher, framebuffer, objects, view, projection, camera)
+        prepass.mode = "auto"
+        prepass.controller.reset()
+        time_frames(rasteriser, batcher, framebuffer, objects, view, projection, camera)
+
+        print(f"{layers:>6} {len(objects):>7} {prepass.controller.overdraw:>8.2f} "
+              f"{'on' if prepass.controller.enabled else 'off':>5} {off * 1e3:>7.1f} {on * 1e3:>7.1f} {off / on:>6.2f}x")
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+
+if __name__ == "__main__":
+    create_context(*SIZE, "depth pre-pass benchmark")
+    try:
+        main(tuple(int(arg) for arg in sys.argv[1:]) or LAYERS)
+    finally:
+        glfw.terminate()
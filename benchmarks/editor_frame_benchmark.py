@@ -0,0 +1,103 @@
+"""
+Times the editor viewport's scene pass as it was, with every dynamic mesh
+drawn a second time by EditorRenderer.draw_world under separately built
+matrices, against the single pass GLViewport.paintGL makes now. Overlays
+(grid, gizmo) are the same in both and left out. Needs a GL 3.3 context;
+one is made with a hidden GLFW window.
+
+Run from the repository root:
+    python -m benchmarks.editor_frame_benchmark [objects ...]
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+import glfw
+from OpenGL.GL import *
+from pyrr import Vector3
+from benchmarks.gl_context import create_context
+from benchmarks.software_raster_benchmark import SphereMesh
+from rendering.rasteriser import Rasteriser
+from rendering.static_batcher import StaticBatcher
+from rendering.dynamic_resolution import SceneFramebuffer
+from rendering.editor_renderer.editor_camera import EditorCamera
+from rendering.my_shaders import Material
+
+SIZE = (960, 540)
+COUNTS = (10, 50, 200)
+STATIC_FRACTION = 0.5
+FRAMES = 20
+
+
+def editor_scene(count, rng):
+    """count spheres in front of the editor camera, STATIC_FRACTION of them static"""
+    mesh = SphereMesh(800)
+    camera = EditorCamera()
+    objects = []
+    for i in range(count):
+        location = np.asarray(camera.pos) + [20.0 + rng.uniform(-8, 8), rng.uniform(4, 18), rng.uniform(-12, 12)]
+        material = Material(base_color=tuple(rng.uniform(0.2, 0.9, 3)), roughness=0.4)
+        objects.append(SimpleNamespace(mesh=mesh, static=i < count * STATIC_FRACTION, location=location.tolist(),
+                                       rotation=[0, 0, 0], scale=[1, 1, 1], material=material, light=None, lod=0))
+    return camera, objects
+
+
+def two_pass_frame(rasteriser, batcher, camera, objects, width, height):
+    """The old frame: the viewport's pass, then draw_world's draw_mesh loop with its own matrices"""
+    view, projection = camera.get_view_and_projection(width, height)
+    rasteriser.draw_objects(objects, batcher, view, projection, Vector3(camera.pos))
+    view, projection = camera.get_view_and_projection(width, height)
+    for obj in objects:
+        if obj.mesh and not obj.static:
+            rasteriser.draw_mesh(obj.mesh, obj.location, obj.rotation, obj.scale, obj.material,
+                                 view, projection, Vector3(camera.pos))
+
+
+def single_pass_frame(rasteriser, batcher, camera, objects, width, height):
+    view, projection = camera.get_view_and_projection(width, height)
+    rasteriser.draw_objects(objects, batcher, view, projection, Vector3(camera.pos))
+
+
+def time_frames(frame, rasteriser, batcher, framebuffer, camera, objects):
+    width, height = SIZE
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        rasteriser.begin_frame()
+        framebuffer.bind(width, height, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        frame(rasteriser, batcher, camera, objects, width, height)
+        glFinish()
+    return (time.perf_counter() - start) / FRAMES
+
+
+def main(counts=COUNTS):
+    width, height = SIZE
+    rasteriser = Rasteriser(hdr_output=True)
+    framebuffer = SceneFramebuffer()
+    framebuffer.allocate(width, height)
+    glEnable(GL_DEPTH_TEST)
+    rng = np.random.default_rng(7)
+
+    print(f"{'objects':>7} {'dynamic':>7} {'before ms':>9} {'after ms':>8} {'speedup':>7}")
+    for count in counts:
+        camera, objects = editor_scene(count, rng)
+        batcher = StaticBatcher(rasteriser.mesh_arena)
+        batcher.update(objects)
+        view, projection = camera.get_view_and_projection(width, height)
+        rasteriser.update_lights([], view, projection, width, height)
+
+        time_frames(single_pass_frame, rasteriser, batcher, framebuffer, camera, objects)
+        before = time_frames(two_pass_frame, rasteriser, batcher, framebuffer, camera, objects)
+        after = time_frames(single_pass_frame, rasteriser, batcher, framebuffer, camera, objects)
+        dynamic = sum(not obj.static for obj in objects)
+        print(f"{count:>7} {dynamic:>7} {before * 1e3:>9.1f} {after * 1e3:>8.1f} {before / after:>6.2f}x")
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+
+if __name__ == "__main__":
+    create_context(*SIZE, "editor frame benchmark")
+    try:
+        main(tuple(int(arg) for arg in sys.argv[1:]) or COUNTS)
+    finally:
+        glfw.terminate()
@@ -0,0 +1,20 @@
+"""
+Hidden GLFW window with a GL 3.3 core context, for benchmarks that draw.
+"""
+
+import glfw
+
+
+def create_context(width, height, title="benchmark"):
+    if not glfw.init():
+        raise RuntimeError("Failed to initialize GLFW")
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    window = glfw.create_window(width, height, title, None, None)
+    if not window:
+        glfw.terminate()
+        raise RuntimeError("Failed to create GLFW window")
+    glfw.make_context_current(window)
+    return window
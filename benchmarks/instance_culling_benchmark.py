@@ -0,0 +1,96 @@
+"""
+Frustum culling of randomly placed instances three ways: a pure Python loop
+over the instances, NumPy, and the transform feedback pass in
+rendering/instancing.py (timed to the readback of its visible count). Needs
+a GL 3.3 context; one is made with a hidden GLFW window.
+
+Run from the repository root:
+    python -m benchmarks.instance_culling_benchmark [instances ...]
+"""
+
+import sys
+import time
+import numpy as np
+import glfw
+from OpenGL.GL import *
+from pyrr import Matrix44, Vector3
+from benchmarks.gl_context import create_context
+from benchmarks.software_raster_benchmark import SphereMesh
+from rendering.instancing import (InstanceBatch, InstanceCuller, frustum_planes, cull_spheres,
+                                  instance_spheres)
+from rendering.static_batcher import mesh_model_matrix
+from rendering.my_shaders import Material
+
+COUNTS = (1000, 10000, 100000)
+WORLD = 200.0
+REPEATS = 5
+
+
+def random_transforms(count, rng):
+    positions = (rng.random((count, 3)) - 0.5) * WORLD
+    rotations = rng.random((count, 3)) * 2 * np.pi
+    scales = rng.uniform(0.5, 2.0, (count, 1)).repeat(3, axis=1)
+    return np.array([mesh_model_matrix(p, r, s) for p, r, s in zip(positions, rotations, scales)])
+
+
+def python_cull(centres, radii, planes):
+    """What per-object culling costs when written as a loop"""
+    visible = 0
+    planes = planes.tolist()
+    for (x, y, z), radius in zip(centres.tolist(), radii.tolist()):
+        for a, b, c, d in planes:
+            if a * x + b * y + c * z + d < -radius:
+                break
+        else:
+            visible += 1
+    return visible
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function(*args)
+    return result, (time.perf_counter() - start) / REPEATS
+
+
+def main(counts=COUNTS):
+    rng = np.random.default_rng(0)
+    mesh = SphereMesh(200)
+    culler = InstanceCuller(margin=0.0)
+    view = Matrix44.look_at(Vector3([0.0, 0.0, 0.0]), Vector3([1.0, 0.0, 0.3]), Vector3([0.0, 1.0, 0.0]))
+    projection = Matrix44.perspective_projection(60.0, 16 / 9, 0.1, 150.0)
+    view_projection = np.asarray(view) @ np.asarray(projection)
+    planes = frustum_planes(view_projection)
+
+    def gpu_cull(batch):
+        culler.cull(batch, view_projection)
+        batch.collect(wait=True)
+        return batch.ready[1]
+
+    print(f"{'instances':>9} {'visible':>7} {'python ms':>9} {'numpy ms':>8} {'gpu ms':>7} {'match':>5}")
+    for count in counts:
+        transforms = random_transforms(count, rng)
+        batch = InstanceBatch(mesh, Material(), transforms)
+        # Transforms are already on the GPU, so the CPU paths start from the same data
+        centres, radii = instance_spheres(transforms, batch.centre, batch.radius)
+
+        python_visible, python_time = timed(python_cull, centres, radii, planes)
+        numpy_mask, numpy_time = timed(cull_spheres, centres, radii, planes)
+        gpu_cull(batch)
+        gpu_visible, gpu_time = timed(gpu_cull, batch)
+        batch.release()
+
+        numpy_visible = int(numpy_mask.sum())
+        # Float32 on the GPU can flip spheres that exactly touch a plane
+        match = "yes" if abs(gpu_visible - numpy_visible) <= max(1, count // 10000) else "NO"
+        print(f"{count:>9} {numpy_visible:>7} {python_time * 1e3:>9.1f} {numpy_time * 1e3:>8.2f} "
+              f"{gpu_time * 1e3:>7.2f} {match:>5}")
+        assert python_visible == numpy_visible
+
+
+if __name__ == "__main__":
+    create_context(64, 64, "instance culling benchmark")
+    try:
+        main(tuple(int(arg) for arg in sys.argv[1:]) or COUNTS)
+    finally:
+        glfw.terminate()
@@ -0,0 +1,60 @@
+"""
+Times the NumPy raycaster without a GL context: the all-columns DDA and the
+software framebuffer, with and without sprites.
+
+Run from the repository root:
+    python -m benchmarks.raycast_benchmark
+"""
+
+import sys
+import time
+import numpy as np
+from rendering.raycaster import cast_rays, render_frame, load_wall_images
+from utils.settings import WIDTH, HEIGHT, NUM_RAYS
+
+SIZES = (32, 128, 512)
+WALL_DENSITY = 0.1
+FRAMES = 20
+
+
+def random_grid(size, rng):
+    grid = (rng.random((size, size)) < WALL_DENSITY).astype(np.int32)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 1
+    return grid
+
+
+def open_point(grid, rng):
+    while True:
+        x, z = rng.random(2) * grid.shape
+        if not grid[int(x), int(z)]:
+            return x, z
+
+
+def main(sizes=SIZES):
+    rng = np.random.default_rng(0)
+    wall_images = load_wall_images()
+    sprite = np.zeros((64, 64, 4), dtype=np.uint8)
+    sprite[8:56, 16:48] = (255, 0, 0, 255)
+    print(f"{'map':>8} {'rays':>5} {'cast ms':>8} {'frame ms':>9} {'+sprites ms':>12}")
+    for size in sizes:
+        grid = random_grid(size, rng)
+        views = [open_point(grid, rng) + (rng.random() * 2 * np.pi,) for _ in range(FRAMES)]
+
+        start = time.perf_counter()
+        casts = [cast_rays(grid, x, z, angle) for x, z, angle in views]
+        cast = (time.perf_counter() - start) / FRAMES
+        start = time.perf_counter()
+        for columns in casts:
+            render_frame(columns, wall_images, WIDTH, HEIGHT)
+        frame = (time.perf_counter() - start) / FRAMES
+        start = time.perf_counter()
+        for columns, (x, z, _) in zip(casts, views):
+            sprites = [(x + dx, z + dz, sprite) for dx, dz in rng.normal(0.0, 4.0, (16, 2))]
+            render_frame(columns, wall_images, WIDTH, HEIGHT, sprites)
+        with_sprites = (time.perf_counter() - start) / FRAMES
+
+        print(f"{size:>4}x{size:<3} {NUM_RAYS:>5} {cast * 1e3:>8.2f} {frame * 1e3:>9.1f} {with_sprites * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or SIZES)
@@ -0,0 +1,56 @@
+"""
+Times the software rasteriser on UV spheres of increasing triangle count.
+No GL context is needed.
+
+Run from the repository root:
+    python -m benchmarks.software_raster_benchmark
+"""
+
+import sys
+import time
+import numpy as np
+from pyrr import Matrix44, Vector3
+from rendering.my_shaders import Material
+from rendering.software_rasteriser import SoftwareRasteriser
+
+SIZE = 256
+TRIANGLES = (1000, 10000, 100000)
+FRAMES = 5
+
+
+class SphereMesh:
+    """Minimal MeshData stand-in: flat vertex, normal and index lists"""
+    def __init__(self, triangles):
+        stacks = max(2, int(np.sqrt(triangles / 4)))
+        slices = max(3, triangles // (2 * stacks))
+        theta, phi = np.meshgrid(np.linspace(0, np.pi, stacks + 1), np.linspace(0, 2 * np.pi, slices + 1), indexing="ij")
+        points = np.stack([np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)], axis=-1)
+        grid = np.arange((stacks + 1) * (slices + 1)).reshape(stacks + 1, slices + 1)
+        a, b, c, d = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+        self.vertices = points.reshape(-1).tolist()
+        self.normals = self.vertices
+        self.indices = np.stack([a, b, c, a, c, d], axis=-1).reshape(-1).tolist()
+        self.uvs = None
+
+
+def main(triangle_counts=TRIANGLES):
+    rasteriser = SoftwareRasteriser(SIZE, SIZE)
+    camera = Vector3([0.0, 1.0, 4.0])
+    view = Matrix44.look_at(camera, Vector3([0.0, 0.0, 0.0]), Vector3([0.0, 1.0, 0.0]))
+    projection = Matrix44.perspective_projection(60.0, 1.0, 0.1, 100.0)
+    material = Material(base_color=(0.9, 0.3, 0.3), roughness=0.4)
+    print(f"{'triangles':>10} {'drawn':>8} {'fragments':>10} {'ms/frame':>9}")
+    for count in triangle_counts:
+        mesh = SphereMesh(count)
+        rasteriser.draw_mesh(mesh, [0, 0, 0], [0, 0, 0], [1, 1, 1], material, view, projection, camera)
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            rasteriser.begin_frame()
+            rasteriser.draw_mesh(mesh, [0, 0, 0], [0, 0, 0], [1, 1, 1], material, view, projection, camera)
+        elapsed = (time.perf_counter() - start) / FRAMES
+        print(f"{len(mesh.indices) // 3:>10} {rasteriser.triangle_count:>8} "
+              f"{rasteriser.fragment_count:>10} {elapsed * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(tuple(int(arg) for arg in sys.argv[1:]) or TRIANGLES)
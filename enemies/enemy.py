@@ -57,9 +57,7 @@ class Enemy:
         screen_x = WIDTH // 2 + int(math.tan(angle) * PROJ_COEFF)
         
         # Calculate texture coordinates for current frame
-        dir_index = int((angle % (2 * math.pi)) / (2 * math.pi / self.directions))
-        tex_x = self.current_frame / self.frames_per_dir
-        tex_y = dir_index / self.directions
+        tex_x, tex_y, _, _ = self.frame_uvs(player)
         
         # Enable necessary states
         glEnable(GL_TEXTURE_2D)
@@ -99,6 +97,14 @@ class Enemy:
         glDisable(GL_BLEND)
         glDisable(GL_TEXTURE_2D)
 
+    def frame_uvs(self, player):
+        """(u0, v0, u1, v1) of the sprite sheet frame for the current animation step and view angle"""
+        angle = math.atan2(self.y - player.y, self.x - player.x) - player.angle
+        dir_index = int((angle % (2 * math.pi)) / (2 * math.pi / self.directions))
+        tex_x = self.current_frame / self.frames_per_dir
+        tex_y = dir_index / self.directions
+        return tex_x, tex_y, tex_x + 1 / self.frames_per_dir, tex_y + 1 / self.directions
+
     def update(self, delta_time):
         self.frame_timer += delta_time * self.frame_rate
         if self.frame_timer >= 1.0:
@@ -14,7 +14,9 @@ from rendering.texture_loader import load_texture
 from rendering.pause_menu import PauseMenu
 from rendering.main_menu import MainMenu
 from rendering.editor_renderer.editor_render import EditorRenderer
+from rendering.editor_renderer.ui_utils import draw_text, flush_text
 from rendering.game_render import GameRenderer
+from rendering.gpu_resources import gpu_resources
 from utils.input import GameState, set_game_state, get_game_state, get_mouse_position, get_mouse_delta
 import math
 from utils import input
@@ -172,9 +174,15 @@ def main():
                 elif current_state == GameState.PAUSED:
                     game_renderer.render(delta_time)  # Render game in background
                     pause_menu.draw()
+
+                if SHOW_FPS and delta_time > 0:
+                    draw_text(f"FPS: {1.0 / delta_time:.0f}", 10, 10)
+                    flush_text(WIDTH, HEIGHT)
                 
                 # Swap front and back buffers
                 glfw.swap_buffers(window)
+                # GL deletions queued this frame (or by finalizers on other threads)
+                gpu_resources.process_pending()
                 
                
                 # Reset mouse delta at the end of the frame
@@ -15,6 +15,7 @@ class Player:
         self.vertical_offset = 0  # for looking up/down
         self.eye_height = TILE_SIZE_M * 0.5  # about halfway up a tile
         self.keys = set()  # Store currently pressed keys
+        self.bsp = None  # compiled map BSP, set by the renderer once built
 
     def movement(self, delta_time):
         dx, dy = 0, 0
@@ -52,6 +53,8 @@ class Player:
             self.y = next_y
 
     def is_wall(self, x, z):
+        if self.bsp is not None:
+            return self.bsp.is_solid(x / TILE_SIZE_M, z / TILE_SIZE_M)
         i = int(x / TILE_SIZE_M)
         k = int(z / TILE_SIZE_M)
         y = 0  # collision at ground level
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import numpy as np
+from utils.logger import logger
+
+
+class AssetManager:
+    """
+    Interns meshes by content hash so identical imports share one MeshData
+    (and therefore one set of GPU buffers in the Rasteriser's mesh cache).
+    """
+    def __init__(self):
+        self.meshes = {}        # content hash -> canonical MeshData
+        self.ref_counts = {}    # content hash -> number of scene objects using it
+        self.mesh_names = {}    # content hash -> name of the first import
+        self.mesh_hashes = {}   # id(canonical mesh) -> content hash
+        self.file_cache = {}    # (path, mtime, size) -> (content hash, base_color)
+
+    @staticmethod
+    def hash_mesh(mesh):
+        # Hash the raw float32/uint32 bytes so equal geometry from different
+        # parses (or different file names) collapses to the same key
+        digest = hashlib.sha1()
+        for label, data, dtype in (
+            (b"v", mesh.vertices, np.float32),
+            (b"n", mesh.normals, np.float32),
+            (b"i", mesh.indices, np.uint32),
+            (b"t", mesh.uvs, np.float32),
+        ):
+            digest.update(label)
+            if data is not None and len(data) > 0:
+                digest.update(np.asarray(data, dtype=dtype).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def mesh_nbytes(mesh):
+        # Size of the mesh as uploaded to the GPU (float32 attributes, uint32 indices)
+        total = len(mesh.vertices) * 4 + len(mesh.indices) * 4
+        if mesh.normals:
+            total += len(mesh.normals) * 4
+        if mesh.uvs:
+            total += len(mesh.uvs) * 4
+        return total
+
+    def intern_mesh(self, mesh, name=None):
+        """Return the shared MeshData for this content and take a reference to it"""
+        key = self.hash_mesh(mesh)
+        if key not in self.meshes:
+            self.meshes[key] = mesh
+            self.ref_counts[key] = 0
+            self.mesh_names[key] = name or key[:8]
+            self.mesh_hashes[id(mesh)] = key
+            logger.log(f"Interned new mesh {self.mesh_names[key]} ({key[:8]})")
+        self.ref_counts[key] += 1
+        return self.meshes[key]
+
+    def load_mesh(self, file_path, loader):
+        """
+        Load a mesh file through `loader` (e.g. MeshData.load_obj_mesh) and intern it.
+        Unchanged files are not re-parsed while their mesh is still referenced.
+        """
+        stat = os.stat(file_path)
+        file_key = (os.path.abspath(file_path), stat.st_mtime, stat.st_size)
+        cached = self.file_cache.get(file_key)
+        if cached is not None and cached[0] in self.meshes:
+            key, base_color = cached
+            self.ref_counts[key] += 1
+            return self.meshes[key], base_color
+
+        mesh, base_color = loader(file_path)
+        mesh = self.intern_mesh(mesh, name=os.path.basename(file_path))
+        self.file_cache[file_key] = (self.mesh_hashes[id(mesh)], base_color)
+        return mesh, base_color
+
+    def release_mesh(self, mesh):
+        """
+        Drop a reference; the mesh is forgotten once nothing uses it.
+        Returns True when that happened, so callers can free GPU data right away.
+        """
+        key = self.mesh_hashes.get(id(mesh))
+        if key is None:
+            return False
+        self.ref_counts[key] -= 1
+        if self.ref_counts[key] <= 0:
+            logger.log(f"Releasing mesh {self.mesh_names[key]} ({key[:8]})")
+            del self.meshes[key]
+            del self.ref_counts[key]
+            del self.mesh_names[key]
+            del self.mesh_hashes[id(mesh)]
+            self.file_cache = {k: v for k, v in self.file_cache.items() if v[0] != key}
+            return True
+        return False
+
+    def get_ref_count(self, mesh):
+        key = self.mesh_hashes.get(id(mesh))
+        return self.ref_counts.get(key, 0)
+
+    def report(self):
+        """Per-mesh reference counts and the bytes saved by sharing"""
+        entries = []
+        for key, mesh in self.meshes.items():
+            refs = self.ref_counts[key]
+            nbytes = self.mesh_nbytes(mesh)
+            entries.append({
+                "name": self.mesh_names[key],
+                "hash": key,
+                "ref_count": refs,
+                "bytes": nbytes,
+                "bytes_saved": nbytes * max(refs - 1, 0),
+            })
+        entries.sort(key=lambda e: e["bytes_saved"], reverse=True)
+        return entries
+
+    def memory_saved(self):
+        return sum(entry["bytes_saved"] for entry in self.report())
+
+    def format_report(self):
+        lines = []
+        for entry in self.report():
+            lines.append(
+                f"{entry['name']} [{entry['hash'][:8]}]: {entry['ref_count']} refs, "
+                f"{entry['bytes'] / 1024:.1f} KiB, saved {entry['bytes_saved'] / 1024:.1f} KiB"
+            )
+        lines.append(f"Total saved: {self.memory_saved() / 1024:.1f} KiB")
+        return "\n".join(lines)
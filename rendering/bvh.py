@@ -0,0 +1,217 @@
+"""
+Bounding volume hierarchy over a mesh's triangles, for ray picking.
+
+The tree is built top down with the surface area heuristic, sweeping every
+split position along each axis in sorted centroid order. Nodes live in flat
+arrays: a leaf's (first, count) is a range of the triangle arrays, which are
+stored in leaf order; an inner node's first is its left child and the right
+child follows it. Traversal keeps an explicit stack, visits the nearer child
+first and tests each leaf's triangles together with a vectorised
+Möller–Trumbore.
+"""
+
+import math
+import weakref
+import numpy as np
+
+MAX_LEAF_SIZE = 8
+# SAH cost of visiting a node, relative to testing one triangle. Leaves are
+# tested in one NumPy batch, so a node costs more than a triangle here.
+TRAVERSAL_COST = 4.0
+
+# Rays closer to parallel than this to a triangle's plane miss it
+PARALLEL_EPSILON = 1e-12
+# Hits nearer than this are the ray's own start point
+MIN_DISTANCE = 1e-6
+
+_mesh_bvhs = weakref.WeakKeyDictionary()  # MeshData -> MeshBVH
+
+
+def half_area(size):
+    """Half the surface area of boxes with x, y, z extents along the first axis, what SAH costs compare"""
+    x, y, z = size
+    return x * y + y * z + z * x
+
+
+def segmented_extent(lo, hi, segments, span):
+    """
+    Extents of the running bounding box along the last axis, restarting at
+    every segment. Segments ascend along it and span exceeds the values'
+    range, so shifting each segment by span keeps earlier ones out of its box.
+    """
+    shift = segments * span
+    return np.maximum.accumulate(hi + shift, axis=-1) - np.minimum.accumulate(lo - shift, axis=-1) - 2.0 * shift
+
+
+class MeshBVH:
+    """
+    SAH tree over triangles (N, 3) indexing positions (V, 3). Build once per
+    mesh through get_mesh_bvh; intersect is cheap.
+    """
+    def __init__(self, positions, triangles):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = positions[triangles]
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        centroids = (lo + hi) * 0.5
+        total = len(triangles)
+        order = np.arange(total)
+        bounds = np.full((max(2 * total - 1, 1), 6), np.nan)  # NaN: no ray enters an empty tree
+        first = np.zeros(len(bounds), dtype=np.int32)
+        count = np.zeros(len(bounds), dtype=np.int32)
+        span = 2.0 * float(hi.max() - lo.min()) + 1.0 if total else 1.0
+
+        # One level of the tree at a time, every node's SAH sweep in the same
+        # NumPy calls. Nodes are ranges of order; segment is each element's node.
+        nodes, starts, sizes = np.array([0]), np.array([0]), np.array([total])
+        node_count = 1
+        while total and len(nodes):
+            offsets = np.cumsum(sizes) - sizes
+            segment = np.repeat(np.arange(len(nodes)), sizes)
+            rank = np.arange(len(segment)) - offsets[segment]  # position inside its node
+            ids = order[starts[segment] + rank]
+            ids_lo, ids_hi = lo[ids], hi[ids]
+            node_lo = np.minimum.reduceat(ids_lo, offsets)
+            node_hi = np.maximum.reduceat(ids_hi, offsets)
+            bounds[nodes] = np.concatenate([node_lo, node_hi], axis=1)
+
+            # Sweep every split position along each axis in centroid order; offsetting
+            # the centroids by node keeps each node's range in place under one argsort
+            keys = centroids[ids] + (segment * span)[:, None]
+            orders = np.argsort(keys, axis=0, kind="stable").T
+            # (xyz, sort axis, element): the sweeps run along contiguous memory
+            sorted_lo, sorted_hi = ids_lo.T[:, orders], ids_hi.T[:, orders]
+            left_area = half_area(segmented_extent(sorted_lo, sorted_hi, segment, span))
+            reverse = -segment[::-1]
+            right_extent = segmented_extent(sorted_lo[..., ::-1], sorted_hi[..., ::-1], reverse, span)
+            right_area = half_area(right_extent[..., ::-1])
+            left_count = rank + 1
+            right_count = sizes[segment] - left_count
+            costs = left_area * left_count + np.roll(right_area, -1, axis=1) * right_count
+            costs[:, right_count == 0] = np.inf
+            best_axis = costs.argmin(axis=0)
+            costs = costs.min(axis=0)
+            node_best = np.minimum.reduceat(costs, offsets)
+            cheapest = np.flatnonzero(costs == node_best[segment])
+            cheapest = cheapest[np.unique(segment[cheapest], return_index=True)[1]]  # first per node
+
+            cost = TRAVERSAL_COST + node_best / np.maximum(half_area((node_hi - node_lo).T), 1e-30)
+            # A split costs at least TRAVERSAL_COST, so small nodes are always leaves
+            leaf = (sizes <= TRAVERSAL_COST) | ((sizes <= MAX_LEAF_SIZE) & (cost >= sizes))
+            first[nodes[leaf]] = starts[leaf]
+            count[nodes[leaf]] = sizes[leaf]
+
+            split = ~leaf
+            axis = best_axis[cheapest]
+            moved = split[segment]
+            sorted_ids = ids[orders[axis[segment], np.arange(len(segment))]]
+            order[(starts[segment] + rank)[moved]] = sorted_ids[moved]
+            left = rank[cheapest][split] + 1
+            children = node_count + 2 * np.arange(split.sum())
+            first[nodes[split]] = children
+            node_count += 2 * len(children)
+            nodes = np.concatenate([children, children + 1])
+            starts = np.concatenate([starts[split], starts[split] + left])
+            sizes = np.concatenate([left, sizes[split] - left])
+
+        self.node_bounds = bounds[:node_count]  # min xyz, max xyz
+        self.node_first = first[:node_count]
+        self.node_count = count[:node_count]  # 0 for inner nodes
+        self.triangle_ids = order  # original triangle index of each stored triangle
+        v0 = corners[order, 0]
+        self.v0 = v0
+        self.edge1 = corners[order, 1] - v0
+        self.edge2 = corners[order, 2] - v0
+        self.normal = np.cross(self.edge1, self.edge2)
+        # Traversal visits one node at a time, where Python floats beat NumPy
+        self._nodes = list(zip(self.node_bounds.tolist(), self.node_first.tolist(), self.node_count.tolist()))
+
+    def intersect(self, origin, direction, max_distance=math.inf):
+        """
+        Nearest hit of the ray as (distance, triangle index, u, v), the
+        barycentrics of vertices 1 and 2, or None. Distance is in units of
+        direction's length.
+        """
+        ox, oy, oz = (float(c) for c in origin)
+        dx, dy, dz = (float(c) for c in direction)
+        ix, iy, iz = (1.0 / c if c != 0.0 else math.copysign(1e30, c) for c in (dx, dy, dz))
+        # Bounds index of the slab each axis enters first, so no min/max per box
+        nx, ny, nz = (0 if ix >= 0.0 else 3), (1 if iy >= 0.0 else 4), (2 if iz >= 0.0 else 5)
+        fx, fy, fz = (nx + 3) % 6, (ny + 3) % 6, (nz + 3) % 6
+        origin = np.array([ox, oy, oz])
+        direction = np.array([dx, dy, dz])
+        nodes = self._nodes
+
+        def entry(node):
+            bounds = nodes[node][0]
+            near = (bounds[nx] - ox) * ix
+            far = (bounds[fx] - ox) * ix
+            t = (bounds[ny] - oy) * iy
+            if t > near:
+                near = t
+            t = (bounds[fy] - oy) * iy
+            if t < far:
+                far = t
+            t = (bounds[nz] - oz) * iz
+            if t > near:
+                near = t
+            t = (bounds[fz] - oz) * iz
+            if t < far:
+                far = t
+            if near < 0.0:
+                near = 0.0
+            return near if near <= far else math.inf
+
+        best_t, best = max_distance, None
+        stack = [(entry(0), 0)]
+        while stack:
+            near, node = stack.pop()
+            if near >= best_t:
+                continue
+            _, first, count = nodes[node]
+            if count:
+                hit = self.intersect_triangles(first, first + count, origin, direction, best_t)
+                if hit is not None:
+                    best_t, best = hit[0], hit
+                continue
+            left, right = entry(first), entry(first + 1)
+            # Pushed last is popped first: the nearer child
+            if left <= right:
+                if right < best_t:
+                    stack.append((right, first + 1))
+                if left < best_t:
+                    stack.append((left, first))
+            else:
+                if left < best_t:
+                    stack.append((left, first))
+                if right < best_t:
+                    stack.append((right, first + 1))
+        return best
+
+    def intersect_triangles(self, start, end, origin, direction, max_distance):
+        """Möller–Trumbore against stored triangles start:end at once; nearest (t, triangle, u, v) or None"""
+        # The scalar triple products rearranged around the stored normal
+        # edge1 x edge2, leaving one matrix product for the per-triangle cross
+        dx, dy, dz = direction
+        cross_direction = np.array([[0.0, -dz, dy], [dz, 0.0, -dx], [-dy, dx, 0.0]])  # s @ this = s x direction
+        s = origin - self.v0[start:end]
+        w = s @ cross_direction
+        a = -(self.normal[start:end] @ direction)
+        facing = np.abs(a) > PARALLEL_EPSILON
+        f = 1.0 / np.where(facing, a, 1.0)
+        u = f * np.einsum("ij,ij->i", self.edge2[start:end], w)
+        v = -f * np.einsum("ij,ij->i", self.edge1[start:end], w)
+        t = f * np.einsum("ij,ij->i", self.normal[start:end], s)
+        hit = facing & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > MIN_DISTANCE) & (t < max_distance)
+        if not hit.any():
+            return None
+        nearest = int(np.argmin(np.where(hit, t, np.inf)))
+        return float(t[nearest]), int(self.triangle_ids[start + nearest]), float(u[nearest]), float(v[nearest])
+
+
+def get_mesh_bvh(mesh):
+    """MeshBVH of a MeshData, built on first use and kept while the mesh lives"""
+    bvh = _mesh_bvhs.get(mesh)
+    if bvh is None:
+        bvh = _mesh_bvhs[mesh] = MeshBVH(mesh.vertices, mesh.indices)
+    return bvh
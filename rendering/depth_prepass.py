@@ -0,0 +1,143 @@
+"""
+Optional depth pre-pass: opaque geometry is first drawn depth-only with a
+trivial shader, then the PBR pass runs with GL_EQUAL depth testing so the
+Cook-Torrance shading only runs once per visible pixel. Worth it when the
+scene has a lot of overdraw, a waste of vertex work when it does not, so in
+"auto" mode it is switched from overdraw measured with occlusion queries.
+"""
+
+from OpenGL.GL import *
+from rendering.my_shaders import DEPTH_VERTEX_SHADER_SRC, DEPTH_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from utils.logger import logger
+
+
+class OverdrawController:
+    """
+    Decides whether to run the pre-pass from (depth pass samples, lit pass
+    samples) pairs. Pure Python so it can be driven with synthetic counts.
+
+    The depth pass with GL_LESS passes exactly the fragments the lit pass
+    would shade without a pre-pass; with GL_EQUAL the lit pass shades roughly
+    one fragment per covered pixel. Their ratio is the overdraw, which is
+    only measurable on pre-pass frames, so while disabled the pre-pass is
+    re-enabled for one probe frame every probe_interval frames.
+    """
+    def __init__(self,
+                 enable_overdraw=1.5,
+                 disable_overdraw=1.2,
+                 smoothing=0.2,
+                 probe_interval=120):
+        self.enable_overdraw = enable_overdraw
+        self.disable_overdraw = disable_overdraw
+        self.smoothing = smoothing
+        self.probe_interval = probe_interval
+        # Start on so the first frames measure the scene
+        self.enabled = True
+        self.overdraw = None
+        self.frames_disabled = 0
+
+    def update(self, depth_samples, lit_samples):
+        """Feed one pre-pass frame's sample counts, returns whether the pre-pass stays on"""
+        overdraw = depth_samples / max(lit_samples, 1)
+        if self.overdraw is None:
+            self.overdraw = overdraw
+        else:
+            self.overdraw += (overdraw - self.overdraw) * self.smoothing
+
+        # Hysteresis so a scene sitting near the threshold does not toggle every frame
+        if self.enabled and self.overdraw < self.disable_overdraw:
+            self.enabled = False
+            self.frames_disabled = 0
+        elif not self.enabled and self.overdraw > self.enable_overdraw:
+            self.enabled = True
+        return self.enabled
+
+    def wants_prepass(self):
+        """Called once per frame; True for pre-pass frames and probe frames"""
+        if self.enabled:
+            return True
+        self.frames_disabled += 1
+        return self.frames_disabled % self.probe_interval == 0
+
+    def reset(self):
+        self.enabled = True
+        self.overdraw = None
+        self.frames_disabled = 0
+
+
+class DepthPrepass:
+    """
+    Owns the depth-only program and the GL state switches around both passes.
+    mode is "auto", "on" or "off". Sample counts come from GL_SAMPLES_PASSED
+    queries kept in a small ring and read a few frames late, like GpuTimer.
+    """
+    def __init__(self, mode="auto", latency=3):
+        self.mode = mode
+        self.program = shader_manager.get_program(DEPTH_VERTEX_SHADER_SRC, DEPTH_FRAGMENT_SHADER_SRC, name="depth")
+        self.model_location = glGetUniformLocation(self.program, "model")
+        self.view_location = glGetUniformLocation(self.program, "view")
+        self.projection_location = glGetUniformLocation(self.program, "projection")
+        self.controller = OverdrawController()
+        self.free = [tuple(int(q) for q in glGenQueries(2)) for _ in range(latency)]
+        self.pending = []
+        self.active = None
+        self.active_frame = False
+
+    def begin_frame(self):
+        """Collect finished queries and decide whether this frame gets a pre-pass"""
+        if self.mode != "auto":
+            self.active_frame = self.mode == "on"
+            return self.active_frame
+        while self.pending and glGetQueryObjectiv(self.pending[0][1], GL_QUERY_RESULT_AVAILABLE):
+            queries = self.pending.pop(0)
+            depth_samples = glGetQueryObjectuiv(queries[0], GL_QUERY_RESULT)
+            lit_samples = glGetQueryObjectuiv(queries[1], GL_QUERY_RESULT)
+            self.free.append(queries)
+            was_enabled = self.controller.enabled
+            if self.controller.update(depth_samples, lit_samples) != was_enabled:
+                logger.log(f"Depth pre-pass {'on' if self.controller.enabled else 'off'} "
+                           f"(overdraw {self.controller.overdraw:.2f})")
+        self.active_frame = self.controller.wants_prepass()
+        return self.active_frame
+
+    def begin_depth_pass(self, view, projection):
+        """Bind the depth-only program with colour writes off; callers set model per draw"""
+        if self.mode == "auto" and self.free:
+            self.active = self.free.pop()
+            glBeginQuery(GL_SAMPLES_PASSED, self.active[0])
+        glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+        glUseProgram(self.program)
+        glUniformMatrix4fv(self.view_location, 1, GL_FALSE, view.astype('float32'))
+        glUniformMatrix4fv(self.projection_location, 1, GL_FALSE, projection.astype('float32'))
+
+    def set_model(self, model):
+        glUniformMatrix4fv(self.model_location, 1, GL_FALSE, model.astype('float32'))
+
+    def end_depth_pass(self):
+        if self.active is not None:
+            glEndQuery(GL_SAMPLES_PASSED)
+        glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+
+    def begin_lit_pass(self):
+        """Only fragments matching the pre-pass depth get shaded; depth is already final"""
+        if self.active is not None:
+            glBeginQuery(GL_SAMPLES_PASSED, self.active[1])
+        glDepthFunc(GL_EQUAL)
+        glDepthMask(GL_FALSE)
+
+    def end_lit_pass(self):
+        if self.active is not None:
+            glEndQuery(GL_SAMPLES_PASSED)
+            self.pending.append(self.active)
+            self.active = None
+        glDepthFunc(GL_LESS)
+        glDepthMask(GL_TRUE)
+
+    def release(self):
+        queries = [q for pair in self.free + self.pending for q in pair]
+        if self.active is not None:
+            queries.extend(self.active)
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self.free, self.pending, self.active = [], [], None
@@ -0,0 +1,232 @@
+"""
+Dynamic resolution: the 3D scene is rendered into an HDR offscreen target at
+a fraction of the window size chosen from measured GPU frame times, then
+upscaled, tonemapped and gamma corrected in a single fullscreen pass.
+"""
+
+import math
+from OpenGL.GL import *
+from rendering.my_shaders import RESOLVE_VERTEX_SHADER_SRC, RESOLVE_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.gpu_resources import gpu_resources
+from utils.logger import logger
+
+
+class ResolutionController:
+    """
+    Picks a render scale from frame times (in ms). Pure Python so it can be
+    driven with synthetic timings.
+
+    The frame time is smoothed with an exponential moving average. Nothing
+    changes while it sits between headroom * target and target; outside that
+    band the scale moves towards the middle of the band assuming GPU cost is
+    proportional to pixel count (scale squared).
+    """
+    def __init__(self,
+                 target_ms=1000.0 / 60.0,
+                 min_scale=0.5,
+                 max_scale=1.0,
+                 smoothing=0.1,
+                 headroom=0.8,
+                 step=0.05,
+                 max_change=0.1):
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.step = step
+        self.max_change = max_change
+        self.scale = max_scale
+        self.smoothed_ms = None
+
+    def update(self, frame_ms):
+        """Feed one frame time, returns the scale to render the next frame at"""
+        if self.smoothed_ms is None:
+            self.smoothed_ms = frame_ms
+        else:
+            self.smoothed_ms += (frame_ms - self.smoothed_ms) * self.smoothing
+
+        low = self.target_ms * self.headroom
+        if low <= self.smoothed_ms <= self.target_ms:
+            return self.scale
+
+        budget = (low + self.target_ms) * 0.5
+        desired = self.scale * math.sqrt(budget / max(self.smoothed_ms, 1e-3))
+        desired = min(max(desired, self.scale - self.max_change), self.scale + self.max_change)
+        # Quantise so tiny fluctuations do not change the resolution every frame
+        desired = round(round(desired / self.step) * self.step, 4)
+        desired = min(max(desired, self.min_scale), self.max_scale)
+
+        if desired != self.scale:
+            # Predict the new frame time so the average does not keep pushing
+            # in the same direction until fresh samples arrive
+            self.smoothed_ms *= (desired / self.scale) ** 2
+            self.scale = desired
+        return self.scale
+
+    def reset(self):
+        self.scale = self.max_scale
+        self.smoothed_ms = None
+
+
+class GpuTimer:
+    """
+    GL_TIME_ELAPSED queries in a small ring so results are read a few frames
+    late instead of stalling on the current one.
+    """
+    def __init__(self, latency=3):
+        self.free = [int(q) for q in glGenQueries(latency)]
+        self.pending = []
+        self.active = None
+        self.last_ms = None
+
+    def begin(self):
+        if not self.free:
+            # Every query is still in flight; skip timing this frame
+            return
+        self.active = self.free.pop()
+        glBeginQuery(GL_TIME_ELAPSED, self.active)
+
+    def end(self):
+        if self.active is None:
+            return
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending.append(self.active)
+        self.active = None
+
+    def collect(self):
+        """Return the frame times (ms) of every query that has finished since the last call"""
+        results = []
+        while self.pending and glGetQueryObjectiv(self.pending[0], GL_QUERY_RESULT_AVAILABLE):
+            query = self.pending.pop(0)
+            # 32-bit read is enough for frames under 4 s and avoids PyOpenGL's
+            # missing 64-bit array mapping for glGetQueryObjectui64v
+            results.append(glGetQueryObjectuiv(query, GL_QUERY_RESULT) / 1e6)
+            self.free.append(query)
+        if results:
+            self.last_ms = results[-1]
+        return results
+
+    def release(self):
+        queries = self.free + self.pending + ([self.active] if self.active is not None else [])
+        for query in queries:
+            gpu_resources.delete_query(query)
+        self.free, self.pending, self.active = [], [], None
+
+
+class SceneFramebuffer:
+    """
+    RGBA16F colour + depth target. Storage is allocated at the full window
+    size and the scene is drawn into its lower-left corner, so changing the
+    scale never reallocates.
+    """
+    def __init__(self):
+        self.fbo = glGenFramebuffers(1)
+        self.color_texture = glGenTextures(1)
+        self.depth_buffer = glGenRenderbuffers(1)
+        self.allocated_size = (0, 0)
+        self.render_size = (0, 0)
+        self.resolve_program = shader_manager.get_program(
+            RESOLVE_VERTEX_SHADER_SRC, RESOLVE_FRAGMENT_SHADER_SRC, name="resolve")
+        self.empty_vao = glGenVertexArrays(1)
+
+    def allocate(self, width, height):
+        if (width, height) == self.allocated_size:
+            return
+        glBindTexture(GL_TEXTURE_2D, self.color_texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, width, height, 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth_buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.color_texture, 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_buffer)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            logger.log(f"Scene framebuffer incomplete: {status}")
+        self.allocated_size = (width, height)
+        gpu_resources.track("texture", self.color_texture, "render_targets", width * height * 8)
+        gpu_resources.track("renderbuffer", self.depth_buffer, "render_targets", width * height * 4)
+
+    def bind(self, width, height, scale):
+        """Bind for drawing at scale * (width, height); returns the render size"""
+        self.allocate(width, height)
+        self.render_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, *self.render_size)
+        return self.render_size
+
+    def resolve(self, target_fbo, width, height, exposure=1.0):
+        """Upscale, tonemap and gamma correct into target_fbo"""
+        glBindFramebuffer(GL_FRAMEBUFFER, target_fbo)
+        glViewport(0, 0, width, height)
+        depth_test = glIsEnabled(GL_DEPTH_TEST)
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_BLEND)
+
+        glUseProgram(self.resolve_program)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.color_texture)
+        glUniform1i(glGetUniformLocation(self.resolve_program, "sceneColor"), 0)
+        alloc_w, alloc_h = self.allocated_size
+        render_w, render_h = self.render_size
+        glUniform2f(glGetUniformLocation(self.resolve_program, "uvScale"), render_w / alloc_w, render_h / alloc_h)
+        # Keep bilinear taps inside the rendered region
+        glUniform2f(glGetUniformLocation(self.resolve_program, "uvMax"),
+                    (render_w - 0.5) / alloc_w, (render_h - 0.5) / alloc_h)
+        glUniform1f(glGetUniformLocation(self.resolve_program, "exposure"), exposure)
+        glBindVertexArray(self.empty_vao)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+        glBindVertexArray(0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glUseProgram(0)
+
+        if depth_test:
+            glEnable(GL_DEPTH_TEST)
+        if blend:
+            glEnable(GL_BLEND)
+
+    def release(self):
+        gpu_resources.delete_framebuffer(self.fbo)
+        gpu_resources.delete_texture(self.color_texture)
+        gpu_resources.delete_renderbuffer(self.depth_buffer)
+        gpu_resources.delete_vertex_array(self.empty_vao)
+        self.allocated_size = (0, 0)
+
+
+class DynamicResolution:
+    """Ties the controller, GPU timer and scene framebuffer together for a render loop"""
+    def __init__(self, target_ms=1000.0 / 60.0, min_scale=0.5, max_scale=1.0):
+        self.controller = ResolutionController(target_ms, min_scale, max_scale)
+        self.timer = GpuTimer()
+        self.framebuffer = SceneFramebuffer()
+        self.enabled = True
+
+    @property
+    def scale(self):
+        return self.controller.scale if self.enabled else 1.0
+
+    def begin_frame(self, width, height):
+        """Bind the scene target; returns the (width, height) to render at"""
+        for frame_ms in self.timer.collect():
+            self.controller.update(frame_ms)
+        size = self.framebuffer.bind(width, height, self.scale)
+        self.timer.begin()
+        return size
+
+    def end_frame(self, target_fbo, width, height):
+        self.timer.end()
+        self.framebuffer.resolve(target_fbo, width, height)
+
+    def release(self):
+        self.timer.release()
+        self.framebuffer.release()
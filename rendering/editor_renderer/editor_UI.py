@@ -14,6 +14,12 @@ from rendering.texture_loader import load_cubemap
 from rendering.rasteriser import Rasteriser
 from pyrr import Vector3, Matrix44
 from rendering.my_shaders import Material
+from rendering.asset_manager import AssetManager
+from rendering.lighting import Light
+from rendering.dynamic_resolution import DynamicResolution
+from rendering.static_batcher import StaticBatcher
+from rendering.view_modes import ViewModeRenderer, VIEW_MODES, HEATMAP_MODES
+from rendering.gpu_resources import gpu_resources
 import os
 import pywavefront
 from PIL import Image
@@ -33,13 +39,16 @@ class GLViewport(QOpenGLWidget):
         self._init_view_type_button()
         self.setAcceptDrops(True)
         self.rasteriser = None
+        self.dynamic_resolution = None
+        self.static_batcher = None
+        self.view_modes = None
         self.editor_renderer = None
         self.mouse_pressed = False
         print("GLViewport initialized")
 
     def _init_view_type_button(self):
         self.view_type_button = QPushButton(self.view_type, self)
-        self.view_type_button.setFixedSize(60, 28)
+        self.view_type_button.setFixedSize(130, 28)
         self.view_type_button.move(10, 10)
         self.view_type_button.setStyleSheet(
             """
@@ -54,7 +63,7 @@ class GLViewport(QOpenGLWidget):
         )
         self.view_type_menu = QMenu(self)
         self.view_type_actions = {}
-        for view in ["Lit", "Unlit"]:
+        for view in VIEW_MODES:
             action = self.view_type_menu.addAction(view, lambda v=view: self.set_view_type(v))
             action.setCheckable(True)
             self.view_type_actions[view] = action
@@ -78,9 +87,14 @@ class GLViewport(QOpenGLWidget):
         glDisable(GL_CULL_FACE)
         glCullFace(GL_BACK)
         
-        self.rasteriser = Rasteriser()
+        self.rasteriser = Rasteriser(hdr_output=True)
         self.skybox_tex = self.rasteriser.sky_texture
         print("Skybox HDR texture loaded via Rasteriser")
+        self.dynamic_resolution = DynamicResolution()
+        self.static_batcher = StaticBatcher(self.rasteriser.mesh_arena)
+        self.view_modes = ViewModeRenderer(self.rasteriser.mesh_arena, hdr_output=True)
+        # Free GPU targets while the context still exists
+        self.context().aboutToBeDestroyed.connect(self.release_gl)
         
         # Initialize the editor renderer
         parent = self.parent()
@@ -105,48 +119,59 @@ class GLViewport(QOpenGLWidget):
         dt = (current_time - self.last_update_time) / 1000.0  # Convert to seconds
         self.last_update_time = current_time
 
+        self.rasteriser.begin_frame()
+
         # Update camera with current keys
         keys = {key: True for key in self.keys_pressed}
         self.camera.update(dt, keys, 0, 0, (0, 0), self.mouse_wheel)
         self.mouse_wheel = 0  # Reset wheel after use
 
+        # The scene goes into the HDR target at the current dynamic scale
+        width, height = self.width(), max(self.height(), 1)
+        render_width, render_height = self.dynamic_resolution.begin_frame(width, height)
+
         # Restore clear color to original dark gray
         glClearColor(0.1, 0.1, 0.1, 1.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        
-        # --- Legacy grid drawing ---
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(60, self.width() / self.height() if self.height() != 0 else 1, 0.1, 1000.0)
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        self.camera.apply_view()
-        self.draw_grid()  # Only grid or legacy stuff here
 
-        # --- Modern mesh drawing ---
-        # DO NOT touch OpenGL matrix state here!
-        view, projection = self.camera.get_view_and_projection(self.width(), self.height())
+        # One set of camera matrices for the scene and every overlay
+        view, projection = self.camera.get_view_and_projection(width, height)
         scene = self.parent().scene
-        for obj in scene.objects:
-            self.rasteriser.draw_mesh(
-                mesh=obj.mesh,
-                position=obj.location,
-                rotation=obj.rotation,
-                scale=obj.scale,
-                material=obj.material,
-                view=view,
-                projection=projection,
-                camera_pos=Vector3(self.camera.pos)
-            )
+        lights = [(obj.location, obj.light) for obj in scene.objects if obj.light is not None]
+        self.rasteriser.update_lights(lights, view, projection, render_width, render_height)
+
+        # Scene geometry, drawn once: static objects merged, one call per material
+        self.static_batcher.update(scene.objects)
+        self.rasteriser.update_shadows(scene.objects, self.static_batcher, view, projection)
+        if self.view_type in HEATMAP_MODES:
+            self.view_modes.draw(self.view_type, scene.objects, self.static_batcher, view, projection)
+        else:
+            self.rasteriser.set_unlit(self.view_type == "Unlit")
+            self.rasteriser.draw_objects(scene.objects, self.static_batcher, view, projection, Vector3(self.camera.pos))
+
+        # Grid, gizmo and selection on top, depth tested against the scene
+        self.draw_overlays(view, projection)
 
-        # Call draw_world to handle gizmo and other editor-specific rendering
-        #print("[DEBUG] About to call draw_world")
-        self.draw_world()
-        #print("[DEBUG] Finished draw_world")
+        # Upscale + tonemap into the widget's framebuffer (not 0 for QOpenGLWidget)
+        self.dynamic_resolution.end_frame(self.defaultFramebufferObject(), width, height)
 
     def resizeGL(self, w, h):
         glViewport(0, 0, w, h)
 
+    def release_gl(self):
+        """Delete the viewport's render targets and shadow maps before its context goes away"""
+        self.makeCurrent()
+        if self.view_modes:
+            self.view_modes.release()
+            self.view_modes = None
+        if self.dynamic_resolution:
+            self.dynamic_resolution.release()
+            self.dynamic_resolution = None
+        if self.rasteriser:
+            self.rasteriser.release()
+        gpu_resources.process_pending()
+        self.doneCurrent()
+
     def draw_grid(self):
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
@@ -224,12 +249,19 @@ class GLViewport(QOpenGLWidget):
         
         glDisable(GL_BLEND)
 
+    def draw_overlays(self, view, projection):
+        """Fixed-function overlays, given the scene's matrices so they line up with it"""
+        glMatrixMode(GL_PROJECTION)
+        glLoadMatrixf(projection.astype('float32'))
+        glMatrixMode(GL_MODELVIEW)
+        glLoadMatrixf(view.astype('float32'))
+        self.draw_grid()
+        self.draw_world(view, projection)
+
     #Wrapper for the renderer's draw_world
-    def draw_world(self):
+    def draw_world(self, view, projection):
         if self.editor_renderer is not None:
-            #print(f"[DEBUG] Calling draw_world")
-            
-            self.editor_renderer.draw_world()
+            self.editor_renderer.draw_world(view, projection)
         else:
             print("WARNING: editor_renderer is None in draw_world")
 
@@ -252,15 +284,7 @@ class GLViewport(QOpenGLWidget):
         if event.button() == Qt.RightButton:
             self.setCursor(Qt.CrossCursor)
         elif event.button() == Qt.LeftButton and self.editor_renderer:
-            self.makeCurrent()  # Ensure OpenGL context is current
-            # Set up matrices as in paintGL
-            glMatrixMode(GL_PROJECTION)
-            glLoadIdentity()
-            gluPerspective(60, self.width() / self.height() if self.height() != 0 else 1, 0.1, 1000.0)
-            glMatrixMode(GL_MODELVIEW)
-            glLoadIdentity()
-            self.camera.apply_view()
-            
+            # Picking projects with the camera's cached matrices; no GL state needed
             # Convert mouse coordinates to viewport space
             viewport_x = event.position().x() - self.editor_renderer.viewport_x
             viewport_y = event.position().y() - self.editor_renderer.viewport_y
@@ -489,6 +513,7 @@ class PropertiesPanel(QWidget):
         self.roughness_edit = QLineEdit()
         self.specular_edit = QLineEdit()
         self.emissive_color_edits = [QLineEdit(), QLineEdit(), QLineEdit()]
+        self.static_checkbox = QCheckBox()
 
         # Set up layouts for float3 fields
         self.layout.addRow("Name:", self.name_edit)
@@ -496,6 +521,7 @@ class PropertiesPanel(QWidget):
         self.layout.addRow("Location:", self._make_row(self.location_edits))
         self.layout.addRow("Rotation:", self._make_row(self.rotation_edits))
         self.layout.addRow("Scale:", self._make_row(self.scale_edits))
+        self.layout.addRow("Static:", self.static_checkbox)
         self.layout.addRow("Base Color:", self._make_row(self.base_color_edits))
         self.layout.addRow("Metallic:", self.metallic_edit)
         self.layout.addRow("Roughness:", self.roughness_edit)
@@ -523,6 +549,7 @@ class PropertiesPanel(QWidget):
         self.specular_edit.editingFinished.connect(self._on_material_scalar_changed("specular"))
         for i, edit in enumerate(self.emissive_color_edits):
             edit.editingFinished.connect(self._make_on_material_vec3_changed("emissive_color", i))
+        self.static_checkbox.toggled.connect(self._on_static_changed)
 
     def _make_row(self, edits):
         row = QHBoxLayout()
@@ -546,6 +573,7 @@ class PropertiesPanel(QWidget):
             self.metallic_edit.setText("")
             self.roughness_edit.setText("")
             self.specular_edit.setText("")
+            self.static_checkbox.setChecked(False)
             self.set_fields_enabled(False)
             return
 
@@ -568,6 +596,7 @@ class PropertiesPanel(QWidget):
                 edit.setText(str(value))
                 edit.setEnabled(True)
         self.name_edit.setEnabled(True)
+        self.static_checkbox.setChecked(obj.static)
 
         if hasattr(obj, "material") and obj.material:
             mat = obj.material
@@ -602,6 +631,10 @@ class PropertiesPanel(QWidget):
         if self.current_obj:
             self.current_obj.name = self.name_edit.text()
 
+    def _on_static_changed(self, checked):
+        if self.current_obj:
+            self.current_obj.static = checked
+
     def _make_on_vec3_changed(self, vec_index, comp_index):
         # vec_index: 0=location, 1=rotation, 2=scale
         def handler():
@@ -664,6 +697,7 @@ class PropertiesPanel(QWidget):
         self.specular_edit.setEnabled(enabled)
         # Name field
         self.name_edit.setEnabled(enabled)
+        self.static_checkbox.setEnabled(enabled)
 
 class ContentBrowser(QTreeView):
     def __init__(self):
@@ -690,7 +724,7 @@ class Scene:
         return [obj.name for obj in self.objects]
 
 class SceneObject:
-    def __init__(self, name, obj_type, mesh=None, location=None, rotation=None, scale=None, material=None):
+    def __init__(self, name, obj_type, mesh=None, location=None, rotation=None, scale=None, material=None, light=None, static=False):
         self.name = name
         self.type = obj_type
         self.mesh = mesh  # This will be a MeshData object
@@ -698,6 +732,9 @@ class SceneObject:
         self.rotation = rotation if rotation is not None else [0.0, 0.0, 0.0]
         self.scale = scale if scale is not None else [1.0, 1.0, 1.0]
         self.material = material if material is not None else Material()
+        self.light = light  # Optional Light component, emitted from location
+        self.static = static  # Merged into a per-material batch (see rendering/static_batcher.py)
+        self.lod = 0  # Level of detail drawn; only shown by the LOD view mode until meshes carry LODs
         # Add more properties as needed (transform, mesh, etc.)
 
 class MeshData:
@@ -904,6 +941,7 @@ class MainEditor(QMainWindow):
         super().__init__()
         print("MainEditor initializing with scene:", scene)
         self.scene = scene
+        self.asset_manager = AssetManager()
         self.setWindowTitle("3D Editor")
         self.setGeometry(100, 100, 1280, 720)
 
@@ -950,6 +988,14 @@ class MainEditor(QMainWindow):
         file_menu.addAction(QAction("Open Scene", self))
         file_menu.addAction(QAction("Save Scene", self))
         file_menu.addAction(QAction("Exit", self, triggered=self.close))
+        tools_menu = menu.addMenu("Tools")
+        tools_menu.addAction(QAction("Mesh Memory Report", self, triggered=self.show_mesh_report))
+        tools_menu.addAction(QAction("GPU Memory Report", self, triggered=self.show_gpu_report))
+        tools_menu.addAction(QAction("Add Point Light", self, triggered=lambda: self.add_light("point")))
+        tools_menu.addAction(QAction("Add Spot Light", self, triggered=lambda: self.add_light("spot")))
+        dynamic_resolution_action = QAction("Dynamic Resolution", self, checkable=True, checked=True)
+        dynamic_resolution_action.toggled.connect(self.set_dynamic_resolution)
+        tools_menu.addAction(dynamic_resolution_action)
 
         # Set up timer for continuous updates
         self.timer = QTimer(self)
@@ -990,11 +1036,30 @@ class MainEditor(QMainWindow):
 
     def remove_object(self, obj):
         self.scene.remove_object(obj)
+        if obj.mesh is not None and self.asset_manager.release_mesh(obj.mesh):
+            # Last user gone: free its GPU range now instead of whenever it is collected
+            if self.viewport.rasteriser is not None:
+                self.viewport.rasteriser.release_mesh(obj.mesh)
         self.hierarchy_panel.update_items(self.scene.get_object_names())
 
+    def set_dynamic_resolution(self, enabled):
+        if self.viewport.dynamic_resolution is not None:
+            self.viewport.dynamic_resolution.enabled = enabled
+
+    def show_mesh_report(self):
+        QMessageBox.information(self, "Mesh Memory Report", self.asset_manager.format_report())
+
+    def show_gpu_report(self):
+        report = gpu_resources.format_report()
+        if self.viewport.rasteriser is not None:
+            arena = self.viewport.rasteriser.mesh_arena.report()
+            report += f"\n\nMesh arena: {arena['used_bytes'] / 1024:.1f} KiB used by {arena['allocations']} allocations"
+        QMessageBox.information(self, "GPU Memory Report", report)
+
     def add_object_to_scene_from_file(self, file_path, position=None):
         from .editor_UI import MeshData, SceneObject
-        mesh, base_color = MeshData.load_obj_mesh(file_path)
+        # Identical files share one MeshData (and one VAO in the rasteriser)
+        mesh, base_color = self.asset_manager.load_mesh(file_path, MeshData.load_obj_mesh)
         base_name = os.path.basename(file_path)
         name = self.get_unique_name(base_name)  # Get a unique name for the object
         print(f"Adding object at world-space position: {position}")  # Debug
@@ -1011,6 +1076,18 @@ class MainEditor(QMainWindow):
         self.add_object(scene_obj)
         print(f"Added object to scene: {name}")
 
+    def add_light(self, light_type):
+        # Place the light a little in front of the camera
+        cam = self.viewport.camera
+        forward = [
+            math.cos(cam.yaw) * math.cos(cam.pitch),
+            math.sin(cam.pitch),
+            math.sin(cam.yaw) * math.cos(cam.pitch)
+        ]
+        location = [p + f * 5.0 for p, f in zip(cam.pos, forward)]
+        name = self.get_unique_name("Point Light" if light_type == "point" else "Spot Light")
+        self.add_object(SceneObject(name=name, obj_type="Light", location=location, light=Light(light_type=light_type)))
+
     def on_outliner_selection(self, name):
         selected_obj = next((obj for obj in self.scene.objects if obj.name == name), None)
         self.properties_panel.set_object(selected_obj)
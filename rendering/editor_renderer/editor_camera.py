@@ -1,7 +1,7 @@
 import math
 import numpy as np
 from OpenGL.GL import *
-from OpenGL.GLU import gluLookAt, gluUnProject, gluPerspective
+from OpenGL.GLU import gluLookAt, gluPerspective
 from utils.settings import *
 from pyrr import Matrix44, Vector3
 
@@ -30,6 +30,8 @@ class EditorCamera:
         self.fly_mode = True  # Always fly mode
         self.last_mouse_pos = None
         self.selected_object = None  # Add selected_object property
+        self._matrices_key = None  # camera state the cached matrices were built for
+        self._matrices = None
 
     def update(self, dt, keys, mouse_dx, mouse_dy, mouse_pos, mouse_wheel=0):
         # Speed control
@@ -121,13 +123,9 @@ class EditorCamera:
         x = int(mouse_pos[0])
         y = int(viewport_height - mouse_pos[1])  # Flip Y for OpenGL
 
-        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-        projection = glGetDoublev(GL_PROJECTION_MATRIX)
-        viewport = glGetIntegerv(GL_VIEWPORT)
-
         # Unproject near and far points
-        near = gluUnProject(x, y, 0.0, modelview, projection, viewport)
-        far  = gluUnProject(x, y, 1.0, modelview, projection, viewport)
+        near = self.unproject((x, y, 0.0), viewport_width, viewport_height)
+        far = self.unproject((x, y, 1.0), viewport_width, viewport_height)
 
         origin = np.array(near, dtype=np.float32)
         direction = np.array(far, dtype=np.float32) - origin
@@ -135,20 +133,51 @@ class EditorCamera:
 
         return origin, direction
 
-    def get_view_projection_matrices(self, viewport_width, viewport_height):
-        cam_pos = Vector3(self.pos)
-        forward = Vector3([
-            math.cos(self.yaw) * math.cos(self.pitch),
-            math.sin(self.pitch),
-            math.sin(self.yaw) * math.cos(self.pitch)
-        ])
-
-        view = Matrix44.look_at(cam_pos, cam_pos + forward, Vector3([0.0, 1.0, 0.0]))
-        projection = Matrix44.perspective_projection(
-            60.0, viewport_width / viewport_height, 0.1, 1000.0
-        )
+    def project(self, world_pos, viewport_width, viewport_height):
+        """
+        Window coordinates (x, y from the bottom left, depth 0..1) of a world
+        position, as gluProject gives; None when it is behind the camera
+        """
+        matrices = self.get_matrices(viewport_width, viewport_height)
+        clip = np.append(np.asarray(world_pos, dtype=np.float64), 1.0) @ matrices["view_projection"]
+        if clip[3] <= 0.0:
+            return None
+        return (np.append(clip[:3] / clip[3], 1.0) @ matrices["viewport"])[:3]
+
+    def unproject(self, window_pos, viewport_width, viewport_height):
+        """World position of window coordinates, as gluUnProject gives"""
+        matrices = self.get_matrices(viewport_width, viewport_height)
+        world = np.append(np.asarray(window_pos, dtype=np.float64), 1.0) @ matrices["inverse_window"]
+        return world[:3] / world[3]
+
+    def get_matrices(self, viewport_width, viewport_height):
+        """
+        View, projection and viewport matrices (row-vector, like pyrr), with
+        their products and inverses, rebuilt only when the camera moves or
+        the viewport is resized
+        """
+        key = (tuple(self.pos), self.yaw, self.pitch, viewport_width, viewport_height)
+        if self._matrices_key != key:
+            view = self.get_view_matrix()
+            projection = self.get_projection_matrix(viewport_width, viewport_height)
+            view_projection = np.asarray(view, dtype=np.float64) @ np.asarray(projection, dtype=np.float64)
+            # NDC to window: x, y over the viewport, depth from [-1, 1] to [0, 1]
+            viewport = np.diag([viewport_width / 2.0, viewport_height / 2.0, 0.5, 1.0])
+            viewport[3, :3] = [viewport_width / 2.0, viewport_height / 2.0, 0.5]
+            self._matrices = {
+                "view": view,
+                "projection": projection,
+                "view_projection": view_projection,
+                "inverse_view_projection": np.linalg.inv(view_projection),
+                "viewport": viewport,
+                "inverse_window": np.linalg.inv(view_projection @ viewport),
+            }
+            self._matrices_key = key
+        return self._matrices
 
-        return view, projection
+    def get_view_projection_matrices(self, viewport_width, viewport_height):
+        matrices = self.get_matrices(viewport_width, viewport_height)
+        return matrices["view"], matrices["projection"]
 
     def get_view_and_projection(self, viewport_width, viewport_height):
         """Alias for get_view_projection_matrices to maintain compatibility"""
@@ -9,6 +9,8 @@ from rendering.texture_loader import load_texture
 from PIL import Image, ImageDraw, ImageFont
 import os
 from rendering.rasteriser import Rasteriser
+from rendering.static_batcher import mesh_model_matrix
+from rendering.bvh import get_mesh_bvh
 from utils import input
 
 from rendering.my_shaders import Material
@@ -192,52 +194,23 @@ class EditorRenderer:
         self.camera.update(dt, keys, mouse_dx, mouse_dy, mouse_pos, mouse_wheel)
         self.editor.update_viewport()
 
-    def draw_world(self):
-        if not hasattr(self, "rasteriser") or self.rasteriser is None:
-            print("ERROR: No rasteriser available")
-            return
-            
+    def draw_world(self, view, projection):
+        """
+        Editor overlays for the selected object. Scene meshes are drawn by the
+        caller; view and projection are the matrices it drew them with.
+        """
         if not hasattr(self.editor, "scene"):
             print("ERROR: No scene available")
             return
-            
-        if len(self.editor.scene.objects) == 0:
-            return
-            
-        # Get camera position and matrices
-        cam_pos = Vector3(self.camera.pos)
-        look_dir = Vector3([
-            math.cos(self.camera.yaw) * math.cos(self.camera.pitch),
-            math.sin(self.camera.pitch),
-            math.sin(self.camera.yaw) * math.cos(self.camera.pitch)
-        ])
-        view = Matrix44.look_at(cam_pos, cam_pos + look_dir, Vector3([0, 1, 0]))
-        projection = Matrix44.perspective_projection(60, self.viewport_width / self.viewport_height, 0.1, 1000.0)
-
-        # Draw all scene objects
+
         for obj in self.editor.scene.objects:
             if obj.mesh:
-                # Draw object
-                self.rasteriser.draw_mesh(
-                    mesh=obj.mesh,
-                    position=obj.location,
-                    rotation=obj.rotation,
-                    scale=obj.scale,
-                    material=obj.material,
-                    view=view,
-                    projection=projection,
-                    camera_pos=cam_pos
-                )
-                
                 # Draw gizmo for selected object
                 if obj == self.selected_object:
                     # Save current OpenGL state
                     glPushAttrib(GL_ALL_ATTRIB_BITS)
                     glPushMatrix()
                     
-                    # Set viewport for gizmo
-                    glViewport(self.viewport_x, self.viewport_y, self.viewport_width, self.viewport_height)
-                    
                     # Set up matrices for gizmo
                     glMatrixMode(GL_PROJECTION)
                     glLoadMatrixf(projection.tolist())
@@ -495,18 +468,20 @@ class EditorRenderer:
         # Set up viewport
         glViewport(self.viewport_x, self.viewport_y, self.viewport_width, self.viewport_height)
         
-        # Set up perspective projection
+        # Camera matrices, cached on the camera, for both pipelines
+        view, projection = self.camera.get_view_and_projection(self.viewport_width, self.viewport_height)
         glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(60, self.viewport_width / self.viewport_height, 0.1, 1000.0)
+        glLoadMatrixf(projection.astype('float32'))
         glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-
-        # Apply camera view
-        self.camera.apply_view()
+        glLoadMatrixf(view.astype('float32'))
 
-        # Draw world content
-        self.draw_world()
+        # Draw world content, then its overlays with the same matrices
+        cam_pos = Vector3(self.camera.pos)
+        for obj in self.editor.scene.objects:
+            if obj.mesh and not obj.static:
+                self.rasteriser.draw_mesh(obj.mesh, obj.location, obj.rotation, obj.scale, obj.material,
+                                          view, projection, cam_pos)
+        self.draw_world(view, projection)
         if self.grid_visible:
             self.draw_grid()
 
@@ -553,175 +528,34 @@ class EditorRenderer:
 
 
 class RayIntersectionHandler:
+    """Picks scene objects with a world-space ray, through each mesh's cached BVH (rendering/bvh.py)"""
     def __init__(self):
-        try:
-            print ("\n\n")
-            print("[INTERSECT] RayIntersectionHandler constructed")
-            self.ray_origin = None
-            self.ray_direction = None 
-            self.intersections = []
-        except Exception as e:
-            print(f"Error initializing RayIntersectionHandler: {e}")
-            raise
-        
+        self.ray_origin = None
+        self.ray_direction = None
+        self.intersections = []
+
     def set_ray(self, origin, direction):
         self.ray_origin = Vector3(origin)
         self.ray_direction = Vector3(direction)
-        
-    def transform_ray_to_object_space(self, obj):
-        """Transform ray from world space to object space"""
-        try:
-            # Create transformation matrices
-            translation = Matrix44.from_translation(Vector3(obj.location))
-            rotation = Matrix44.from_eulers(Vector3(obj.rotation))
-            scale = Matrix44.from_scale(Vector3(obj.scale))
-            
-            # Combine transformations
-            obj_matrix = translation * rotation * scale
-            inv_matrix = obj_matrix.inverse
-            
-            # Transform ray points to homogeneous coordinates
-            ray_origin_h = np.array([*self.ray_origin, 1.0], dtype=np.float32)
-            ray_end_h = np.array([*(self.ray_origin + self.ray_direction * 1000.0), 1.0], dtype=np.float32)
-            
-            # Transform points using matrix multiplication
-            ray_origin_obj_h = np.dot(inv_matrix, ray_origin_h)
-            ray_end_obj_h = np.dot(inv_matrix, ray_end_h)
-            
-            # Convert back to 3D vectors and normalize
-            # Use numpy operations for division to avoid pyrr matrix operations
-            ray_origin_obj = Vector3(np.array(ray_origin_obj_h[:3]) / ray_origin_obj_h[3])
-            ray_end_obj = Vector3(np.array(ray_end_obj_h[:3]) / ray_end_obj_h[3])
-            print(f"[INTERSECT]   ray_origin_obj: {ray_origin_obj}, ray_end_obj: {ray_end_obj}")
-            direction_vec = Vector3(ray_end_obj - ray_origin_obj)
-            print(f"[INTERSECT]   direction_vec: {direction_vec}, length: {direction_vec.length}")
-            if direction_vec.length == 0:
-                print("[INTERSECT]   Zero-length ray direction in object space! Skipping object.")
-                return ray_origin_obj, None, obj_matrix
-            ray_dir_obj = direction_vec.normalized
-            
-            print(f"[INTERSECT]   Ray in object space: origin={ray_origin_obj}, dir={ray_dir_obj}")
-            
-            return ray_origin_obj, ray_dir_obj, obj_matrix
-            
-        except Exception as e:
-            print(f"Error in transform_ray_to_object_space: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None, None
-        
-    def test_triangle_intersection(self, v0, v1, v2, ray_origin, ray_dir):
-        """Test ray-triangle intersection using Möller–Trumbore algorithm"""
-        try:
-            # Ensure all inputs are Vector3
-            v0 = Vector3(v0)
-            v1 = Vector3(v1)
-            v2 = Vector3(v2)
-            ray_origin = Vector3(ray_origin)
-            ray_dir = Vector3(ray_dir)
-            
-            edge1 = v1 - v0
-            edge2 = v2 - v0
-            h = ray_dir.cross(edge2)
-            a = edge1.dot(h)
-            
-            if abs(a) < 1e-6:  # Ray is parallel to triangle
-                return None
-                
-            f = 1.0 / a
-            s = ray_origin - v0
-            u = f * s.dot(h)
-            
-            if u < 0.0 or u > 1.0:
-                return None
-                
-            q = s.cross(edge1)
-            v = f * ray_dir.dot(q)
-            
-            if v < 0.0 or u + v > 1.0:
-                return None
-                
-            t = f * edge2.dot(q)
-            
-            if t > 1e-6:  # Intersection found
-                return t
-                
-            return None
-        except Exception as e:
-            print(f"[INTERSECT] Error in test_triangle_intersection: {e}")
-            return None
-        
-    def transform_intersection_to_world_space(self, intersection_obj, obj_matrix):
-        """Transform intersection point from object space back to world space"""
-        try:
-            # Convert intersection point to homogeneous coordinates
-            intersection_h = np.array([*intersection_obj, 1.0], dtype=np.float32)
-            
-            # Transform using matrix multiplication
-            intersection_world_h = np.dot(obj_matrix, intersection_h)
-            
-            # Convert back to 3D vector, handling perspective division
-            if abs(intersection_world_h[3]) > 1e-6:  # Avoid division by zero
-                intersection_world = Vector3([
-                    intersection_world_h[0] / intersection_world_h[3],
-                    intersection_world_h[1] / intersection_world_h[3],
-                    intersection_world_h[2] / intersection_world_h[3]
-                ])
-            else:
-                intersection_world = Vector3([
-                    intersection_world_h[0],
-                    intersection_world_h[1],
-                    intersection_world_h[2]
-                ])
-                
-            return intersection_world
-        except Exception as e:
-            print(f"[INTERSECT] Error in transform_intersection_to_world_space: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-        
+
     def find_intersections(self, objects):
-        print("[INTERSECT] find_intersections CALLED")
+        """(object, distance, world point) for each object the ray hits, nearest first"""
         self.intersections = []
-        print("[INTERSECT] Starting intersection tests...")
+        origin = np.asarray(self.ray_origin, dtype=np.float64)
+        direction = np.asarray(self.ray_direction, dtype=np.float64)
         for obj in objects:
-            print(f"[INTERSECT] Checking object: {getattr(obj, 'name', str(obj))}")
             if not obj.mesh:
-                print("[INTERSECT]   No mesh, skipping.")
                 continue
-            try:
-                # Transform ray to object space
-                ray_origin_obj, ray_dir_obj, obj_matrix = self.transform_ray_to_object_space(obj)
-                print(f"[INTERSECT]   Ray in object space: origin={ray_origin_obj}, dir={ray_dir_obj}")
-                vertices = obj.mesh.vertices
-                indices = obj.mesh.indices
-                print(f"[INTERSECT]   Mesh vertices: {len(vertices)//3}, indices: {len(indices)}")
-                found = False
-                for i in range(0, len(indices), 3):
-                    # Extract vertex positions as Vector3
-                    v0 = Vector3(vertices[indices[i]*3:indices[i]*3+3])
-                    v1 = Vector3(vertices[indices[i+1]*3:indices[i+1]*3+3])
-                    v2 = Vector3(vertices[indices[i+2]*3:indices[i+2]*3+3])
-                    
-                    t = self.test_triangle_intersection(v0, v1, v2, ray_origin_obj, ray_dir_obj)
-                    if t is not None:
-                        intersection_obj = ray_origin_obj + ray_dir_obj * t
-                        intersection = self.transform_intersection_to_world_space(intersection_obj, obj_matrix)
-                        dist = (intersection - self.ray_origin).length
-                        self.intersections.append((obj, dist, intersection))
-                        found = True
-                        print(f"[INTERSECT]   Found intersection at distance {dist}")
-                if found:
-                    print(f"[INTERSECT]   Intersection found for object: {getattr(obj, 'name', str(obj))}")
-                else:
-                    print(f"[INTERSECT]   No intersection for object: {getattr(obj, 'name', str(obj))}")
-            except Exception as e:
-                print(f"[INTERSECT]   Error testing object {getattr(obj, 'name', str(obj))}: {e}")
-                import traceback
-                traceback.print_exc()
+            # The ray goes into mesh space through the same matrix the renderer draws with.
+            # Row-vector matrices; the direction is not renormalised, so hit distances stay world-space.
+            inverse = np.linalg.inv(mesh_model_matrix(obj.location, obj.rotation, obj.scale))
+            local_origin = np.append(origin, 1.0) @ inverse
+            local_direction = np.append(direction, 0.0) @ inverse
+            hit = get_mesh_bvh(obj.mesh).intersect(local_origin[:3], local_direction[:3])
+            if hit is None:
                 continue
-        print(f"[INTERSECT] Total intersections found: {len(self.intersections)}")
+            t = hit[0]
+            self.intersections.append((obj, t * float(np.linalg.norm(direction)), Vector3(origin + direction * t)))
         # Sort intersections by distance
         self.intersections.sort(key=lambda x: x[1])
         return self.intersections
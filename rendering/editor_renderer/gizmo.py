@@ -2,8 +2,6 @@ import OpenGL.GL as gl
 import math
 import numpy as np
 from pyrr import Vector3, Matrix44
-from OpenGL.GL import glGetDoublev, GL_MODELVIEW_MATRIX, GL_PROJECTION_MATRIX
-from OpenGL.GLU import gluProject
 
 class Gizmo:
     def __init__(self):
@@ -285,7 +283,7 @@ class Gizmo:
         handle_screen = self._world_to_screen(handle_pos, camera, viewport)
                 
         # Check if handle is behind camera or off-screen
-        if handle_screen[0] < 0 or handle_screen[1] < 0:
+        if handle_screen is None or handle_screen[0] < 0 or handle_screen[1] < 0:
             return None
         
         # Check if mouse is within handle bounds
@@ -303,16 +301,12 @@ class Gizmo:
         return distance if distance < 25 else None
 
     def _world_to_screen(self, world_pos, camera, viewport):
-        from OpenGL.GL import glGetDoublev, GL_MODELVIEW_MATRIX, GL_PROJECTION_MATRIX
-        from OpenGL.GLU import gluProject
-        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-        projection = glGetDoublev(GL_PROJECTION_MATRIX)
-        screen_x, screen_y, screen_z = gluProject(
-            world_pos[0], world_pos[1], world_pos[2],
-            modelview, projection, viewport
-        )
+        window = camera.project(world_pos, viewport[2], viewport[3])
+        if window is None:
+            return None
+        screen_x = viewport[0] + window[0]
         # Flip y to match Qt's top-left origin
-        screen_y = viewport[3] + viewport[1] - screen_y
+        screen_y = viewport[3] - window[1]
         print(f"[GIZMO] World pos: {world_pos} -> Screen pos: ({screen_x}, {screen_y})")
         return (screen_x, screen_y)
 
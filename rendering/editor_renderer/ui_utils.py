@@ -1,15 +1,39 @@
 # UI utility functions for editor renderer
+import os
 import OpenGL.GL as gl
+from rendering.text_renderer import get_glyph_atlas, TextBatcher
+from rendering.gpu_resources import current_context
 
 # Example color constants
 COLOR_PANEL_BG = (0.2, 0.2, 0.2, 0.9)
 COLOR_PANEL_TITLE = (1.0, 1.0, 1.0, 1.0)
 
-# Example font stub (replace with actual font logic)
+DEFAULT_FONT_PATH = os.path.join("assets", "fonts", "arial.ttf")
+DEFAULT_FONT_SIZE = 16
+
+# One batcher per (GL context, font) so all UI text is a single draw
+_batchers = {}
+
 def get_default_font():
-    return None
+    return get_glyph_atlas(DEFAULT_FONT_PATH, DEFAULT_FONT_SIZE)
+
+def get_text_batcher(font=None):
+    font = font or get_default_font()
+    key = (current_context(), id(font))
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = TextBatcher(font)
+    return batcher
 
-# Example text rendering stub
 def draw_text(text, x, y, font=None, color=COLOR_PANEL_TITLE):
-    # Implement text rendering using your renderer's text system
-    pass 
\ No newline at end of file
+    """Queue text at (x, y) pixels from the top-left; drawn by flush_text()"""
+    get_text_batcher(font).add_text(text, x, y, color)
+
+def flush_text(width=None, height=None):
+    """Draw all text queued in the current context, one call per font"""
+    if width is None or height is None:
+        _, _, width, height = gl.glGetIntegerv(gl.GL_VIEWPORT)
+    context = current_context()
+    for (batcher_context, _), batcher in _batchers.items():
+        if batcher_context == context:
+            batcher.flush(width, height)
@@ -2,6 +2,15 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 from utils.settings import *
 from rendering.rasteriser import Rasteriser
+from rendering.dynamic_resolution import DynamicResolution
+from rendering.voxel_renderer import VoxelRenderer
+from rendering.raycaster import RaycastRenderer
+from rendering.gpu_resources import gpu_resources
+from world.pvs import load_pvs
+from world.bsp import load_bsp
+from world.chunk_mesher import voxel_grid
+from pyrr import Matrix44
+import numpy as np
 from enemies.enemy import Enemy
 from utils.logger import logger
 import traceback
@@ -20,16 +29,33 @@ class GameRenderer:
         self.game_map = game_map
         self.floor_texture = floor_texture
         self.enemies = []
+        self.dynamic_resolution = None
+        self.voxel_renderer = None
+        self.pvs = None
+        self.bsp = None
+        self.raycaster = None
         
         # Initialize rasteriser
         try:
             logger.log("Creating rasteriser...")
-            self.rasteriser = Rasteriser()
+            self.rasteriser = Rasteriser(hdr_output=True)
+            self.dynamic_resolution = DynamicResolution()
             if floor_texture:
                 logger.log("Setting floor texture in rasteriser...")
                 self.rasteriser.set_floor_texture(floor_texture)
             else:
                 logger.log("Warning: No floor texture provided")
+            if RENDER_BACKEND == "raycast":
+                # 2.5D wall columns straight from the map; no meshes needed
+                self.raycaster = RaycastRenderer(game_map)
+            else:
+                # Map blocks sample a texture array, so the whole map is one draw per chunk
+                self.voxel_renderer = VoxelRenderer(self.rasteriser, game_map)
+                # Baked once per map layout, then loaded from the cache
+                self.pvs = load_pvs(self.voxel_renderer.voxels)
+            self.bsp = load_bsp(voxel_grid(game_map))
+            # Collision uses the same compiled walls
+            self.player.bsp = self.bsp
             logger.log("Rasteriser created successfully")
         except Exception as e:
             logger.log(f"Error initializing rasteriser: {e}")
@@ -45,7 +71,18 @@ class GameRenderer:
             logger.log("Enemy added successfully")
 
     def render(self, delta_time):
+        # The scene is drawn into the HDR target at the dynamic scale and
+        # resolved to the window at the end, even if drawing fails
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        width, height = int(viewport[2]), int(viewport[3])
+        render_width, render_height = width, height
+        if self.dynamic_resolution:
+            render_width, render_height = self.dynamic_resolution.begin_frame(width, height)
         try:
+            if self.raycaster:
+                self.raycaster.render(self.player, self.enemies, render_width, render_height)
+                return  # end_frame still runs below
+
             logger.log("Starting game render...")
             # Clear the screen and depth buffer
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -58,9 +95,17 @@ class GameRenderer:
             glTranslatef(-self.player.x, -self.player.y, -self.player.z)
 
             # Render the world using the Rasteriser
-            if self.rasteriser:
+            if self.rasteriser and self.voxel_renderer:
                 logger.log("Rendering world with Rasteriser...")
-                self.rasteriser.render()
+                # Same camera as the fixed-function state set above (row-vector layout)
+                view = Matrix44(glGetFloatv(GL_MODELVIEW_MATRIX))
+                projection = Matrix44(glGetFloatv(GL_PROJECTION_MATRIX))
+                camera_pos = np.linalg.inv(view)[3, :3]
+                # The player moves in the (x, y) map plane; y is the map's z axis
+                visible = self.pvs.visible_chunks(self.player.x, self.player.y) if self.pvs else None
+                # Nearest walls first so early-Z rejects what they hide
+                order = self.bsp.chunk_order(self.player.x, self.player.y, self.voxel_renderer.chunk_size) if self.bsp else None
+                self.voxel_renderer.draw(view, projection, camera_pos, visible, order)
             else:
                 logger.log("Warning: Rasteriser not initialized")
 
@@ -72,6 +117,9 @@ class GameRenderer:
         except Exception as e:
             logger.log(f"Error in game render: {e}")
             traceback.print_exc()
+        finally:
+            if self.dynamic_resolution:
+                self.dynamic_resolution.end_frame(0, width, height)
 
     def render_enemies(self):
         try:
@@ -102,8 +150,20 @@ class GameRenderer:
             logger.log("Cleaning up game renderer...")
             # Clean up any resources
             self.enemies.clear()
+            if self.voxel_renderer:
+                self.voxel_renderer.release()
+                self.voxel_renderer = None
+            if self.raycaster:
+                self.raycaster.release()
+                self.raycaster = None
             if self.rasteriser:
+                self.rasteriser.release()
                 self.rasteriser = None
+            if self.dynamic_resolution:
+                self.dynamic_resolution.release()
+                self.dynamic_resolution = None
+            # Run the deletions queued above now; there may be no next frame
+            gpu_resources.process_pending()
             logger.log("Game renderer cleanup completed")
         except Exception as e:
             logger.log(f"Error in cleanup: {e}") 
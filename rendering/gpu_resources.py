@@ -0,0 +1,133 @@
+"""
+Bookkeeping for GL objects: the exact byte size of every tracked buffer,
+texture and renderbuffer by category, and a thread-safe queue so any thread
+(including garbage-collection finalizers) can request deletions that are
+then executed on the GL thread.
+"""
+
+import threading
+from OpenGL.GL import *
+from OpenGL import contextdata
+from utils.logger import logger
+
+
+def current_context():
+    try:
+        return contextdata.getContext()
+    except Exception:
+        return 0
+
+
+class GpuResourceManager:
+    def __init__(self):
+        # Re-entrant: a finalizer can fire (and queue work) while this thread holds the lock
+        self._lock = threading.RLock()
+        self._pending = []        # (context, callable) to run on the GL thread
+        self.allocations = {}     # (context, kind, id) -> (category, nbytes)
+
+    # --- tracking ---
+
+    def track(self, kind, gl_id, category, nbytes):
+        """Record (or update the size of) a GL object; kind is "buffer", "texture", ..."""
+        with self._lock:
+            self.allocations[(current_context(), kind, int(gl_id))] = (category, int(nbytes))
+
+    def untrack(self, kind, gl_id, context=None):
+        context = current_context() if context is None else context
+        with self._lock:
+            self.allocations.pop((context, kind, int(gl_id)), None)
+
+    def create_buffer(self, category, nbytes, usage=GL_DYNAMIC_DRAW):
+        """Allocate an uninitialised buffer of nbytes and track it"""
+        buffer = glGenBuffers(1)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, buffer)
+        glBufferData(GL_COPY_WRITE_BUFFER, nbytes, None, usage)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        self.track("buffer", buffer, category, nbytes)
+        return buffer
+
+    # --- deferred deletion ---
+
+    def run_on_gl_thread(self, callback, context=None):
+        """Queue callback for the next process_pending() on the GL thread. Safe from any thread."""
+        context = current_context() if context is None else context
+        with self._lock:
+            self._pending.append((context, callback))
+
+    # Off the GL thread pass the context the object belongs to explicitly
+
+    def delete_buffer(self, buffer, context=None):
+        self._queue_delete("buffer", buffer, context)
+
+    def delete_texture(self, texture, context=None):
+        self._queue_delete("texture", texture, context)
+
+    def delete_renderbuffer(self, renderbuffer, context=None):
+        self._queue_delete("renderbuffer", renderbuffer, context)
+
+    def delete_vertex_array(self, vao, context=None):
+        self._queue_delete("vertex_array", vao, context)
+
+    def delete_framebuffer(self, fbo, context=None):
+        self._queue_delete("framebuffer", fbo, context)
+
+    def delete_query(self, query, context=None):
+        self._queue_delete("query", query, context)
+
+    def _queue_delete(self, kind, gl_id, context):
+        gl_id = int(gl_id)
+        context = current_context() if context is None else context
+        self.run_on_gl_thread(lambda: self._delete_now(kind, gl_id, context), context)
+
+    def _delete_now(self, kind, gl_id, context):
+        if kind == "buffer":
+            glDeleteBuffers(1, [gl_id])
+        elif kind == "texture":
+            glDeleteTextures(1, [gl_id])
+        elif kind == "renderbuffer":
+            glDeleteRenderbuffers(1, [gl_id])
+        elif kind == "vertex_array":
+            glDeleteVertexArrays(1, [gl_id])
+        elif kind == "framebuffer":
+            glDeleteFramebuffers(1, [gl_id])
+        elif kind == "query":
+            glDeleteQueries(1, [gl_id])
+        self.untrack(kind, gl_id, context)
+
+    def process_pending(self):
+        """Run queued work for the current context. Call once per frame on the GL thread."""
+        context = current_context()
+        with self._lock:
+            ready = [callback for ctx, callback in self._pending if ctx == context]
+            self._pending = [(ctx, callback) for ctx, callback in self._pending if ctx != context]
+        for callback in ready:
+            try:
+                callback()
+            except Exception as e:
+                logger.log(f"Deferred GL release failed: {e}")
+        return len(ready)
+
+    # --- reporting ---
+
+    def bytes_by_category(self):
+        totals = {}
+        with self._lock:
+            for category, nbytes in self.allocations.values():
+                totals[category] = totals.get(category, 0) + nbytes
+        return totals
+
+    def total_bytes(self):
+        return sum(self.bytes_by_category().values())
+
+    def format_report(self):
+        lines = [f"{category}: {nbytes / (1024 * 1024):.2f} MiB"
+                 for category, nbytes in sorted(self.bytes_by_category().items(), key=lambda e: -e[1])]
+        lines.append(f"Total: {self.total_bytes() / (1024 * 1024):.2f} MiB")
+        with self._lock:
+            pending = len(self._pending)
+        if pending:
+            lines.append(f"Pending releases: {pending}")
+        return "\n".join(lines)
+
+
+gpu_resources = GpuResourceManager()
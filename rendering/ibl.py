@@ -0,0 +1,196 @@
+"""
+Image-based lighting precomputation for the split-sum approximation
+(Karis, "Real Shading in Unreal Engine 4"):
+
+- a GGX-prefiltered cubemap whose mip levels map to increasing roughness
+- a 2D BRDF LUT holding the Fresnel scale/bias for (NdotV, roughness)
+
+Everything here is NumPy/OpenCV only so it can run in worker processes; the
+Rasteriser uploads the results to GL.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from utils.cache import get_cache_path, hash_file, hash_strings
+from utils.logger import logger
+
+IBL_FACE_SIZE = 128
+IBL_MIP_LEVELS = 6
+IBL_SAMPLE_COUNT = 128
+BRDF_LUT_SIZE = 128
+BRDF_SAMPLE_COUNT = 256
+
+# Direction/sample pairs processed at once, to bound the (rows, samples, 3) temporaries
+CHUNK_PAIRS = 1 << 19
+
+
+def hammersley(count):
+    """Low-discrepancy 2D points in [0, 1)^2, shape (count, 2)"""
+    i = np.arange(count, dtype=np.uint32)
+    bits = i.copy()
+    bits = ((bits << 16) | (bits >> 16)) & 0xFFFFFFFF
+    bits = ((bits & 0x55555555) << 1) | ((bits & 0xAAAAAAAA) >> 1)
+    bits = ((bits & 0x33333333) << 2) | ((bits & 0xCCCCCCCC) >> 2)
+    bits = ((bits & 0x0F0F0F0F) << 4) | ((bits & 0xF0F0F0F0) >> 4)
+    bits = ((bits & 0x00FF00FF) << 8) | ((bits & 0xFF00FF00) >> 8)
+    return np.stack([i / count, bits.astype(np.float64) / 2.0 ** 32], axis=1)
+
+
+def importance_sample_ggx(xi, roughness):
+    """GGX half vectors in tangent space (z up), shape (count, 3)"""
+    a = roughness * roughness
+    phi = 2.0 * math.pi * xi[:, 0]
+    cos_theta = np.sqrt((1.0 - xi[:, 1]) / (1.0 + (a * a - 1.0) * xi[:, 1]))
+    sin_theta = np.sqrt(1.0 - cos_theta * cos_theta)
+    return np.stack([np.cos(phi) * sin_theta, np.sin(phi) * sin_theta, cos_theta], axis=1)
+
+
+def cube_face_directions(size):
+    """
+    Unit directions for every texel of the six GL cubemap faces
+    (+X, -X, +Y, -Y, +Z, -Z), shape (6, size, size, 3), row 0 first.
+    """
+    coords = (np.arange(size) + 0.5) / size * 2.0 - 1.0
+    t, s = np.meshgrid(coords, coords, indexing="ij")
+    one = np.ones_like(s)
+    faces = np.stack([
+        np.stack([one, -t, -s], axis=-1),
+        np.stack([-one, -t, s], axis=-1),
+        np.stack([s, one, t], axis=-1),
+        np.stack([s, -one, -t], axis=-1),
+        np.stack([s, -t, one], axis=-1),
+        np.stack([-s, -t, -one], axis=-1),
+    ])
+    return faces / np.linalg.norm(faces, axis=-1, keepdims=True)
+
+
+def sample_equirect(image, directions):
+    """Bilinear lookup of (N, 3) directions using the sky shader's mapping"""
+    height, width = image.shape[:2]
+    u = 0.5 + np.arctan2(directions[:, 2], directions[:, 0]) / (2.0 * math.pi)
+    v = 0.5 - np.arcsin(np.clip(directions[:, 1], -1.0, 1.0)) / math.pi
+    x = u * width - 0.5
+    y = v * height - 0.5
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    fx = (x - x0)[:, None]
+    fy = (y - y0)[:, None]
+    # Wrap horizontally (longitude), clamp at the poles
+    x0 = x0.astype(np.int64) % width
+    x1 = (x0 + 1) % width
+    y1 = np.clip(y0.astype(np.int64) + 1, 0, height - 1)
+    y0 = np.clip(y0.astype(np.int64), 0, height - 1)
+    top = image[y0, x0] * (1.0 - fx) + image[y0, x1] * fx
+    bottom = image[y1, x0] * (1.0 - fx) + image[y1, x1] * fx
+    return top * (1.0 - fy) + bottom * fy
+
+
+def downsample(image, width):
+    if image.shape[1] <= width:
+        return image
+    height = max(1, int(round(image.shape[0] * width / image.shape[1])))
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def tangent_frames(normals):
+    up = np.where(np.abs(normals[:, 2:3]) < 0.999, [[0.0, 0.0, 1.0]], [[1.0, 0.0, 0.0]])
+    tangent_x = np.cross(up, normals)
+    tangent_x /= np.linalg.norm(tangent_x, axis=1, keepdims=True)
+    tangent_y = np.cross(normals, tangent_x)
+    return tangent_x, tangent_y
+
+
+def prefilter_level(image, face_size, roughness, sample_count=IBL_SAMPLE_COUNT):
+    """
+    One mip level of the specular cubemap, shape (6, face_size, face_size, 3).
+    Uses the N = V = R assumption; the source is pre-blurred to roughly the
+    output texel size so low sample counts stay noise free.
+    """
+    normals = cube_face_directions(face_size).reshape(-1, 3)
+    source = downsample(image, face_size * 4)
+    if roughness <= 0.0:
+        return sample_equirect(source, normals).reshape(6, face_size, face_size, 3).astype(np.float32)
+
+    halfway = importance_sample_ggx(hammersley(sample_count), roughness)
+    result = np.empty((len(normals), 3), dtype=np.float64)
+    rows = max(1, CHUNK_PAIRS // sample_count)
+    for start in range(0, len(normals), rows):
+        n = normals[start:start + rows]
+        tangent_x, tangent_y = tangent_frames(n)
+        h = (tangent_x[:, None, :] * halfway[None, :, 0:1]
+             + tangent_y[:, None, :] * halfway[None, :, 1:2]
+             + n[:, None, :] * halfway[None, :, 2:3])
+        n_dot_h = np.sum(n[:, None, :] * h, axis=2, keepdims=True)
+        light = 2.0 * n_dot_h * h - n[:, None, :]
+        n_dot_l = np.maximum(np.sum(n[:, None, :] * light, axis=2), 0.0)
+        radiance = sample_equirect(source, light.reshape(-1, 3)).reshape(len(n), sample_count, 3)
+        weight = np.maximum(n_dot_l.sum(axis=1, keepdims=True), 1e-6)
+        result[start:start + rows] = (radiance * n_dot_l[:, :, None]).sum(axis=1) / weight
+    return result.reshape(6, face_size, face_size, 3).astype(np.float32)
+
+
+def integrate_brdf_lut(size=BRDF_LUT_SIZE, sample_count=BRDF_SAMPLE_COUNT):
+    """Split-sum scale (R) and bias (G); rows are roughness, columns NdotV"""
+    coords = (np.arange(size) + 0.5) / size
+    roughness, n_dot_v = np.meshgrid(coords, coords, indexing="ij")
+    roughness = roughness.reshape(-1, 1)
+    n_dot_v = n_dot_v.reshape(-1, 1)
+    xi = hammersley(sample_count)
+
+    # N = +Z, V in the XZ plane
+    a = roughness * roughness
+    phi = 2.0 * math.pi * xi[None, :, 0]
+    cos_theta = np.sqrt((1.0 - xi[None, :, 1]) / (1.0 + (a * a - 1.0) * xi[None, :, 1]))
+    sin_theta = np.sqrt(1.0 - cos_theta * cos_theta)
+    hx, hz = np.cos(phi) * sin_theta, cos_theta
+    vx, vz = np.sqrt(1.0 - n_dot_v * n_dot_v), n_dot_v
+    v_dot_h = vx * hx + vz * hz
+    n_dot_l = 2.0 * v_dot_h * hz - vz
+    n_dot_h = hz
+
+    k = a / 2.0
+    g_v = n_dot_v / (n_dot_v * (1.0 - k) + k)
+    g_l = np.maximum(n_dot_l, 1e-6) / (np.maximum(n_dot_l, 1e-6) * (1.0 - k) + k)
+    g_vis = g_v * g_l * np.maximum(v_dot_h, 0.0) / (np.maximum(n_dot_h, 1e-6) * n_dot_v)
+    g_vis = np.where(n_dot_l > 0.0, g_vis, 0.0)
+    fresnel = (1.0 - np.maximum(v_dot_h, 0.0)) ** 5
+    scale = ((1.0 - fresnel) * g_vis).mean(axis=1)
+    bias = (fresnel * g_vis).mean(axis=1)
+    return np.stack([scale, bias], axis=1).reshape(size, size, 2).astype(np.float32)
+
+
+def compute_ibl(image, face_size=IBL_FACE_SIZE, levels=IBL_MIP_LEVELS, lut_size=BRDF_LUT_SIZE):
+    """Prefilter every mip level and the BRDF LUT in worker processes"""
+    image = downsample(image, face_size * 4)
+    roughness = [level / (levels - 1) for level in range(levels)]
+    sizes = [max(1, face_size >> level) for level in range(levels)]
+    with ProcessPoolExecutor() as pool:
+        lut_future = pool.submit(integrate_brdf_lut, lut_size)
+        mip_futures = [pool.submit(prefilter_level, image, size, r) for size, r in zip(sizes, roughness)]
+        mips = [future.result() for future in mip_futures]
+        lut = lut_future.result()
+    return mips, lut
+
+
+def load_ibl(path, face_size=IBL_FACE_SIZE, levels=IBL_MIP_LEVELS, lut_size=BRDF_LUT_SIZE):
+    """
+    Prefiltered mips and BRDF LUT for an HDR file, cached on disk keyed by
+    the file's content hash and the prefilter parameters.
+    """
+    key = hash_strings(hash_file(path), face_size, levels, lut_size, IBL_SAMPLE_COUNT, BRDF_SAMPLE_COUNT)
+    cache_path = get_cache_path("ibl", key, "npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return [data[f"mip{level}"] for level in range(levels)], data["brdf_lut"]
+
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise RuntimeError(f"Failed to load HDR image: {path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32)
+    mips, lut = compute_ibl(image, face_size, levels, lut_size)
+    np.savez_compressed(cache_path, brdf_lut=lut, **{f"mip{level}": mip for level, mip in enumerate(mips)})
+    logger.log(f"Prefiltered IBL maps for {path}")
+    return mips, lut
@@ -0,0 +1,239 @@
+"""
+Octahedral impostors: far-away meshes drawn as one camera-facing quad.
+
+The baker renders a MeshData with the software rasteriser from frames x
+frames directions spread over the sphere by an octahedral map. Each view is
+an orthographic frame_size square around the mesh's bounding sphere. The
+albedo (alpha = coverage) and object-space normal of every view go into two
+atlases, cached on disk keyed by the mesh and material. At draw time every
+instance is one quad: the vertex shader picks the atlas view nearest to the
+direction the camera sees the object from, and orients the quad the way
+that view was baked.
+"""
+
+import hashlib
+import os
+import weakref
+import numpy as np
+from OpenGL.GL import *
+from rendering.my_shaders import IMPOSTOR_VERTEX_SHADER_SRC, IMPOSTOR_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.software_rasteriser import clip_near, TriangleSetup, rasterise, nearest_fragments
+from rendering.mesh_arena import mesh_vertex_data
+from rendering.instancing import bounding_sphere, MATRIX_BYTES
+from rendering.static_batcher import material_key
+from rendering.gpu_resources import gpu_resources
+from utils.cache import get_cache_path, hash_strings
+from utils.logger import logger
+
+IMPOSTOR_UNIT = 12  # atlases use this unit and the next
+SUPERSAMPLE = 2
+
+
+def octahedral_direction(u, v):
+    """Unit direction for octahedral coordinates in [-1, 1]; +Y is the centre of the map"""
+    x, z = np.asarray(u, dtype=np.float64), np.asarray(v, dtype=np.float64)
+    y = 1.0 - np.abs(x) - np.abs(z)
+    fold = y < 0.0
+    x, z = (np.where(fold, (1.0 - np.abs(z)) * np.sign(x), x),
+            np.where(fold, (1.0 - np.abs(x)) * np.sign(z), z))
+    direction = np.stack([x, y, z], axis=-1)
+    return direction / np.linalg.norm(direction, axis=-1, keepdims=True)
+
+
+def octahedral_coords(direction):
+    """Inverse of octahedral_direction"""
+    d = np.asarray(direction, dtype=np.float64)
+    d = d / np.abs(d).sum(axis=-1, keepdims=True)
+    x, y, z = d[..., 0], d[..., 1], d[..., 2]
+    fold = y < 0.0
+    return (np.where(fold, (1.0 - np.abs(z)) * np.where(x >= 0, 1.0, -1.0), x),
+            np.where(fold, (1.0 - np.abs(x)) * np.where(z >= 0, 1.0, -1.0), z))
+
+
+def frame_basis(direction):
+    """Right and up axes of the view looking back along direction (as the impostor vertex shader builds them)"""
+    reference = np.array([0.0, 1.0, 0.0]) if abs(direction[1]) < 0.999 else np.array([0.0, 0.0, 1.0])
+    right = np.cross(reference, direction)
+    right /= np.linalg.norm(right)
+    return right, np.cross(direction, right)
+
+
+def bake_view(positions, normals, indices, centre, radius, direction, size):
+    """(size, size, 4) coverage-weighted albedo alpha and (size, size, 3) normals, bottom row first"""
+    right, up = frame_basis(direction)
+    offset = positions - centre
+    clip = np.stack([offset @ right / radius, offset @ up / radius, -(offset @ direction) / radius,
+                     np.ones(len(positions))], axis=1)
+    soup = clip_near(np.concatenate([clip, normals], axis=1)[indices])
+    setup = TriangleSetup(soup, size, size)
+    pixel, depth, triangle, l1, l2 = rasterise(setup, size, size)
+    coverage = np.zeros(size * size)
+    normal = np.zeros((size * size, 3))
+    if len(pixel):
+        nearest = nearest_fragments(pixel, depth)
+        weights = np.stack([1.0 - l1[nearest] - l2[nearest], l1[nearest], l2[nearest]], axis=1)
+        normal[pixel[nearest]] = np.einsum("fi,fik->fk", weights, setup.vertices[triangle[nearest], :, 4:7])
+        coverage[pixel[nearest]] = 1.0
+    # The rasteriser writes the top row first; GL textures start at the bottom
+    return coverage.reshape(size, size)[::-1], normal.reshape(size, size, 3)[::-1]
+
+
+def downsample(image, factor):
+    height, width = image.shape[:2]
+    return image.reshape(height // factor, factor, width // factor, factor, *image.shape[2:]).mean(axis=(1, 3))
+
+
+def bake_impostor(mesh, material, frames=8, frame_size=64):
+    """
+    (albedo, normal) uint8 RGBA atlases of frames x frames views of frame_size
+    pixels, plus the mesh-space (centre, radius) the views were framed on
+    """
+    vertex_data, indices = mesh_vertex_data(mesh)
+    positions = vertex_data[:, :3].astype(np.float64)
+    normals = vertex_data[:, 3:].astype(np.float64)
+    indices = indices.astype(np.int64).reshape(-1, 3)
+    centre, radius = bounding_sphere(positions)
+    size = frame_size * SUPERSAMPLE
+    albedo = np.zeros((frames * frame_size, frames * frame_size, 4), dtype=np.uint8)
+    normal = np.zeros_like(albedo)
+    base_color = np.clip(np.asarray(material.base_color, dtype=np.float64), 0.0, 1.0)
+    for j in range(frames):
+        for i in range(frames):
+            u, v = (i + 0.5) / frames * 2.0 - 1.0, (j + 0.5) / frames * 2.0 - 1.0
+            coverage, view_normal = bake_view(positions, normals, indices, centre, radius,
+                                              octahedral_direction(u, v), size)
+            coverage = downsample(coverage, SUPERSAMPLE)
+            view_normal = downsample(view_normal, SUPERSAMPLE)
+            length = np.linalg.norm(view_normal, axis=-1, keepdims=True)
+            view_normal = np.where(length > 1e-6, view_normal / np.maximum(length, 1e-6), 0.0)
+
+            cell = (slice(j * frame_size, (j + 1) * frame_size), slice(i * frame_size, (i + 1) * frame_size))
+            albedo[cell + (slice(0, 3),)] = np.round(base_color * 255.0)
+            albedo[cell + (3,)] = np.round(coverage * 255.0)
+            normal[cell + (slice(0, 3),)] = np.round((view_normal * 0.5 + 0.5) * 255.0)
+            normal[cell + (3,)] = 255
+    return albedo, normal, centre, radius
+
+
+def load_impostor(mesh, material, frames=8, frame_size=64):
+    """bake_impostor, cached on disk keyed by the mesh data, base colour and layout"""
+    vertex_data, indices = mesh_vertex_data(mesh)
+    mesh_hash = hashlib.sha1(vertex_data.tobytes() + indices.tobytes()).hexdigest()
+    key = hash_strings(mesh_hash, tuple(material.base_color), frames, frame_size, SUPERSAMPLE)
+    cache_path = get_cache_path("impostors", key, "npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return data["albedo"], data["normal"], data["centre"], float(data["radius"])
+
+    albedo, normal, centre, radius = bake_impostor(mesh, material, frames, frame_size)
+    np.savez_compressed(cache_path, albedo=albedo, normal=normal, centre=centre, radius=radius)
+    logger.log(f"Baked {frames}x{frames} impostor atlas ({len(indices) // 3} triangles)")
+    return albedo, normal, centre, radius
+
+
+class ImpostorAtlas:
+    """GL textures of one baked impostor"""
+    def __init__(self, albedo, normal, centre, radius, frames):
+        self.frames = frames
+        self.centre = centre
+        self.radius = radius
+        self.albedo_texture = self.upload(albedo)
+        self.normal_texture = self.upload(normal)
+
+    def upload(self, image):
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, image.shape[1], image.shape[0], 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     np.ascontiguousarray(image))
+        # No mipmaps: they would blend neighbouring views together
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        gpu_resources.track("texture", texture, "impostors", image.nbytes)
+        return texture
+
+    def release(self):
+        gpu_resources.delete_texture(self.albedo_texture)
+        gpu_resources.delete_texture(self.normal_texture)
+
+
+class ImpostorRenderer:
+    """Bakes atlases on first use and draws each (mesh, material) group as instanced quads"""
+    def __init__(self, hdr_output=False, frames=8, frame_size=64):
+        self.frames = frames
+        self.frame_size = frame_size
+        self.program = shader_manager.get_program(
+            IMPOSTOR_VERTEX_SHADER_SRC, IMPOSTOR_FRAGMENT_SHADER_SRC, ["HDR_OUTPUT"] if hdr_output else None,
+            name="impostor")
+        self.atlases = weakref.WeakKeyDictionary()  # MeshData -> {material key: ImpostorAtlas}
+        self.vao = glGenVertexArrays(1)
+        self.instance_buffer = None
+        self.capacity = 0
+
+    def get_atlas(self, mesh, material):
+        per_mesh = self.atlases.get(mesh)
+        if per_mesh is None:
+            per_mesh = self.atlases[mesh] = {}
+        key = material_key(material)
+        atlas = per_mesh.get(key)
+        if atlas is None:
+            albedo, normal, centre, radius = load_impostor(mesh, material, self.frames, self.frame_size)
+            atlas = per_mesh[key] = ImpostorAtlas(albedo, normal, centre, radius, self.frames)
+        return atlas
+
+    def upload_instances(self, models):
+        models = np.ascontiguousarray(models, dtype=np.float32)
+        if len(models) > self.capacity:
+            if self.instance_buffer is not None:
+                gpu_resources.delete_buffer(self.instance_buffer)
+            self.capacity = max(len(models), 2 * self.capacity)
+            self.instance_buffer = gpu_resources.create_buffer("impostors", self.capacity * MATRIX_BYTES)
+            glBindVertexArray(self.vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+            for column in range(4):
+                glEnableVertexAttribArray(column)
+                glVertexAttribPointer(column, 4, GL_FLOAT, GL_FALSE, MATRIX_BYTES, ctypes.c_void_p(column * 16))
+                glVertexAttribDivisor(column, 1)
+            glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, models.nbytes, models)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, groups, view, projection, camera_pos, rasteriser):
+        """groups maps any key to (mesh, material, [model matrices]); one draw call per group"""
+        program = self.program
+        glUseProgram(program)
+        glUniformMatrix4fv(glGetUniformLocation(program, "view"), 1, GL_FALSE, view.astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE, projection.astype('float32'))
+        glUniform3fv(glGetUniformLocation(program, "viewPos"), 1, camera_pos.astype('float32'))
+        glUniform3f(glGetUniformLocation(program, "lightDirection"), *rasteriser.light_direction)
+        glUniform3fv(glGetUniformLocation(program, "shIrradiance"), 9, rasteriser.sky_irradiance)
+        glUniform1i(glGetUniformLocation(program, "albedoAtlas"), IMPOSTOR_UNIT)
+        glUniform1i(glGetUniformLocation(program, "normalAtlas"), IMPOSTOR_UNIT + 1)
+        for mesh, material, models in groups.values():
+            atlas = self.get_atlas(mesh, material)
+            self.upload_instances(models)
+            glUniform4f(glGetUniformLocation(program, "boundingSphere"), *atlas.centre, atlas.radius)
+            glUniform1f(glGetUniformLocation(program, "frames"), atlas.frames)
+            glActiveTexture(GL_TEXTURE0 + IMPOSTOR_UNIT)
+            glBindTexture(GL_TEXTURE_2D, atlas.albedo_texture)
+            glActiveTexture(GL_TEXTURE0 + IMPOSTOR_UNIT + 1)
+            glBindTexture(GL_TEXTURE_2D, atlas.normal_texture)
+            glBindVertexArray(self.vao)
+            glDrawArraysInstanced(GL_TRIANGLE_STRIP, 0, 4, len(models))
+        glActiveTexture(GL_TEXTURE0)
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def release(self):
+        for per_mesh in self.atlases.values():
+            for atlas in per_mesh.values():
+                atlas.release()
+        self.atlases = weakref.WeakKeyDictionary()
+        if self.instance_buffer is not None:
+            gpu_resources.delete_buffer(self.instance_buffer)
+        gpu_resources.delete_vertex_array(self.vao)
@@ -0,0 +1,199 @@
+"""
+Instanced drawing with GPU frustum culling, GL 3.3 only (runs on llvmpipe).
+
+Each InstanceBatch keeps every instance's model matrix in one buffer. A
+culling pass draws those as points with rasterisation disabled: the vertex
+shader tests the instance's bounding sphere against the frustum planes and
+the geometry shader emits the survivors into a compacted buffer through
+transform feedback. The survivor count comes back through a
+GL_TRANSFORM_FEEDBACK_PRIMITIVES_WRITTEN query that is read on a later
+frame, so the draw uses the newest culled buffer whose count is already
+known instead of stalling. That is normally last frame's, so CULL_MARGIN
+pads the spheres to cover one frame of camera movement.
+"""
+
+import numpy as np
+from OpenGL.GL import *
+from rendering.my_shaders import CULL_VERTEX_SHADER_SRC, CULL_GEOMETRY_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.mesh_arena import VERTEX_STRIDE
+from rendering.gpu_resources import gpu_resources
+
+MATRIX_BYTES = 16 * 4
+INSTANCE_MODEL_LOCATION = 5  # as the INSTANCED variant of VERTEX_SHADER_SRC
+
+# Bounding spheres grow by this fraction to hide the one frame of latency
+CULL_MARGIN = 0.1
+
+# Buffers per batch: one drawn, one being culled, one waiting on its query
+CULL_BUFFERS = 3
+
+
+def frustum_planes(view_projection):
+    """(6, 4) world-space planes, normals inwards, of a row-vector view @ projection matrix"""
+    m = np.asarray(view_projection, dtype=np.float64)
+    columns = [m[:, i] for i in range(4)]
+    planes = np.array([columns[3] + columns[0], columns[3] - columns[0],
+                       columns[3] + columns[1], columns[3] - columns[1],
+                       columns[3] + columns[2], columns[3] - columns[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def bounding_sphere(positions):
+    """Centre and radius around (N, 3) positions; the bounding box centre is close enough"""
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    centre = (positions.min(axis=0) + positions.max(axis=0)) * 0.5
+    return centre, float(np.linalg.norm(positions - centre, axis=1).max())
+
+
+def cull_spheres(centres, radii, planes):
+    """Mask of (N, 3) world-space spheres touching the frustum; the CPU reference for the culling shader"""
+    distances = centres @ planes[:, :3].T + planes[:, 3]
+    return np.all(distances >= -np.asarray(radii)[:, None], axis=1)
+
+
+def instance_spheres(transforms, centre, radius):
+    """World-space bounding spheres of (N, 4, 4) row-vector model matrices"""
+    centres = np.append(centre, 1.0) @ transforms
+    scales = np.linalg.norm(transforms[:, :3, :3], axis=2).max(axis=1)
+    return centres[:, :3], radius * scales
+
+
+class InstanceBatch:
+    """
+    Many copies of one arena mesh with one material. transforms are (N, 4, 4)
+    row-vector model matrices, as mesh_model_matrix builds.
+    """
+    def __init__(self, mesh, material, transforms):
+        self.mesh = mesh
+        self.material = material
+        self.centre, self.radius = bounding_sphere(mesh.vertices)
+        self.count = 0
+        self.capacity = 0
+        self.input_buffer = None
+        self.input_vao = glGenVertexArrays(1)
+        self.output_buffers = []
+        self.draw_vaos = [glGenVertexArrays(1) for _ in range(CULL_BUFFERS)]
+        self.vao_source = [None] * CULL_BUFFERS  # arena (vbo, ebo) each draw VAO was built for
+        self.queries = [int(q) for q in glGenQueries(CULL_BUFFERS)]
+        self.pending = []    # buffer indices culled, count not read yet
+        self.ready = None    # (buffer index, visible count) to draw
+        self.set_transforms(transforms)
+
+    def set_transforms(self, transforms):
+        transforms = np.ascontiguousarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+        self.count = len(transforms)
+        if self.count > self.capacity:
+            self.release_buffers()
+            self.capacity = max(self.count, 1)
+            nbytes = self.capacity * MATRIX_BYTES
+            self.input_buffer = gpu_resources.create_buffer("instances", nbytes)
+            self.output_buffers = [gpu_resources.create_buffer("instances", nbytes, GL_DYNAMIC_COPY)
+                                   for _ in range(CULL_BUFFERS)]
+            self.vao_source = [None] * CULL_BUFFERS
+            glBindVertexArray(self.input_vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self.input_buffer)
+            self.bind_matrix_attribute(0, divisor=0)
+            glBindVertexArray(0)
+            # Old outputs are gone; wait for the first cull into the new ones
+            self.pending, self.ready = [], None
+        glBindBuffer(GL_ARRAY_BUFFER, self.input_buffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, transforms.nbytes, transforms)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def bind_matrix_attribute(self, location, divisor):
+        """mat4 attribute over the bound GL_ARRAY_BUFFER; rows of the row-vector matrix become GLSL columns"""
+        for column in range(4):
+            glEnableVertexAttribArray(location + column)
+            glVertexAttribPointer(location + column, 4, GL_FLOAT, GL_FALSE, MATRIX_BYTES,
+                                  ctypes.c_void_p(column * 16))
+            glVertexAttribDivisor(location + column, divisor)
+
+    def draw_vao(self, index, mesh_arena):
+        """Arena vertices plus one culled instance buffer; rebuilt when the arena reallocates"""
+        source = (mesh_arena.vbo, mesh_arena.ebo)
+        if self.vao_source[index] != source:
+            glBindVertexArray(self.draw_vaos[index])
+            glBindBuffer(GL_ARRAY_BUFFER, mesh_arena.vbo)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(12))
+            glBindBuffer(GL_ARRAY_BUFFER, self.output_buffers[index])
+            self.bind_matrix_attribute(INSTANCE_MODEL_LOCATION, divisor=1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, mesh_arena.ebo)
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            self.vao_source[index] = source
+        return self.draw_vaos[index]
+
+    def collect(self, wait=False):
+        """Pick up finished culling queries; the newest becomes the buffer to draw"""
+        while self.pending:
+            index = self.pending[0]
+            if not wait and not glGetQueryObjectiv(self.queries[index], GL_QUERY_RESULT_AVAILABLE):
+                break
+            self.pending.pop(0)
+            self.ready = (index, int(glGetQueryObjectuiv(self.queries[index], GL_QUERY_RESULT)))
+
+    def free_buffer(self):
+        busy = set(self.pending)
+        if self.ready is not None:
+            busy.add(self.ready[0])
+        for index in range(CULL_BUFFERS):
+            if index not in busy:
+                return index
+        return None
+
+    def release_buffers(self):
+        if self.input_buffer is not None:
+            gpu_resources.delete_buffer(self.input_buffer)
+        for buffer in self.output_buffers:
+            gpu_resources.delete_buffer(buffer)
+        self.input_buffer, self.output_buffers = None, []
+
+    def release(self):
+        self.release_buffers()
+        gpu_resources.delete_vertex_array(self.input_vao)
+        for vao in self.draw_vaos:
+            gpu_resources.delete_vertex_array(vao)
+        glDeleteQueries(len(self.queries), self.queries)
+
+
+class InstanceCuller:
+    """The transform feedback culling program, shared by every InstanceBatch"""
+    def __init__(self, margin=CULL_MARGIN):
+        self.margin = margin
+        self.program = shader_manager.get_program(
+            CULL_VERTEX_SHADER_SRC, None, name="instance_cull",
+            geometry_src=CULL_GEOMETRY_SHADER_SRC, feedback_varyings=["culledModel"])
+        self.sphere_location = glGetUniformLocation(self.program, "boundingSphere")
+        self.planes_location = glGetUniformLocation(self.program, "frustumPlanes")
+
+    def cull(self, batch, view_projection):
+        """Queue culling of batch into a free buffer; skipped if every buffer is still in flight"""
+        batch.collect()
+        index = batch.free_buffer()
+        if index is None or batch.count == 0:
+            return
+        glUseProgram(self.program)
+        glUniform4f(self.sphere_location, *batch.centre, batch.radius * (1.0 + self.margin))
+        glUniform4fv(self.planes_location, 6, frustum_planes(view_projection).astype(np.float32))
+        glEnable(GL_RASTERIZER_DISCARD)
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, batch.output_buffers[index])
+        glBindVertexArray(batch.input_vao)
+        glBeginQuery(GL_TRANSFORM_FEEDBACK_PRIMITIVES_WRITTEN, batch.queries[index])
+        glBeginTransformFeedback(GL_POINTS)
+        glDrawArrays(GL_POINTS, 0, batch.count)
+        glEndTransformFeedback()
+        glEndQuery(GL_TRANSFORM_FEEDBACK_PRIMITIVES_WRITTEN)
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, 0)
+        glDisable(GL_RASTERIZER_DISCARD)
+        glBindVertexArray(0)
+        glUseProgram(0)
+        batch.pending.append(index)
+
+    def visible(self, batch):
+        """(buffer index, count) to draw this frame; blocks only before the first result exists"""
+        batch.collect(wait=batch.ready is None)
+        return batch.ready
@@ -0,0 +1,223 @@
+import math
+import numpy as np
+from OpenGL.GL import *
+from rendering.gpu_resources import gpu_resources
+from utils.logger import logger
+
+
+# Texture units reserved for the clustered light buffers
+LIGHT_DATA_UNIT = 4
+CLUSTER_DATA_UNIT = 5
+LIGHT_INDEX_UNIT = 6
+
+TEXELS_PER_LIGHT = 3
+
+
+class Light:
+    """
+    Light component for a SceneObject. The light sits at the object's location.
+    light_type is "point" or "spot"; angles are in radians.
+    """
+    def __init__(self,
+                 light_type="point",
+                 color=(1.0, 1.0, 1.0),
+                 intensity=1.0,
+                 radius=10.0,
+                 direction=(0.0, -1.0, 0.0),
+                 inner_angle=math.radians(20.0),
+                 outer_angle=math.radians(30.0)):
+        self.light_type = light_type
+        self.color = color
+        self.intensity = intensity
+        self.radius = radius
+        self.direction = direction
+        self.inner_angle = inner_angle
+        self.outer_angle = outer_angle
+
+
+def pack_lights(lights):
+    """
+    Pack (position, Light) pairs into an (N, 3, 4) float32 array:
+      texel 0: position.xyz, radius
+      texel 1: color * intensity, cos(inner angle)
+      texel 2: direction.xyz, cos(outer angle)
+    Point lights use cone cosines that never attenuate.
+    """
+    data = np.zeros((len(lights), TEXELS_PER_LIGHT, 4), dtype=np.float32)
+    if len(lights) == 0:
+        return data
+    components = [light for _, light in lights]
+    spot = np.array([light.light_type == "spot" for light in components])
+    direction = np.array([light.direction for light in components], dtype=np.float32)
+    length = np.linalg.norm(direction, axis=1, keepdims=True)
+    direction = np.divide(direction, length, out=direction, where=length > 0)
+
+    data[:, 0, :3] = [position for position, _ in lights]
+    data[:, 0, 3] = [light.radius for light in components]
+    data[:, 1, :3] = np.array([light.color for light in components], dtype=np.float32) \
+        * np.array([light.intensity for light in components], dtype=np.float32)[:, None]
+    data[:, 1, 3] = np.where(spot, np.cos([light.inner_angle for light in components]), -1.0)
+    data[:, 2, :3] = direction
+    data[:, 2, 3] = np.where(spot, np.cos([light.outer_angle for light in components]), -2.0)
+    return data
+
+
+class LightClusterer:
+    """
+    Bins lights into a view-space froxel grid (X tiles, Y tiles, Z exponential
+    depth slices). Everything is done with NumPy so it can run headless.
+    """
+    def __init__(self, grid=(16, 9, 24), near=0.1, far=1000.0):
+        self.grid = grid
+        self.near = near
+        self.far = far
+        self._projection_key = None
+        self.slice_bounds = None  # (Z, 2) view-space depth range per slice (positive distances)
+        self.x_bounds = None      # (X, Z, 2) view-space x range per tile column and slice
+        self.y_bounds = None      # (Y, Z, 2) view-space y range per tile row and slice
+
+    def update_projection(self, projection):
+        key = np.asarray(projection, dtype=np.float32).tobytes()
+        if key == self._projection_key:
+            return
+        self._projection_key = key
+
+        gx, gy, gz = self.grid
+        k = np.arange(gz + 1, dtype=np.float64)
+        depths = self.near * (self.far / self.near) ** (k / gz)
+        self.slice_bounds = np.stack([depths[:-1], depths[1:]], axis=1)
+
+        # View-space ray slope through each tile boundary (pyrr row-vector convention)
+        inverse = np.linalg.inv(np.asarray(projection, dtype=np.float64))
+
+        def slopes(count, axis):
+            ndc = np.linspace(-1.0, 1.0, count + 1)
+            points = np.zeros((count + 1, 4))
+            points[:, axis] = ndc
+            points[:, 2] = -1.0
+            points[:, 3] = 1.0
+            view_points = points @ inverse
+            view_points /= view_points[:, 3:4]
+            return view_points[:, axis] / -view_points[:, 2]
+
+        # A tile's extent grows linearly with depth, so its AABB over a slice is
+        # spanned by the slope at the near and far depth of that slice
+        def bounds(count, axis):
+            s = slopes(count, axis)
+            near_depth, far_depth = self.slice_bounds[:, 0], self.slice_bounds[:, 1]
+            lo = np.minimum(np.multiply.outer(s[:-1], near_depth), np.multiply.outer(s[:-1], far_depth))
+            hi = np.maximum(np.multiply.outer(s[1:], near_depth), np.multiply.outer(s[1:], far_depth))
+            return np.stack([lo, hi], axis=-1)
+
+        self.x_bounds = bounds(gx, 0)
+        self.y_bounds = bounds(gy, 1)
+
+    def assign(self, centers_view, radii):
+        """
+        centers_view: (N, 3) light positions in view space, radii: (N,)
+        Returns (cluster_data, light_indices): per-cluster (offset, count) as
+        uint32 (C, 2) in x-fastest order, and the flat uint32 light index list.
+        """
+        gx, gy, gz = self.grid
+        cluster_count = gx * gy * gz
+        n = len(radii)
+        if n == 0:
+            return np.zeros((cluster_count, 2), dtype=np.uint32), np.zeros(1, dtype=np.uint32)
+
+        centers = np.asarray(centers_view, dtype=np.float64)
+        r2 = np.asarray(radii, dtype=np.float64) ** 2
+        depth = -centers[:, 2]
+
+        # The AABB distance is separable: x depends on (tile column, slice),
+        # y on (tile row, slice) and z on the slice alone
+        def axis_dist2(value, lo, hi):
+            return np.maximum(lo - value, 0.0) ** 2 + np.maximum(value - hi, 0.0) ** 2
+
+        dz2 = axis_dist2(depth[:, None], self.slice_bounds[None, :, 0], self.slice_bounds[None, :, 1])
+        dx2 = axis_dist2(centers[:, 0, None, None], self.x_bounds[None, :, :, 0], self.x_bounds[None, :, :, 1])
+        dy2 = axis_dist2(centers[:, 1, None, None], self.y_bounds[None, :, :, 0], self.y_bounds[None, :, :, 1])
+
+        # Only (light, slice) pairs whose depth range the sphere reaches need the
+        # full tile test, which keeps the work proportional to the lights' extent
+        pair_light, pair_slice = np.nonzero(dz2 <= r2[:, None])
+        remaining = r2[pair_light] - dz2[pair_light, pair_slice]
+        dist2 = dy2[pair_light, :, pair_slice][:, :, None] + dx2[pair_light, :, pair_slice][:, None, :]
+        pair, tile_y, tile_x = np.nonzero(dist2 <= remaining[:, None, None])
+
+        cluster_ids = tile_x + gx * (tile_y + gy * pair_slice[pair])
+        order = np.argsort(cluster_ids, kind="stable")
+        cluster_ids = cluster_ids[order]
+        light_ids = pair_light[pair][order]
+        counts = np.bincount(cluster_ids, minlength=cluster_count)
+        offsets = np.cumsum(counts) - counts
+        cluster_data = np.stack([offsets, counts], axis=1).astype(np.uint32)
+        light_indices = light_ids.astype(np.uint32)
+        if len(light_indices) == 0:
+            light_indices = np.zeros(1, dtype=np.uint32)
+        return cluster_data, light_indices
+
+
+class ClusteredLightBuffers:
+    """GL texture buffers holding the packed lights and per-cluster index lists"""
+    def __init__(self, grid=(16, 9, 24), near=0.1, far=1000.0):
+        self.clusterer = LightClusterer(grid, near, far)
+        self.max_texels = glGetIntegerv(GL_MAX_TEXTURE_BUFFER_SIZE)
+        self.light_count = 0
+        self.buffers = {}
+        for name, fmt in (("lights", GL_RGBA32F), ("clusters", GL_RG32UI), ("indices", GL_R32UI)):
+            buf = glGenBuffers(1)
+            tex = glGenTextures(1)
+            glBindBuffer(GL_TEXTURE_BUFFER, buf)
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_STREAM_DRAW)
+            glBindTexture(GL_TEXTURE_BUFFER, tex)
+            glTexBuffer(GL_TEXTURE_BUFFER, fmt, buf)
+            self.buffers[name] = (buf, tex)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        gx, gy, gz = grid
+        self._upload("clusters", np.zeros((gx * gy * gz, 2), dtype=np.uint32))
+
+    def _upload(self, name, data):
+        buf, _ = self.buffers[name]
+        glBindBuffer(GL_TEXTURE_BUFFER, buf)
+        # Orphan the previous storage so the driver never waits on last frame's draws
+        glBufferData(GL_TEXTURE_BUFFER, data.nbytes, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_TEXTURE_BUFFER, 0, data.nbytes, data)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        gpu_resources.track("buffer", buf, "lights", data.nbytes)
+
+    def update(self, lights, view, projection):
+        """lights: list of (world position, Light)"""
+        self.clusterer.update_projection(projection)
+        packed = pack_lights(lights)
+        if len(lights) > 0:
+            positions = np.ones((len(lights), 4))
+            positions[:, :3] = packed[:, 0, :3]
+            centers_view = (positions @ np.asarray(view, dtype=np.float64))[:, :3]
+            cluster_data, light_indices = self.clusterer.assign(centers_view, packed[:, 0, 3])
+        else:
+            cluster_data, light_indices = self.clusterer.assign(np.zeros((0, 3)), np.zeros(0))
+
+        if len(light_indices) > self.max_texels:
+            logger.log(f"Clustered lighting: {len(light_indices)} light references exceed the texture buffer limit, truncating")
+            light_indices = light_indices[:self.max_texels]
+            cluster_data[:, 0] = np.minimum(cluster_data[:, 0], self.max_texels)
+            cluster_data[:, 1] = np.minimum(cluster_data[:, 1], self.max_texels - cluster_data[:, 0])
+
+        self.light_count = len(lights)
+        self._upload("lights", packed.reshape(-1, 4) if len(lights) > 0 else np.zeros((1, 4), dtype=np.float32))
+        self._upload("clusters", cluster_data)
+        self._upload("indices", light_indices)
+
+    def bind(self, program, viewport_width, viewport_height):
+        for unit, name in ((LIGHT_DATA_UNIT, "lights"), (CLUSTER_DATA_UNIT, "clusters"), (LIGHT_INDEX_UNIT, "indices")):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_BUFFER, self.buffers[name][1])
+        glActiveTexture(GL_TEXTURE0)
+
+        glUniform1i(glGetUniformLocation(program, "lightData"), LIGHT_DATA_UNIT)
+        glUniform1i(glGetUniformLocation(program, "clusterData"), CLUSTER_DATA_UNIT)
+        glUniform1i(glGetUniformLocation(program, "lightIndices"), LIGHT_INDEX_UNIT)
+        glUniform3i(glGetUniformLocation(program, "clusterGrid"), *self.clusterer.grid)
+        glUniform2f(glGetUniformLocation(program, "screenSize"), float(viewport_width), float(viewport_height))
+        glUniform2f(glGetUniformLocation(program, "clusterDepthRange"), self.clusterer.near, self.clusterer.far)
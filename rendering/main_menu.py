@@ -1,8 +1,7 @@
 from OpenGL.GL import *
 from utils.settings import WIDTH, HEIGHT
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 import os
+from rendering.text_renderer import get_glyph_atlas, TextBatcher
 from utils import input
 import glfw
 
@@ -11,25 +10,22 @@ class MainMenu:
         # Initialize font
         self.font_size = 48
         self.font_path = os.path.join("assets", "fonts", "arial.ttf")  # Make sure to have this font file
-        self.font = ImageFont.truetype(self.font_path, self.font_size)
+        self.font = get_glyph_atlas(self.font_path, self.font_size)
+        self.text = TextBatcher(self.font)
 
         # Button labels
         labels = ["Start Game", "Enter Editor", "Options", "Quit"]
         self.buttons = []
-        self.text_textures = {}
         padding_x = 40
         padding_y = 24
         max_width = 0
         total_height = 0
         button_heights = []
-        # Calculate button sizes and create textures
+        # Calculate button sizes
         for label in labels:
-            bbox = self.font.getbbox(label)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            width = text_width + padding_x * 2
-            height = text_height + padding_y * 2
-            self.text_textures[label] = self.create_text_texture(label)
+            text_width, text_height = self.font.measure(label)
+            width = int(text_width) + padding_x * 2
+            height = int(text_height) + padding_y * 2
             self.buttons.append({"label": label, "rect": [0, 0, width, height]})
             max_width = max(max_width, width)
             button_heights.append(height)
@@ -45,44 +41,6 @@ class MainMenu:
             y = start_y + i * (height + button_gap)
             button["rect"] = [x, y, max_width, height]
 
-    def create_text_texture(self, text):
-        # Create a new image with transparent background
-        bbox = self.font.getbbox(text)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        image = Image.new('RGBA', (text_width, text_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
-        # Draw text with offset to handle negative bbox
-        draw.text((-bbox[0], -bbox[1]), text, font=self.font, fill=(255, 255, 255, 255))
-        # Convert to OpenGL texture
-        image_data = np.array(image)
-        width, height = image.size
-        # Generate texture
-        tex_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, tex_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, image_data)
-        return {"id": tex_id, "width": width, "height": height}
-
-    def draw_text(self, text, center):
-        texture = self.text_textures[text]
-        width, height = texture["width"], texture["height"]
-        x, y = center[0] - width//2, center[1] - height//2
-
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, texture["id"])
-        glColor4f(1, 1, 1, 1)
-        
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex2f(x, y)
-        glTexCoord2f(1, 0); glVertex2f(x + width, y)
-        glTexCoord2f(1, 1); glVertex2f(x + width, y + height)
-        glTexCoord2f(0, 1); glVertex2f(x, y + height)
-        glEnd()
-        
-        glDisable(GL_TEXTURE_2D)
-
     def draw(self):
         glDisable(GL_DEPTH_TEST)
         glEnable(GL_BLEND)
@@ -118,8 +76,11 @@ class MainMenu:
             glVertex2f(x + width, y + height)
             glVertex2f(x, y + height)
             glEnd()
-            # Draw text centered in button
-            self.draw_text(button["label"], (x + width//2, y + height//2))
+            # Queue text centered in button
+            self.text.add_text(button["label"], x + width / 2, y + height / 2, center=True)
+
+        # All labels in one draw
+        self.text.flush(WIDTH, HEIGHT)
 
         # Restore matrices
         glMatrixMode(GL_PROJECTION)
@@ -0,0 +1,118 @@
+"""
+All Materials packed into one RGBA32F texture buffer. Draws only set the
+`materialId` uniform; a material's texels are re-uploaded (as a sub-range)
+only when its version changes.
+"""
+
+import weakref
+import numpy as np
+from OpenGL.GL import *
+from rendering.gpu_resources import gpu_resources
+
+# Texture unit reserved for the material table
+MATERIAL_TABLE_UNIT = 9
+
+TEXELS_PER_MATERIAL = 3
+
+
+def pack_material(material, out):
+    """
+    Write one material into a (3, 4) float32 view:
+      texel 0: base_color.rgb, metallic
+      texel 1: emissive_color.rgb, roughness
+      texel 2: specular, unused
+    """
+    out[0, :3] = material.base_color
+    out[0, 3] = material.metallic
+    out[1, :3] = material.emissive_color
+    out[1, 3] = material.roughness
+    out[2, 0] = material.specular
+
+
+def dirty_ranges(slots):
+    """Sorted slot numbers -> list of (first slot, count) runs"""
+    ranges = []
+    for slot in slots:
+        if ranges and ranges[-1][0] + ranges[-1][1] == slot:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([slot, 1])
+    return ranges
+
+
+class MaterialTable:
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, TEXELS_PER_MATERIAL, 4), dtype=np.float32)
+        self.versions = np.full(capacity, -1, dtype=np.int64)
+        self.slots = weakref.WeakKeyDictionary()  # Material -> slot
+        self.free_slots = []
+        self.next_slot = 0
+        self.dirty = set()
+        self.upload_count = 0
+
+        self.buffer = glGenBuffers(1)
+        self.texture = glGenTextures(1)
+        self._allocate_storage()
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGBA32F, self.buffer)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+
+    def _allocate_storage(self):
+        glBindBuffer(GL_TEXTURE_BUFFER, self.buffer)
+        glBufferData(GL_TEXTURE_BUFFER, self.data.nbytes, self.data, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        gpu_resources.track("buffer", self.buffer, "materials", self.data.nbytes)
+
+    def get_id(self, material):
+        """Slot of a material, (re)packing it if it is new or has changed"""
+        slot = self.slots.get(material)
+        if slot is None:
+            slot = self._new_slot()
+            self.slots[material] = slot
+            # Dropped materials hand their slot back
+            weakref.finalize(material, self.free_slots.append, slot)
+        if self.versions[slot] != material.version:
+            pack_material(material, self.data[slot])
+            self.versions[slot] = material.version
+            self.dirty.add(slot)
+        return slot
+
+    def _new_slot(self):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.versions[slot] = -1
+            return slot
+        if self.next_slot == self.capacity:
+            self._grow(self.capacity * 2)
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def _grow(self, capacity):
+        data = np.zeros((capacity, TEXELS_PER_MATERIAL, 4), dtype=np.float32)
+        data[:self.capacity] = self.data
+        versions = np.full(capacity, -1, dtype=np.int64)
+        versions[:self.capacity] = self.versions
+        self.data, self.versions, self.capacity = data, versions, capacity
+        # The whole buffer is re-specified, so nothing is left to flush
+        self._allocate_storage()
+        self.dirty.clear()
+
+    def flush(self):
+        """Upload every changed material, one glBufferSubData per contiguous run"""
+        if not self.dirty:
+            return
+        glBindBuffer(GL_TEXTURE_BUFFER, self.buffer)
+        texel_bytes = TEXELS_PER_MATERIAL * 16
+        for first, count in dirty_ranges(sorted(self.dirty)):
+            glBufferSubData(GL_TEXTURE_BUFFER, first * texel_bytes, count * texel_bytes, self.data[first:first + count])
+            self.upload_count += 1
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        self.dirty.clear()
+
+    def bind(self, program):
+        glActiveTexture(GL_TEXTURE0 + MATERIAL_TABLE_UNIT)
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(glGetUniformLocation(program, "materialTable"), MATERIAL_TABLE_UNIT)
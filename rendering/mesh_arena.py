@@ -0,0 +1,294 @@
+"""
+Shared geometry storage: every mesh lives in one large vertex buffer and one
+large index buffer behind a single VAO, suballocated with a free list.
+Draws use the *BaseVertex entry points so switching meshes binds nothing.
+"""
+
+import bisect
+import weakref
+import numpy as np
+from functools import partial
+from OpenGL.GL import *
+from rendering.gpu_resources import gpu_resources, current_context
+from utils.logger import logger
+
+# Interleaved position (3 floats) + normal (3 floats)
+VERTEX_FLOATS = 6
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+INDEX_SIZE = 4  # uint32
+
+
+class FreeListAllocator:
+    """
+    First-fit allocator over [0, capacity) units. Free ranges are kept sorted
+    by offset and merged with their neighbours when released.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.free_ranges = [(0, capacity)] if capacity > 0 else []
+
+    def allocate(self, size):
+        """Return the offset of a free range of `size` units, or None"""
+        if size == 0:
+            return 0
+        for i, (offset, free_size) in enumerate(self.free_ranges):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free_ranges[i]
+                else:
+                    self.free_ranges[i] = (offset + size, free_size - size)
+                return offset
+        return None
+
+    def free(self, offset, size):
+        if size == 0:
+            return
+        i = bisect.bisect_left(self.free_ranges, (offset, 0))
+        # Merge with the following range, then the preceding one
+        if i < len(self.free_ranges) and self.free_ranges[i][0] == offset + size:
+            size += self.free_ranges.pop(i)[1]
+        if i > 0 and sum(self.free_ranges[i - 1]) == offset:
+            offset, previous_size = self.free_ranges[i - 1]
+            self.free_ranges[i - 1] = (offset, previous_size + size)
+        else:
+            self.free_ranges.insert(i, (offset, size))
+
+    def grow(self, new_capacity):
+        old_capacity = self.capacity
+        self.capacity = new_capacity
+        self.free(old_capacity, new_capacity - old_capacity)
+
+    def reset(self, used):
+        """After compaction everything below `used` is allocated and the rest free"""
+        self.free_ranges = [(used, self.capacity - used)] if used < self.capacity else []
+
+    def free_units(self):
+        return sum(size for _, size in self.free_ranges)
+
+    def largest_free(self):
+        return max((size for _, size in self.free_ranges), default=0)
+
+
+class MeshAllocation:
+    """Where one mesh's data lives inside the arena (in vertices / indices)"""
+    def __init__(self, base_vertex, vertex_count, first_index, index_count):
+        self.base_vertex = base_vertex
+        self.vertex_count = vertex_count
+        self.first_index = first_index
+        self.index_count = index_count
+        self.last_used = 0      # arena frame of the last draw, for eviction
+        self.finalizer = None   # set for allocations owned by a MeshData
+
+
+def interleave(positions, normals):
+    """(N, 3) positions and normals -> (N, 6) float32 vertex data"""
+    data = np.empty((len(positions), VERTEX_FLOATS), dtype=np.float32)
+    data[:, :3] = positions
+    data[:, 3:] = normals
+    return data
+
+
+def mesh_vertex_data(mesh):
+    positions = np.asarray(mesh.vertices, dtype=np.float32).reshape(-1, 3)
+    normals = np.zeros_like(positions)
+    if mesh.normals is not None and len(mesh.normals) == positions.size:
+        normals = np.asarray(mesh.normals, dtype=np.float32).reshape(-1, 3)
+    return interleave(positions, normals), np.asarray(mesh.indices, dtype=np.uint32)
+
+
+def build_draw_arrays(allocations):
+    """count, byte offset and base vertex arrays for glMultiDrawElementsBaseVertex"""
+    counts = np.array([a.index_count for a in allocations], dtype=np.int32)
+    offsets = np.array([a.first_index for a in allocations], dtype=np.uintp) * INDEX_SIZE
+    base_vertices = np.array([a.base_vertex for a in allocations], dtype=np.int32)
+    return counts, offsets, base_vertices
+
+
+class MeshArena:
+    """
+    One VBO + one EBO + one VAO for all arena meshes. Buffers grow by copying
+    on the GPU when full, and are compacted when free space is fragmented.
+    `generation` increases whenever allocations move so cached draw arrays
+    can be rebuilt.
+    """
+    def __init__(self, vertex_capacity=1 << 16, index_capacity=3 << 16):
+        self.context = current_context()
+        self.vertices = FreeListAllocator(vertex_capacity)
+        self.indices = FreeListAllocator(index_capacity)
+        self.vbo = self._create_buffer(vertex_capacity * VERTEX_STRIDE)
+        self.ebo = self._create_buffer(index_capacity * INDEX_SIZE)
+        self.vao = glGenVertexArrays(1)
+        self._setup_vao()
+
+        self.live = set()  # every allocation, for compaction
+        self.mesh_allocations = weakref.WeakKeyDictionary()  # MeshData -> MeshAllocation
+        self.generation = 0
+        self.frame = 0
+
+    def _create_buffer(self, nbytes):
+        return gpu_resources.create_buffer("mesh_arena", nbytes)
+
+    def _setup_vao(self):
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(12))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def _copy_buffer(self, source, nbytes, ranges):
+        """New buffer of nbytes holding (src_offset, dst_offset, size) byte ranges of source"""
+        target = self._create_buffer(nbytes)
+        glBindBuffer(GL_COPY_READ_BUFFER, source)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, target)
+        for src, dst, size in ranges:
+            if size > 0:
+                glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, src, dst, size)
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        gpu_resources.delete_buffer(source, self.context)
+        return target
+
+    # --- allocation ---
+
+    def allocate(self, vertex_data, indices):
+        """Upload (N, 6) float32 vertex data and uint32 indices; returns a MeshAllocation"""
+        base_vertex = self._reserve(self.vertices, len(vertex_data), "vertex")
+        allocation = MeshAllocation(base_vertex, len(vertex_data), 0, 0)
+        # Live before the index range is reserved: a compaction that reservation
+        # triggers must move (not free) the vertex range just taken
+        self.live.add(allocation)
+        allocation.first_index = self._reserve(self.indices, len(indices), "index")
+        allocation.index_count = len(indices)
+        self.write(allocation, vertex_data, indices)
+        return allocation
+
+    def write(self, allocation, vertex_data, indices=None):
+        """Overwrite an allocation in place (sizes must match)"""
+        if len(vertex_data):
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, allocation.base_vertex * VERTEX_STRIDE, vertex_data.nbytes, vertex_data)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        if indices is not None and len(indices):
+            # Not bound through the VAO so the arena VAO's element binding is untouched
+            glBindBuffer(GL_COPY_WRITE_BUFFER, self.ebo)
+            glBufferSubData(GL_COPY_WRITE_BUFFER, allocation.first_index * INDEX_SIZE, indices.nbytes, indices)
+            glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+
+    def release(self, allocation):
+        if allocation in self.live:
+            self.live.discard(allocation)
+            self.vertices.free(allocation.base_vertex, allocation.vertex_count)
+            self.indices.free(allocation.first_index, allocation.index_count)
+
+    def _reserve(self, allocator, size, kind):
+        offset = allocator.allocate(size)
+        if offset is not None:
+            return offset
+        # Enough space in total but fragmented: compact before growing
+        if allocator.free_units() >= size and allocator.free_units() * 4 >= allocator.capacity:
+            self.compact()
+            offset = allocator.allocate(size)
+            if offset is not None:
+                return offset
+        self._grow(allocator, max(allocator.capacity * 2, allocator.capacity + size), kind)
+        return allocator.allocate(size)
+
+    def _grow(self, allocator, capacity, kind):
+        if kind == "vertex":
+            old = allocator.capacity * VERTEX_STRIDE
+            self.vbo = self._copy_buffer(self.vbo, capacity * VERTEX_STRIDE, [(0, 0, old)])
+        else:
+            old = allocator.capacity * INDEX_SIZE
+            self.ebo = self._copy_buffer(self.ebo, capacity * INDEX_SIZE, [(0, 0, old)])
+        allocator.grow(capacity)
+        self._setup_vao()
+        logger.log(f"Mesh arena {kind} buffer grown to {capacity} entries")
+
+    def compact(self):
+        """Pack every live allocation to the start of both buffers"""
+        vertex_ranges, index_ranges = [], []
+        vertex_end = index_end = 0
+        for allocation in sorted(self.live, key=lambda a: a.base_vertex):
+            vertex_ranges.append((allocation.base_vertex * VERTEX_STRIDE, vertex_end * VERTEX_STRIDE,
+                                  allocation.vertex_count * VERTEX_STRIDE))
+            allocation.base_vertex = vertex_end
+            vertex_end += allocation.vertex_count
+        for allocation in sorted(self.live, key=lambda a: a.first_index):
+            index_ranges.append((allocation.first_index * INDEX_SIZE, index_end * INDEX_SIZE,
+                                 allocation.index_count * INDEX_SIZE))
+            allocation.first_index = index_end
+            index_end += allocation.index_count
+
+        self.vbo = self._copy_buffer(self.vbo, self.vertices.capacity * VERTEX_STRIDE, vertex_ranges)
+        self.ebo = self._copy_buffer(self.ebo, self.indices.capacity * INDEX_SIZE, index_ranges)
+        self.vertices.reset(vertex_end)
+        self.indices.reset(index_end)
+        self._setup_vao()
+        self.generation += 1
+        logger.log(f"Mesh arena compacted: {len(self.live)} allocations, {vertex_end} vertices, {index_end} indices")
+
+    # --- meshes ---
+
+    def get_mesh(self, mesh):
+        """The allocation for a MeshData, uploading it on first use"""
+        allocation = self.mesh_allocations.get(mesh)
+        if allocation is None:
+            vertex_data, indices = mesh_vertex_data(mesh)
+            allocation = self.allocate(vertex_data, indices)
+            self.mesh_allocations[mesh] = allocation
+            # Backstop for meshes dropped without release_mesh. Finalizers can
+            # run on any thread, so the release goes through the GL-thread queue
+            allocation.finalizer = weakref.finalize(
+                mesh, gpu_resources.run_on_gl_thread, partial(self.release, allocation), self.context)
+        allocation.last_used = self.frame
+        return allocation
+
+    def release_mesh(self, mesh):
+        """Free a mesh's range now, e.g. when the last scene object using it is removed"""
+        allocation = self.mesh_allocations.pop(mesh, None)
+        if allocation is not None:
+            allocation.finalizer.detach()
+            self.release(allocation)
+
+    def next_frame(self):
+        self.frame += 1
+
+    def evict_idle(self, max_idle_frames):
+        """Release meshes not drawn for max_idle_frames; they re-upload on their next draw"""
+        idle = [mesh for mesh, allocation in self.mesh_allocations.items()
+                if self.frame - allocation.last_used > max_idle_frames]
+        for mesh in idle:
+            self.release_mesh(mesh)
+        if idle:
+            logger.log(f"Mesh arena evicted {len(idle)} idle meshes")
+        return len(idle)
+
+    # --- drawing ---
+
+    def bind(self):
+        glBindVertexArray(self.vao)
+
+    def draw(self, allocation):
+        glDrawElementsBaseVertex(GL_TRIANGLES, allocation.index_count, GL_UNSIGNED_INT,
+                                 ctypes.c_void_p(allocation.first_index * INDEX_SIZE), allocation.base_vertex)
+
+    def multi_draw(self, counts, offsets, base_vertices):
+        if len(counts):
+            glMultiDrawElementsBaseVertex(GL_TRIANGLES, counts, GL_UNSIGNED_INT, offsets, len(counts), base_vertices)
+
+    def used_bytes(self):
+        return sum(a.vertex_count * VERTEX_STRIDE + a.index_count * INDEX_SIZE for a in self.live)
+
+    def report(self):
+        return {
+            "used_bytes": self.used_bytes(),
+            "vertex_capacity": self.vertices.capacity,
+            "vertex_free": self.vertices.free_units(),
+            "index_capacity": self.indices.capacity,
+            "index_free": self.indices.free_units(),
+            "allocations": len(self.live),
+        }
@@ -6,18 +6,40 @@ VERTEX_SHADER_SRC = """
 #version 330 core
 layout (location = 0) in vec3 aPos;
 layout (location = 1) in vec3 aNormal;
+#ifdef BLOCK_TEXTURES
+layout (location = 2) in vec2 aTexCoord;
+layout (location = 3) in float aLayer;  // block texture array layer
+
+out vec2 TexCoord;
+flat out float Layer;
+#endif
+#ifdef VERTEX_AO
+layout (location = 4) in float aAO;  // baked ambient occlusion, 1 = open
+
+out float AO;
+#endif
 
 out vec3 FragPos;  // World space position
 out vec3 Normal;   // World space normal
+out float ViewDepth;  // Distance along the view axis, for cluster lookup
 
+#ifdef INSTANCED
+layout (location = 5) in mat4 instanceModel;  // culled per-instance transforms (see rendering/instancing.py)
+#define model instanceModel
+#else
 uniform mat4 model;
+#endif
 uniform mat4 view;
 uniform mat4 projection;
 
+// Bit-identical to DEPTH_VERTEX_SHADER_SRC, so the lit pass can test GL_EQUAL after a depth pre-pass
+invariant gl_Position;
+
 void main()
 {
     // Transform position to world space
     FragPos = vec3(model * vec4(aPos, 1.0));
+    ViewDepth = -(view * vec4(FragPos, 1.0)).z;
     
     // Transform normal to world space
     Normal = mat3(transpose(inverse(model))) * aNormal;
@@ -25,6 +47,13 @@ void main()
     
     // Transform to clip space for rendering (apply view for camera perspective)
     gl_Position = projection * view * model * vec4(aPos, 1.0);
+#ifdef BLOCK_TEXTURES
+    TexCoord = aTexCoord;
+    Layer = aLayer;
+#endif
+#ifdef VERTEX_AO
+    AO = aAO;
+#endif
 }
 """
 
@@ -34,6 +63,16 @@ out vec4 FragColor;
 
 in vec3 FragPos;  // World space position
 in vec3 Normal;   // World space normal
+in float ViewDepth;
+#ifdef BLOCK_TEXTURES
+in vec2 TexCoord;
+flat in float Layer;
+
+uniform sampler2DArray blockTextures;  // one sRGB layer per block type
+#endif
+#ifdef VERTEX_AO
+in float AO;
+#endif
 
 struct DirectionalLight {
     vec3 direction;  // World space direction
@@ -42,14 +81,58 @@ struct DirectionalLight {
 };
 
 uniform vec3 viewPos;  // World space camera position
-uniform vec3 baseColor;
-uniform vec3 emissiveColor;
-uniform float metallic;
-uniform float roughness;
-uniform float specular;
+
+// Material parameters come from the shared table (see rendering/material_table.py)
+uniform samplerBuffer materialTable;  // 3 texels per material
+uniform int materialId;
+
+vec3 baseColor;
+vec3 emissiveColor;
+float metallic;
+float roughness;
+float specular;
+
+void loadMaterial()
+{
+    int texel = materialId * 3;
+    vec4 colorMetallic = texelFetch(materialTable, texel);
+    vec4 emissiveRoughness = texelFetch(materialTable, texel + 1);
+    baseColor = colorMetallic.rgb;
+    metallic = colorMetallic.a;
+    emissiveColor = emissiveRoughness.rgb;
+    roughness = emissiveRoughness.a;
+    specular = texelFetch(materialTable, texel + 2).r;
+}
 
 uniform DirectionalLight dirLight;
 
+// Clustered point/spot lights (see rendering/lighting.py for the packing)
+uniform samplerBuffer lightData;      // 3 texels per light
+uniform usamplerBuffer clusterData;   // (offset, count) per cluster
+uniform usamplerBuffer lightIndices;  // light indices grouped by cluster
+uniform ivec3 clusterGrid;
+uniform vec2 screenSize;
+uniform vec2 clusterDepthRange;       // near, far
+
+// Sky irradiance as L2 spherical harmonics, already divided by PI
+uniform vec3 shIrradiance[9];
+
+// Split-sum specular IBL (see rendering/ibl.py)
+uniform samplerCube prefilterMap;  // GGX-prefiltered sky, roughness per mip
+uniform sampler2D brdfLUT;         // (NdotV, roughness) -> Fresnel scale, bias
+uniform float prefilterMaxLod;
+
+#ifdef SHADOWS
+// Cascaded shadow maps for dirLight (see rendering/shadows.py)
+#define MAX_CASCADES 4
+uniform sampler2DShadow shadowAtlas;
+uniform int cascadeCount;
+uniform mat4 shadowMatrices[MAX_CASCADES];  // world -> atlas UV + depth
+uniform float cascadeEnds[MAX_CASCADES];    // view depth where each cascade ends
+uniform float cascadeTexels[MAX_CASCADES];  // world size of one shadow texel
+uniform float atlasTexel;
+#endif
+
 const float PI = 3.14159265359;
 
 // PBR functions
@@ -93,19 +176,29 @@ vec3 fresnelSchlick(float cosTheta, vec3 F0)
     return F0 + (1.0 - F0) * pow(clamp(1.0 - cosTheta, 0.0, 1.0), 5.0);
 }
 
-void main()
+vec3 fresnelSchlickRoughness(float cosTheta, vec3 F0, float roughness)
+{
+    return F0 + (max(vec3(1.0 - roughness), F0) - F0) * pow(clamp(1.0 - cosTheta, 0.0, 1.0), 5.0);
+}
+
+vec3 evaluateSH(vec3 n)
+{
+    return shIrradiance[0] * 0.282095
+         + shIrradiance[1] * (0.488603 * n.y)
+         + shIrradiance[2] * (0.488603 * n.z)
+         + shIrradiance[3] * (0.488603 * n.x)
+         + shIrradiance[4] * (1.092548 * n.x * n.y)
+         + shIrradiance[5] * (1.092548 * n.y * n.z)
+         + shIrradiance[6] * (0.315392 * (3.0 * n.z * n.z - 1.0))
+         + shIrradiance[7] * (1.092548 * n.x * n.z)
+         + shIrradiance[8] * (0.546274 * (n.x * n.x - n.y * n.y));
+}
+
+// Cook-Torrance BRDF for one light, returns outgoing radiance
+vec3 evaluateLight(vec3 N, vec3 V, vec3 L, vec3 radiance, vec3 F0)
 {
-    // World space vectors
-    vec3 N = normalize(Normal);
-    vec3 V = normalize(viewPos - FragPos);
-    vec3 L = normalize(-dirLight.direction);
     vec3 H = normalize(V + L);
-    
-    // Calculate reflectance at normal incidence
-    vec3 F0 = vec3(0.04); 
-    F0 = mix(F0, baseColor, metallic);
-    
-    // Cook-Torrance BRDF
+
     float NDF = DistributionGGX(N, H, roughness);   
     float G   = GeometrySmith(N, V, L, roughness);      
     vec3 F    = fresnelSchlick(max(dot(H, V), 0.0), F0);
@@ -118,12 +211,119 @@ void main()
     float denominator = 4.0 * max(dot(N, V), 0.0) * max(dot(N, L), 0.0) + 0.0001;
     vec3 specular = numerator / denominator;
     
-    // Add to outgoing radiance Lo
     float NdotL = max(dot(N, L), 0.0);        
-    vec3 Lo = (kD * baseColor / PI + specular) * dirLight.color * dirLight.intensity * NdotL;
+    return (kD * baseColor / PI + specular) * radiance * NdotL;
+}
+
+vec3 clusteredLights(vec3 N, vec3 V, vec3 F0)
+{
+    ivec2 tile = ivec2(gl_FragCoord.xy / screenSize * vec2(clusterGrid.xy));
+    float depthSlice = log(max(ViewDepth, clusterDepthRange.x) / clusterDepthRange.x)
+                     / log(clusterDepthRange.y / clusterDepthRange.x);
+    int slice = int(depthSlice * float(clusterGrid.z));
+    tile = clamp(tile, ivec2(0), clusterGrid.xy - 1);
+    slice = clamp(slice, 0, clusterGrid.z - 1);
+    int cluster = tile.x + clusterGrid.x * (tile.y + clusterGrid.y * slice);
+
+    uvec2 range = texelFetch(clusterData, cluster).xy;
+    vec3 Lo = vec3(0.0);
+    for (uint i = 0u; i < range.y; ++i) {
+        int light = int(texelFetch(lightIndices, int(range.x + i)).r) * 3;
+        vec4 positionRadius = texelFetch(lightData, light);
+        vec4 colorInner = texelFetch(lightData, light + 1);
+        vec4 directionOuter = texelFetch(lightData, light + 2);
+
+        vec3 toLight = positionRadius.xyz - FragPos;
+        float dist = length(toLight);
+        if (dist >= positionRadius.w) {
+            continue;
+        }
+        vec3 L = toLight / max(dist, 1e-4);
+
+        // Windowed inverse-square falloff reaching zero at the radius
+        float window = clamp(1.0 - pow(dist / positionRadius.w, 4.0), 0.0, 1.0);
+        float attenuation = window * window / (dist * dist + 1.0);
+
+        // Spot cone (point lights pack cosines that always give 1)
+        float cd = dot(-L, directionOuter.xyz);
+        attenuation *= clamp((cd - directionOuter.w) / max(colorInner.w - directionOuter.w, 1e-4), 0.0, 1.0);
+
+        Lo += evaluateLight(N, V, L, colorInner.rgb * attenuation, F0);
+    }
+    return Lo;
+}
+
+#ifdef SHADOWS
+float directionalShadow(vec3 N, vec3 L)
+{
+    if (cascadeCount == 0)
+        return 1.0;
+    int cascade = 0;
+    while (cascade < cascadeCount - 1 && ViewDepth > cascadeEnds[cascade])
+        cascade++;
+    if (ViewDepth > cascadeEnds[cascadeCount - 1])
+        return 1.0;
+
+    // Push the lookup off the surface by about a texel to avoid acne
+    float offset = cascadeTexels[cascade] * 1.5 * (1.0 - 0.5 * max(dot(N, L), 0.0));
+    vec3 P = (shadowMatrices[cascade] * vec4(FragPos + N * offset, 1.0)).xyz;
+
+    // 3x3 PCF on top of the bilinear comparison
+    float lit = 0.0;
+    for (int x = -1; x <= 1; x++)
+        for (int y = -1; y <= 1; y++)
+            lit += texture(shadowAtlas, vec3(P.xy + vec2(x, y) * atlasTexel, P.z));
+    return lit / 9.0;
+}
+#endif
+
+void main()
+{
+    loadMaterial();
+#ifdef BLOCK_TEXTURES
+    baseColor *= texture(blockTextures, vec3(TexCoord, Layer)).rgb;
+#endif
+#ifdef UNLIT
+    // Albedo view: no lighting, and the resolve tonemap is undone so colours show as authored
+    vec3 albedo = min(baseColor + emissiveColor, vec3(1.0));
+#ifdef HDR_OUTPUT
+    albedo = pow(albedo, vec3(2.2));
+    albedo = albedo / max(vec3(1.0) - albedo, vec3(0.001));
+#endif
+    FragColor = vec4(albedo, 1.0);
+    return;
+#endif
+
+    // World space vectors
+    vec3 N = normalize(Normal);
+    vec3 V = normalize(viewPos - FragPos);
+    vec3 L = normalize(-dirLight.direction);
     
-    // Ambient lighting
-    vec3 ambient = vec3(0.03) * baseColor;
+    // Calculate reflectance at normal incidence
+    vec3 F0 = vec3(0.04); 
+    F0 = mix(F0, baseColor, metallic);
+    
+    // Add to outgoing radiance Lo
+    vec3 Lo = evaluateLight(N, V, L, dirLight.color * dirLight.intensity, F0);
+#ifdef SHADOWS
+    Lo *= directionalShadow(N, L);
+#endif
+    Lo += clusteredLights(N, V, F0);
+    
+    // Ambient lighting: diffuse irradiance from the sky's SH projection
+    float NdotV = max(dot(N, V), 0.0);
+    vec3 kS = fresnelSchlickRoughness(NdotV, F0, roughness);
+    vec3 kD = (1.0 - kS) * (1.0 - metallic);
+    vec3 ambient = kD * max(evaluateSH(N), vec3(0.0)) * baseColor;
+    
+    // Ambient specular: prefiltered sky radiance times the split-sum BRDF
+    vec3 R = reflect(-V, N);
+    vec3 prefiltered = textureLod(prefilterMap, R, roughness * prefilterMaxLod).rgb;
+    vec2 envBRDF = texture(brdfLUT, vec2(NdotV, roughness)).rg;
+    ambient += prefiltered * (kS * envBRDF.x + envBRDF.y);
+#ifdef VERTEX_AO
+    ambient *= AO;
+#endif
     
     // Add emissive
     vec3 emissive = emissiveColor;
@@ -131,16 +331,284 @@ void main()
     // Final color
     vec3 color = ambient + Lo + emissive;
     
-    // HDR tonemapping
+#ifndef HDR_OUTPUT
+    // HDR tonemapping (with HDR_OUTPUT the resolve pass does this instead)
     color = color / (color + vec3(1.0));
     
     // Gamma correction
     color = pow(color, vec3(1.0/2.2));
+#endif
     
     FragColor = vec4(color, 1.0);
 }
 """
 
+# Depth-only pre-pass (see rendering/depth_prepass.py); gl_Position must match VERTEX_SHADER_SRC
+DEPTH_VERTEX_SHADER_SRC = """
+#version 330 core
+layout (location = 0) in vec3 aPos;
+
+uniform mat4 model;
+uniform mat4 view;
+uniform mat4 projection;
+
+invariant gl_Position;
+
+void main()
+{
+    gl_Position = projection * view * model * vec4(aPos, 1.0);
+}
+"""
+
+DEPTH_FRAGMENT_SHADER_SRC = """
+#version 330 core
+
+void main()
+{
+}
+"""
+
+# Editor heatmap view modes (see rendering/view_modes.py). Geometry uses DEPTH_VERTEX_SHADER_SRC.
+HEATMAP_COMMON_SRC = """
+// Black -> blue -> cyan -> green -> yellow -> red -> white over t in [0, 1]
+vec3 heatRamp(float t)
+{
+    const vec3 stops[7] = vec3[7](vec3(0.0, 0.0, 0.0), vec3(0.0, 0.0, 1.0), vec3(0.0, 1.0, 1.0),
+                                  vec3(0.0, 1.0, 0.0), vec3(1.0, 1.0, 0.0), vec3(1.0, 0.0, 0.0),
+                                  vec3(1.0, 1.0, 1.0));
+    float x = clamp(t, 0.0, 1.0) * 6.0;
+    int i = min(int(x), 5);
+    return mix(stops[i], stops[i + 1], x - float(i));
+}
+
+// Inverse of the resolve pass tonemap + gamma, so display colours survive it
+vec3 displayColor(vec3 color)
+{
+#ifdef HDR_OUTPUT
+    color = pow(clamp(color, 0.0, 1.0), vec3(2.2));
+    color = color / max(vec3(1.0) - color, vec3(0.001));
+#endif
+    return color;
+}
+"""
+
+HEATMAP_GEOMETRY_SHADER_SRC = """
+#version 330 core
+layout (triangles) in;
+layout (triangle_strip, max_vertices = 3) out;
+
+uniform vec2 screenSize;
+
+flat out float TriangleArea;  // pixels
+
+void main()
+{
+    vec2 p[3];
+    for (int i = 0; i < 3; i++)
+        p[i] = gl_in[i].gl_Position.xy / max(abs(gl_in[i].gl_Position.w), 1e-6) * 0.5 * screenSize;
+    float area = 0.5 * abs((p[1].x - p[0].x) * (p[2].y - p[0].y) - (p[2].x - p[0].x) * (p[1].y - p[0].y));
+    for (int i = 0; i < 3; i++)
+    {
+        TriangleArea = area;
+        gl_Position = gl_in[i].gl_Position;
+        EmitVertex();
+    }
+    EndPrimitive();
+}
+"""
+
+HEATMAP_FRAGMENT_SHADER_SRC = """
+#version 330 core
+out vec4 FragColor;
+
+#ifdef TRIANGLE_DENSITY
+flat in float TriangleArea;
+#endif
+uniform vec3 flatColor;  // draw-call and LOD modes
+""" + HEATMAP_COMMON_SRC + """
+void main()
+{
+#if defined(OVERDRAW)
+    // Counted with additive blending into OverdrawTarget
+    FragColor = vec4(1.0, 0.0, 0.0, 0.0);
+#else
+#ifdef TRIANGLE_DENSITY
+    // Triangles of a pixel or less are hot, 1024 pixels or more are cold
+    vec3 color = heatRamp(1.0 - clamp(log2(max(TriangleArea, 1.0)) / 10.0, 0.0, 1.0));
+#else
+    vec3 color = flatColor;
+#endif
+    FragColor = vec4(displayColor(color), 1.0);
+#endif
+}
+"""
+
+# Fullscreen pass turning the overdraw count into ramp colours; uses RESOLVE_VERTEX_SHADER_SRC
+OVERDRAW_FRAGMENT_SHADER_SRC = """
+#version 330 core
+out vec4 FragColor;
+
+uniform sampler2D overdrawCount;
+uniform float maxOverdraw;
+""" + HEATMAP_COMMON_SRC + """
+void main()
+{
+    // Same origin and size as the scene viewport, so pixels line up
+    float count = texelFetch(overdrawCount, ivec2(gl_FragCoord.xy), 0).r;
+    if (count < 0.5)
+        discard;
+    FragColor = vec4(displayColor(heatRamp(0.15 + 0.85 * (count - 1.0) / (maxOverdraw - 1.0))), 1.0);
+}
+"""
+
+# GPU instance culling (see rendering/instancing.py): the vertex shader tests each
+# instance's bounding sphere, the geometry shader emits survivors into transform feedback
+CULL_VERTEX_SHADER_SRC = """
+#version 330 core
+layout (location = 0) in mat4 instanceModel;
+
+uniform vec4 boundingSphere;   // mesh-space centre, radius
+uniform vec4 frustumPlanes[6]; // world space, normals pointing inwards
+
+out mat4 Model;
+flat out int Visible;
+
+void main()
+{
+    vec3 centre = (instanceModel * vec4(boundingSphere.xyz, 1.0)).xyz;
+    float scale = max(length(instanceModel[0].xyz), max(length(instanceModel[1].xyz), length(instanceModel[2].xyz)));
+    float radius = boundingSphere.w * scale;
+    Visible = 1;
+    for (int i = 0; i < 6; i++)
+    {
+        if (dot(frustumPlanes[i].xyz, centre) + frustumPlanes[i].w < -radius)
+            Visible = 0;
+    }
+    Model = instanceModel;
+}
+"""
+
+CULL_GEOMETRY_SHADER_SRC = """
+#version 330 core
+layout (points) in;
+layout (points, max_vertices = 1) out;
+
+in mat4 Model[];
+flat in int Visible[];
+
+out mat4 culledModel;  // captured by transform feedback
+
+void main()
+{
+    if (Visible[0] == 1)
+    {
+        culledModel = Model[0];
+        EmitVertex();
+        EndPrimitive();
+    }
+}
+"""
+
+# Octahedral impostors (see rendering/impostors.py): one quad per instance showing the nearest baked view
+IMPOSTOR_VERTEX_SHADER_SRC = """
+#version 330 core
+layout (location = 0) in mat4 instanceModel;
+
+uniform mat4 view;
+uniform mat4 projection;
+uniform vec3 viewPos;
+uniform vec4 boundingSphere;  // mesh-space centre, radius the views were framed on
+uniform float frames;         // views per atlas side
+
+out vec2 AtlasUV;
+flat out mat3 ObjectToWorld;
+
+const vec2 corners[4] = vec2[4](vec2(-1.0, -1.0), vec2(1.0, -1.0), vec2(-1.0, 1.0), vec2(1.0, 1.0));
+
+// Same layout as octahedral_coords / octahedral_direction, +Y at the centre
+vec2 octahedralCoords(vec3 d)
+{
+    d /= abs(d.x) + abs(d.y) + abs(d.z);
+    if (d.y < 0.0)
+        return (1.0 - abs(d.zx)) * vec2(d.x >= 0.0 ? 1.0 : -1.0, d.z >= 0.0 ? 1.0 : -1.0);
+    return d.xz;
+}
+
+vec3 octahedralDirection(vec2 p)
+{
+    vec3 d = vec3(p.x, 1.0 - abs(p.x) - abs(p.y), p.y);
+    if (d.y < 0.0)
+        d.xz = (1.0 - abs(d.zx)) * sign(d.xz);
+    return normalize(d);
+}
+
+void main()
+{
+    mat3 objectToWorld = mat3(instanceModel);
+    vec3 centre = (instanceModel * vec4(boundingSphere.xyz, 1.0)).xyz;
+    vec3 toCamera = normalize(inverse(objectToWorld) * (viewPos - centre));
+    vec2 cell = clamp(floor((octahedralCoords(toCamera) * 0.5 + 0.5) * frames), 0.0, frames - 1.0);
+
+    // Orient the quad as the chosen view was baked (frame_basis)
+    vec3 direction = octahedralDirection((cell + 0.5) / frames * 2.0 - 1.0);
+    vec3 reference = abs(direction.y) < 0.999 ? vec3(0.0, 1.0, 0.0) : vec3(0.0, 0.0, 1.0);
+    vec3 right = normalize(cross(reference, direction));
+    vec3 up = cross(direction, right);
+
+    vec2 corner = corners[gl_VertexID];
+    vec3 local = boundingSphere.xyz + (right * corner.x + up * corner.y) * boundingSphere.w;
+    gl_Position = projection * view * instanceModel * vec4(local, 1.0);
+    AtlasUV = (cell + corner * 0.5 + 0.5) / frames;
+    ObjectToWorld = objectToWorld;
+}
+"""
+
+IMPOSTOR_FRAGMENT_SHADER_SRC = """
+#version 330 core
+in vec2 AtlasUV;
+flat in mat3 ObjectToWorld;
+
+out vec4 FragColor;
+
+uniform sampler2D albedoAtlas;  // alpha = coverage
+uniform sampler2D normalAtlas;  // mesh-space normal
+uniform vec3 lightDirection;
+uniform vec3 shIrradiance[9];
+
+const float PI = 3.14159265359;
+
+vec3 evaluateSH(vec3 n)
+{
+    return shIrradiance[0] * 0.282095
+         + shIrradiance[1] * (0.488603 * n.y)
+         + shIrradiance[2] * (0.488603 * n.z)
+         + shIrradiance[3] * (0.488603 * n.x)
+         + shIrradiance[4] * (1.092548 * n.x * n.y)
+         + shIrradiance[5] * (1.092548 * n.y * n.z)
+         + shIrradiance[6] * (0.315392 * (3.0 * n.z * n.z - 1.0))
+         + shIrradiance[7] * (1.092548 * n.x * n.z)
+         + shIrradiance[8] * (0.546274 * (n.x * n.x - n.y * n.y));
+}
+
+void main()
+{
+    vec4 albedo = texture(albedoAtlas, AtlasUV);
+    if (albedo.a < 0.5)
+        discard;
+    vec3 N = normalize(ObjectToWorld * (texture(normalAtlas, AtlasUV).xyz * 2.0 - 1.0));
+    vec3 L = normalize(-lightDirection);
+
+    // Diffuse terms of FRAGMENT_SHADER_SRC only; specular is lost at this distance anyway
+    vec3 color = albedo.rgb * (max(dot(N, L), 0.0) / PI + max(evaluateSH(N), vec3(0.0)));
+
+#ifndef HDR_OUTPUT
+    color = color / (color + vec3(1.0));
+    color = pow(color, vec3(1.0/2.2));
+#endif
+    FragColor = vec4(color, 1.0);
+}
+"""
+
 SKY_VERTEX_SHADER_SRC = """
 #version 330 core
 layout(location = 0) in vec3 aPos;
@@ -179,6 +647,121 @@ void main() {
 }
 """
 
+# Fullscreen upscale + tonemap of the HDR scene target (see rendering/dynamic_resolution.py)
+RESOLVE_VERTEX_SHADER_SRC = """
+#version 330 core
+out vec2 ScreenUV;
+
+void main() {
+    // Single triangle covering the screen, no vertex buffer needed
+    vec2 pos = vec2(float((gl_VertexID << 1) & 2), float(gl_VertexID & 2));
+    ScreenUV = pos;
+    gl_Position = vec4(pos * 2.0 - 1.0, 0.0, 1.0);
+}
+"""
+
+RESOLVE_FRAGMENT_SHADER_SRC = """
+#version 330 core
+in vec2 ScreenUV;
+out vec4 FragColor;
+
+uniform sampler2D sceneColor;
+uniform vec2 uvScale;  // rendered region / allocated size
+uniform vec2 uvMax;
+uniform float exposure;
+
+void main() {
+    vec2 uv = min(ScreenUV * uvScale, uvMax);
+    vec3 color = texture(sceneColor, uv).rgb * exposure;
+    color = color / (color + vec3(1.0));
+    color = pow(color, vec3(1.0/2.2));
+    FragColor = vec4(color, 1.0);
+}
+"""
+
+TEXT_VERTEX_SHADER_SRC = """
+#version 330 core
+layout(location = 0) in vec2 aPos;   // pixels, origin top-left
+layout(location = 1) in vec2 aUV;
+layout(location = 2) in vec4 aColor;
+
+out vec2 UV;
+out vec4 Color;
+
+uniform vec2 screenSize;
+
+void main() {
+    UV = aUV;
+    Color = aColor;
+    vec2 ndc = aPos / screenSize * 2.0 - 1.0;
+    gl_Position = vec4(ndc.x, -ndc.y, 0.0, 1.0);
+}
+"""
+
+TEXT_FRAGMENT_SHADER_SRC = """
+#version 330 core
+in vec2 UV;
+in vec4 Color;
+out vec4 FragColor;
+
+uniform sampler2D glyphAtlas;
+
+void main() {
+    float value = texture(glyphAtlas, UV).r;
+#ifdef SDF_TEXT
+    // 0.5 is the glyph edge; fwidth keeps the edge one pixel wide at any scale
+    float width = max(fwidth(value) * 0.7, 1e-4);
+    float alpha = smoothstep(0.5 - width, 0.5 + width, value);
+#else
+    float alpha = value;
+#endif
+    FragColor = vec4(Color.rgb, Color.a * alpha);
+}
+"""
+
+RAYCAST_VERTEX_SHADER_SRC = """
+#version 330 core
+layout(location = 0) in vec3 aPos;   // pixels (origin top-left), depth 0-1
+layout(location = 1) in vec3 aUV;    // u, v, texture array layer
+layout(location = 2) in float aShade;
+
+out vec3 UV;
+out float Shade;
+
+uniform vec2 screenSize;
+
+void main() {
+    UV = aUV;
+    Shade = aShade;
+    vec2 ndc = aPos.xy / screenSize * 2.0 - 1.0;
+    gl_Position = vec4(ndc.x, -ndc.y, aPos.z * 2.0 - 1.0, 1.0);
+}
+"""
+
+RAYCAST_FRAGMENT_SHADER_SRC = """
+#version 330 core
+in vec3 UV;
+in float Shade;
+out vec4 FragColor;
+
+#ifdef WALL_STRIPS
+uniform sampler2DArray wallTextures;
+#else
+uniform sampler2D spriteTexture;
+#endif
+
+void main() {
+#ifdef WALL_STRIPS
+    vec4 color = texture(wallTextures, UV);
+#else
+    vec4 color = texture(spriteTexture, UV.xy);
+    // Cut-out sprites: transparent texels must not write depth
+    if (color.a < 0.5) discard;
+#endif
+    FragColor = vec4(color.rgb * Shade, 1.0);
+}
+"""
+
 def compile_shader_program(vertex_src=VERTEX_SHADER_SRC, fragment_src=FRAGMENT_SHADER_SRC):
     vertex_shader = shaders.compileShader(vertex_src, GL_VERTEX_SHADER)
     fragment_shader = shaders.compileShader(fragment_src, GL_FRAGMENT_SHADER)
@@ -202,4 +785,9 @@ class Material:
         self.emissive_color = emissive_color
         self.normal_map = normal_map
         self.ao_map = ao_map
-        self.base_color_map = base_color_map
\ No newline at end of file
+        self.base_color_map = base_color_map
+
+    def __setattr__(self, name, value):
+        # Every assignment bumps the version so MaterialTable re-uploads this material
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "version", self.__dict__.get("version", 0) + 1)
\ No newline at end of file
@@ -1,15 +1,15 @@
 from OpenGL.GL import *
 from utils.settings import WIDTH, HEIGHT
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 import os
+from rendering.text_renderer import get_glyph_atlas, TextBatcher
 
 class PauseMenu:
     def __init__(self):
         # Initialize font
         self.font_size = 48
         self.font_path = os.path.join("assets", "fonts", "arial.ttf")  # Make sure to have this font file
-        self.font = ImageFont.truetype(self.font_path, self.font_size)
+        self.font = get_glyph_atlas(self.font_path, self.font_size)
+        self.text = TextBatcher(self.font)
         
         # Define button positions and sizes
         button_width = 200
@@ -23,35 +23,6 @@ class PauseMenu:
             {"label": "Main Menu", "rect": (button_x, button_y_start + button_gap, button_width, button_height)},
             {"label": "Quit", "rect": (button_x, button_y_start + 2 * button_gap, button_width, button_height)}
         ]
-        
-        # Pre-render text textures
-        self.text_textures = {}
-        for button in self.buttons:
-            self.text_textures[button["label"]] = self.create_text_texture(button["label"])
-
-    def create_text_texture(self, text):
-        # Create a new image with transparent background
-        bbox = self.font.getbbox(text)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        image = Image.new('RGBA', (text_width, text_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
-        
-        # Draw text
-        draw.text((0, 0), text, font=self.font, fill=(255, 255, 255, 255))
-        
-        # Convert to OpenGL texture
-        image_data = np.array(image)
-        width, height = image.size
-        
-        # Generate texture
-        tex_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, tex_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, image_data)
-        
-        return {"id": tex_id, "width": width, "height": height}
 
     def draw(self):
         glDisable(GL_DEPTH_TEST)
@@ -90,8 +61,11 @@ class PauseMenu:
             glVertex2f(x, y + height)
             glEnd()
 
-            # Draw text
-            self.draw_text(button["label"], (x + width//2, y + height//2))
+            # Queue text
+            self.text.add_text(button["label"], x + width / 2, y + height / 2, center=True)
+
+        # All labels in one draw
+        self.text.flush(WIDTH, HEIGHT)
 
         # Restore matrices
         glMatrixMode(GL_PROJECTION)
@@ -102,24 +76,6 @@ class PauseMenu:
         glDisable(GL_BLEND)
         glEnable(GL_DEPTH_TEST)
 
-    def draw_text(self, text, center):
-        texture = self.text_textures[text]
-        width, height = texture["width"], texture["height"]
-        x, y = center[0] - width//2, center[1] - height//2
-
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, texture["id"])
-        glColor4f(1, 1, 1, 1)
-        
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex2f(x, y)
-        glTexCoord2f(1, 0); glVertex2f(x + width, y)
-        glTexCoord2f(1, 1); glVertex2f(x + width, y + height)
-        glTexCoord2f(0, 1); glVertex2f(x, y + height)
-        glEnd()
-        
-        glDisable(GL_TEXTURE_2D)
-
     def handle_click(self, pos):
         x, y = pos
         for i, button in enumerate(self.buttons):
@@ -2,7 +2,27 @@ import math
 import numpy as np
 from OpenGL.GL import *
 from pyrr import Matrix44, Vector3
-from rendering.my_shaders import SKY_VERTEX_SHADER_SRC, SKY_FRAGMENT_SHADER_SRC, compile_shader_program, Material
+from rendering.my_shaders import VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, SKY_VERTEX_SHADER_SRC, SKY_FRAGMENT_SHADER_SRC, Material
+from rendering.shader_manager import shader_manager
+from rendering.lighting import ClusteredLightBuffers
+from rendering.sh_lighting import load_sky_irradiance
+from rendering.ibl import load_ibl
+from rendering.static_batcher import mesh_model_matrix, material_key
+from rendering.mesh_arena import MeshArena, INDEX_SIZE
+from rendering.instancing import InstanceCuller
+from rendering.gpu_resources import gpu_resources
+from rendering.material_table import MaterialTable
+from rendering.depth_prepass import DepthPrepass
+from rendering.shadows import CascadedShadowMaps, bind_no_shadows
+from rendering.impostors import ImpostorRenderer
+from utils.settings import (WIDTH, HEIGHT, MESH_EVICTION_FRAMES, DEPTH_PREPASS,
+                            SHADOW_MAP_SIZE, SHADOW_CASCADES, SHADOW_DISTANCE,
+                            IMPOSTOR_DISTANCE, IMPOSTOR_FRAMES, IMPOSTOR_FRAME_SIZE)
+
+# Texture units reserved for the specular IBL maps
+PREFILTER_MAP_UNIT = 7
+BRDF_LUT_UNIT = 8
+SHADOW_ATLAS_UNIT = 11
 
 
 from PIL import Image
@@ -11,16 +31,39 @@ import weakref
     
 
 class Rasteriser:
-    def __init__(self):
-        self.shader_program = compile_shader_program()
+    def __init__(self, hdr_output=False):
+        # Programs are shared between Rasteriser instances on the same context
+        # and reloaded from the binary cache on later runs.
+        # hdr_output leaves tonemapping to SceneFramebuffer.resolve
+        self.hdr_output = hdr_output
+        defines = ["HDR_OUTPUT"] if hdr_output else []
+        self.lit_program = shader_manager.get_program(
+            VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, defines + (["SHADOWS"] if SHADOW_MAP_SIZE else []), name="pbr")
+        self.instanced_program = shader_manager.get_program(
+            VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, defines + ["INSTANCED"] + (["SHADOWS"] if SHADOW_MAP_SIZE else []),
+            name="pbr")
+        # Albedo-only variant for the editor's "Unlit" view
+        self.unlit_program = shader_manager.get_program(
+            VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, defines + ["UNLIT"], name="pbr")
+        self.shader_program = self.lit_program
         self.cube_vao, self.vertex_count = self.create_cube_geometry()
         self.sphere_vao, self.sphere_vertex_count = self.create_sphere_geometry()
         self.sky_texture = self.load_hdr_texture("assets/justSky.hdr")
+        self.sky_irradiance = load_sky_irradiance("assets/justSky.hdr")
+        self.prefilter_map, self.prefilter_max_lod, self.brdf_lut = self.load_ibl_textures("assets/justSky.hdr")
         
-        self.sky_shader = compile_shader_program(SKY_VERTEX_SHADER_SRC, SKY_FRAGMENT_SHADER_SRC)
+        self.sky_shader = shader_manager.get_program(SKY_VERTEX_SHADER_SRC, SKY_FRAGMENT_SHADER_SRC, name="sky")
         self.floor_texture = None
         self.build_floor_mesh()
-        self.mesh_vao_cache = weakref.WeakKeyDictionary()  # Cache for mesh VAOs
+        self.mesh_arena = MeshArena()  # Shared VBO/EBO/VAO for every mesh
+        self.material_table = MaterialTable()
+        self.light_buffers = ClusteredLightBuffers()
+        self.viewport_size = (WIDTH, HEIGHT)
+        self.depth_prepass = DepthPrepass(DEPTH_PREPASS)
+        self.instance_culler = InstanceCuller()
+        self.light_direction = Vector3([-0.5, -1.0, -0.5])
+        self.shadows = None  # created by the first update_shadows; the game never casts any
+        self.impostors = ImpostorRenderer(hdr_output, IMPOSTOR_FRAMES, IMPOSTOR_FRAME_SIZE) if IMPOSTOR_DISTANCE else None
 
     def create_cube_geometry(self):
         # Position + Normal per vertex
@@ -57,6 +100,7 @@ class Rasteriser:
         glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
 
         glBindVertexArray(0)
+        gpu_resources.track("buffer", vbo, "geometry", vertices.nbytes)
         return vao, len(vertices) // 6
 
     def create_sphere_geometry(self, stacks=16, slices=16):
@@ -95,6 +139,7 @@ class Rasteriser:
         glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
 
         glBindVertexArray(0)
+        gpu_resources.track("buffer", vbo, "geometry", vertices.nbytes)
         return vao, len(vertices) // 6
 
     def draw_cube(self, position: Vector3, size: float, view: Matrix44, projection: Matrix44, material: Material, camera_pos: Vector3):
@@ -107,15 +152,9 @@ class Rasteriser:
         glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "projection"), 1, GL_FALSE, projection.astype('float32'))
         glUniform3fv(glGetUniformLocation(self.shader_program, "viewPos"), 1, camera_pos.astype('float32'))
 
-        glUniform3fv(glGetUniformLocation(self.shader_program, "baseColor"), 1, np.array(material.base_color, dtype=np.float32))
-        glUniform3fv(glGetUniformLocation(self.shader_program, "emissiveColor"), 1, np.array(material.emissive_color, dtype=np.float32))
-        glUniform1f(glGetUniformLocation(self.shader_program, "metallic"), material.metallic)
-        glUniform1f(glGetUniformLocation(self.shader_program, "roughness"), material.roughness)
-        glUniform1f(glGetUniformLocation(self.shader_program, "specular"), material.specular)
+        self.apply_material(self.shader_program, material)
 
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.direction"), -0.5, -1.0, -0.5)
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.color"), 1.0, 1.0, 1.0)
-        glUniform1f(glGetUniformLocation(self.shader_program, "dirLight.intensity"), 1.0)
+        self.apply_lights(self.shader_program)
 
         glDrawArrays(GL_TRIANGLE_STRIP, 0, self.vertex_count)
 
@@ -132,21 +171,74 @@ class Rasteriser:
         glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "projection"), 1, GL_FALSE, projection.astype('float32'))
         glUniform3fv(glGetUniformLocation(self.shader_program, "viewPos"), 1, camera_pos.astype('float32'))
 
-        glUniform3fv(glGetUniformLocation(self.shader_program, "baseColor"), 1, np.array(material.base_color, dtype=np.float32))
-        glUniform3fv(glGetUniformLocation(self.shader_program, "emissiveColor"), 1, np.array(material.emissive_color, dtype=np.float32))
-        glUniform1f(glGetUniformLocation(self.shader_program, "metallic"), material.metallic)
-        glUniform1f(glGetUniformLocation(self.shader_program, "roughness"), material.roughness)
-        glUniform1f(glGetUniformLocation(self.shader_program, "specular"), material.specular)
+        self.apply_material(self.shader_program, material)
 
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.direction"), -0.5, -1.0, -0.5)
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.color"), 1.0, 1.0, 1.0)
-        glUniform1f(glGetUniformLocation(self.shader_program, "dirLight.intensity"), 1.0)
+        self.apply_lights(self.shader_program)
 
         glDrawArrays(GL_TRIANGLE_STRIP, 0, self.sphere_vertex_count)
 
         glBindVertexArray(0)
         glUseProgram(0)
 
+    def begin_frame(self):
+        """Run GL releases queued from other threads and evict long-unused meshes"""
+        gpu_resources.process_pending()
+        self.mesh_arena.next_frame()
+        if self.mesh_arena.frame % 60 == 0:
+            self.mesh_arena.evict_idle(MESH_EVICTION_FRAMES)
+
+    def set_unlit(self, unlit):
+        """Switch the mesh passes between full PBR and the albedo-only variant"""
+        self.shader_program = self.unlit_program if unlit else self.lit_program
+
+    def release_mesh(self, mesh):
+        self.mesh_arena.release_mesh(mesh)
+
+    def release(self):
+        """Free the shadow atlases; the next update_shadows recreates them"""
+        if self.shadows is not None:
+            self.shadows.release()
+            self.shadows = None
+
+    def update_lights(self, lights, view, projection, viewport_width, viewport_height):
+        """Bin this frame's (position, Light) pairs into the cluster grid"""
+        self.viewport_size = (viewport_width, viewport_height)
+        self.light_buffers.update(lights, view, projection)
+
+    def update_shadows(self, objects, batcher, view, projection):
+        """Refresh the directional light's shadow cascades for this frame's camera"""
+        if not SHADOW_MAP_SIZE:
+            return
+        if self.shadows is None:
+            self.shadows = CascadedShadowMaps(SHADOW_MAP_SIZE, SHADOW_CASCADES, SHADOW_DISTANCE)
+        self.shadows.update(view, projection, self.light_direction, self.mesh_arena, batcher, objects)
+
+    def apply_material(self, program, material):
+        """Select the material's row in the material table, uploading it if it changed"""
+        glUniform1i(glGetUniformLocation(program, "materialId"), self.material_table.get_id(material))
+        self.material_table.flush()
+
+    def apply_lights(self, program):
+        glUniform3f(glGetUniformLocation(program, "dirLight.direction"), *self.light_direction)
+        glUniform3f(glGetUniformLocation(program, "dirLight.color"), 1.0, 1.0, 1.0)
+        glUniform1f(glGetUniformLocation(program, "dirLight.intensity"), 1.0)
+        glUniform3fv(glGetUniformLocation(program, "shIrradiance"), 9, self.sky_irradiance)
+        self.light_buffers.bind(program, *self.viewport_size)
+        self.material_table.bind(program)
+
+        glActiveTexture(GL_TEXTURE0 + PREFILTER_MAP_UNIT)
+        glBindTexture(GL_TEXTURE_CUBE_MAP, self.prefilter_map)
+        glActiveTexture(GL_TEXTURE0 + BRDF_LUT_UNIT)
+        glBindTexture(GL_TEXTURE_2D, self.brdf_lut)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(glGetUniformLocation(program, "prefilterMap"), PREFILTER_MAP_UNIT)
+        glUniform1i(glGetUniformLocation(program, "brdfLUT"), BRDF_LUT_UNIT)
+        glUniform1f(glGetUniformLocation(program, "prefilterMaxLod"), self.prefilter_max_lod)
+        if self.shadows is not None:
+            self.shadows.bind(program, SHADOW_ATLAS_UNIT)
+        else:
+            bind_no_shadows(program, SHADOW_ATLAS_UNIT)
+
     def set_floor_texture(self, texture_id):
         self.floor_texture = texture_id
 
@@ -209,6 +301,7 @@ class Rasteriser:
         glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(12))
 
         glBindVertexArray(0)
+        gpu_resources.track("buffer", vbo, "geometry", vertices.nbytes)
 
         self.floor_vao = vao
         self.floor_vertex_count = len(vertices) // 6
@@ -223,11 +316,9 @@ class Rasteriser:
         glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "projection"), 1, GL_FALSE, projection.astype('float32'))
         glUniform3fv(glGetUniformLocation(self.shader_program, "viewPos"), 1, camera_pos.astype('float32'))
 
-        glUniform3fv(glGetUniformLocation(self.shader_program, "baseColor"), 1, np.array(material.base_color, dtype=np.float32))
-        glUniform3fv(glGetUniformLocation(self.shader_program, "emissiveColor"), 1, np.array(material.emissive_color, dtype=np.float32))
-        glUniform1f(glGetUniformLocation(self.shader_program, "metallic"), material.metallic)
-        glUniform1f(glGetUniformLocation(self.shader_program, "roughness"), material.roughness)
-        glUniform1f(glGetUniformLocation(self.shader_program, "specular"), material.specular)
+        self.apply_material(self.shader_program, material)
+
+        self.apply_lights(self.shader_program)
 
         glDrawArrays(GL_TRIANGLES, 0, self.floor_vertex_count)
 
@@ -259,10 +350,46 @@ class Rasteriser:
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
         glBindTexture(GL_TEXTURE_2D, 0)
+        gpu_resources.track("texture", tex_id, "textures", width * height * 3 * 2)
         print("Loaded HDR texture")
         return tex_id
 
 
+    def load_ibl_textures(self, path):
+        """Upload the prefiltered cubemap (one roughness per mip) and the BRDF LUT"""
+        mips, lut = load_ibl(path)
+
+        prefilter_map = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_CUBE_MAP, prefilter_map)
+        for level, mip in enumerate(mips):
+            size = mip.shape[1]
+            for face in range(6):
+                glTexImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X + face, level, GL_RGB16F, size, size, 0,
+                             GL_RGB, GL_FLOAT, np.ascontiguousarray(mip[face]))
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_BASE_LEVEL, 0)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAX_LEVEL, len(mips) - 1)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+        glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glEnable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
+
+        brdf_lut = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, brdf_lut)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RG16F, lut.shape[1], lut.shape[0], 0, GL_RG, GL_FLOAT, lut)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glBindTexture(GL_TEXTURE_CUBE_MAP, 0)
+        # RGB16F / RG16F: 2 bytes per channel
+        gpu_resources.track("texture", prefilter_map, "ibl", sum(mip.size * 2 for mip in mips))
+        gpu_resources.track("texture", brdf_lut, "ibl", lut.size * 2)
+        return prefilter_map, float(len(mips) - 1), brdf_lut
+
     def draw_sky(self, view, projection, brightness=1):
         glUseProgram(self.sky_shader)
         glDepthMask(GL_FALSE)  # Disable depth writing
@@ -293,6 +420,115 @@ class Rasteriser:
         glBindVertexArray(0)
         glUseProgram(0)
 
+    def draw_static_batches(self, batcher, view, projection, camera_pos):
+        """One draw per material for the pre-transformed static geometry"""
+        if not batcher.batches:
+            return
+        glUseProgram(self.shader_program)
+
+        model = Matrix44.identity()
+        glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "model"), 1, GL_FALSE, model.astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "view"), 1, GL_FALSE, view.astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "projection"), 1, GL_FALSE, projection.astype('float32'))
+        glUniform3fv(glGetUniformLocation(self.shader_program, "viewPos"), 1, camera_pos.astype('float32'))
+        self.apply_lights(self.shader_program)
+
+        # GL 3.3 has no gl_DrawID, so per-draw data cannot vary inside a multi-draw;
+        # everything in a batch shares the material and is already in world space
+        self.mesh_arena.bind()
+        for batch in batcher.batches.values():
+            material = batch.material
+            self.apply_material(self.shader_program, material)
+
+            self.mesh_arena.multi_draw(*batch.draw_arrays(self.mesh_arena.generation))
+
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def draw_objects(self, objects, batcher, view, projection, camera_pos):
+        """
+        Static batches plus every non-static mesh in objects, with a depth-only
+        pre-pass first on frames where DepthPrepass decides it pays off.
+        Non-static meshes past IMPOSTOR_DISTANCE draw as impostors instead.
+        """
+        objects, impostor_groups = self.split_impostors(objects, camera_pos)
+        if self.depth_prepass.begin_frame():
+            self.draw_depth(objects, batcher, view, projection)
+            self.depth_prepass.begin_lit_pass()
+        self.draw_static_batches(batcher, view, projection, camera_pos)
+        for obj in objects:
+            if obj.mesh is None or obj.static:
+                continue
+            self.draw_mesh(obj.mesh, obj.location, obj.rotation, obj.scale, obj.material, view, projection, camera_pos)
+        if self.depth_prepass.active_frame:
+            self.depth_prepass.end_lit_pass()
+        if impostor_groups:
+            self.impostors.draw(impostor_groups, view, projection, camera_pos, self)
+
+    def split_impostors(self, objects, camera_pos):
+        """(objects to draw as meshes, {(mesh, material) key: (mesh, material, [model matrices])} for impostors)"""
+        # Impostors are baked lit-only, so the Unlit view keeps full meshes
+        if self.impostors is None or self.shader_program is self.unlit_program:
+            return objects, {}
+        near, groups = [], {}
+        camera = np.asarray(camera_pos, dtype=np.float64)
+        for obj in objects:
+            if obj.mesh is None or obj.static or np.linalg.norm(np.asarray(obj.location) - camera) <= IMPOSTOR_DISTANCE:
+                near.append(obj)
+                continue
+            key = (id(obj.mesh), material_key(obj.material))
+            if key not in groups:
+                groups[key] = (obj.mesh, obj.material, [])
+            groups[key][2].append(mesh_model_matrix(obj.location, obj.rotation, obj.scale))
+        return near, groups
+
+    def draw_depth(self, objects, batcher, view, projection):
+        """Depth-only pass over the same geometry draw_objects shades"""
+        self.depth_prepass.begin_depth_pass(view, projection)
+        self.mesh_arena.bind()
+        if batcher.batches:
+            self.depth_prepass.set_model(Matrix44.identity())
+            for batch in batcher.batches.values():
+                self.mesh_arena.multi_draw(*batch.draw_arrays(self.mesh_arena.generation))
+        for obj in objects:
+            if obj.mesh is None or obj.static:
+                continue
+            allocation = self.mesh_arena.get_mesh(obj.mesh)
+            # A first-use upload can grow the arena, which rebuilds the VAO bindings
+            self.mesh_arena.bind()
+            self.depth_prepass.set_model(mesh_model_matrix(obj.location, obj.rotation, obj.scale))
+            self.mesh_arena.draw(allocation)
+        self.depth_prepass.end_depth_pass()
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def draw_instances(self, batch, view, projection, camera_pos):
+        """
+        Frustum-cull an InstanceBatch on the GPU and draw the survivors in one
+        instanced call (see rendering/instancing.py)
+        """
+        self.instance_culler.cull(batch, np.asarray(view) @ np.asarray(projection))
+        visible = self.instance_culler.visible(batch)
+        if visible is None or visible[1] == 0:
+            return
+        index, count = visible
+        allocation = self.mesh_arena.get_mesh(batch.mesh)
+
+        program = self.instanced_program
+        glUseProgram(program)
+        glUniformMatrix4fv(glGetUniformLocation(program, "view"), 1, GL_FALSE, view.astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE, projection.astype('float32'))
+        glUniform3fv(glGetUniformLocation(program, "viewPos"), 1, camera_pos.astype('float32'))
+        self.apply_material(program, batch.material)
+        self.apply_lights(program)
+
+        glBindVertexArray(batch.draw_vao(index, self.mesh_arena))
+        glDrawElementsInstancedBaseVertex(GL_TRIANGLES, allocation.index_count, GL_UNSIGNED_INT,
+                                          ctypes.c_void_p(allocation.first_index * INDEX_SIZE), count,
+                                          allocation.base_vertex)
+        glBindVertexArray(0)
+        glUseProgram(0)
+
     def draw_mesh(self, mesh, position, rotation, scale, material, view, projection, camera_pos):
         # print("\n=== DRAW MESH CALLED ===")
         # print(f"Mesh info:")
@@ -308,51 +544,15 @@ class Rasteriser:
         # print(f"  Metallic: {material.metallic}")
         # print(f"  Roughness: {material.roughness}")
 
-        # Cache VAO/VBO/EBO for each mesh
-        if mesh not in self.mesh_vao_cache:
-            print("Creating new VAO/VBO/EBO for mesh")
-            vao = glGenVertexArrays(1)
-            vbo = glGenBuffers(1)
-            ebo = glGenBuffers(1)
-            glBindVertexArray(vao)
-            
-            # Vertices
-            vertices = np.array(mesh.vertices, dtype=np.float32)
-            glBindBuffer(GL_ARRAY_BUFFER, vbo)
-            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
-            glEnableVertexAttribArray(0)
-            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
-            
-            # Normals (optional)
-            if mesh.normals:
-                normals = np.array(mesh.normals, dtype=np.float32)
-                nbo = glGenBuffers(1)
-                glBindBuffer(GL_ARRAY_BUFFER, nbo)
-                glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals, GL_STATIC_DRAW)
-                glEnableVertexAttribArray(1)
-                glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
-            
-            # Indices
-            indices = np.array(mesh.indices, dtype=np.uint32)
-            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
-            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
-            glBindVertexArray(0)
-            self.mesh_vao_cache[mesh] = (vao, len(indices))
-            index_count = len(indices)
-            #print(f"Created new VAO: {vao} with {len(indices)} indices")
-        else:
-            vao, index_count = self.mesh_vao_cache[mesh]
-            #print(f"Using cached VAO: {vao} with {index_count} indices")
+        # Meshes live in the shared arena; drawing one binds no buffers
+        allocation = self.mesh_arena.get_mesh(mesh)
 
-        # Set up model matrix (world space transformation)
-        model = Matrix44.identity()
-        model = model @ Matrix44.from_translation(position)  # First translate to position
-        model = model @ Matrix44.from_eulers(rotation)       # Then rotate around that position
-        model = model @ Matrix44.from_scale(scale)           # Finally scale
+        # Set up model matrix (world space transformation, shared with static batching)
+        model = mesh_model_matrix(position, rotation, scale)
         #print(f"Model matrix:\n{model}")
 
         glUseProgram(self.shader_program)
-        glBindVertexArray(vao)
+        self.mesh_arena.bind()
 
         # Set all required uniforms
         glUniformMatrix4fv(glGetUniformLocation(self.shader_program, "model"), 1, GL_FALSE, model.astype('float32'))
@@ -361,20 +561,14 @@ class Rasteriser:
         glUniform3fv(glGetUniformLocation(self.shader_program, "viewPos"), 1, camera_pos.astype('float32'))
 
         # Set material properties
-        glUniform3fv(glGetUniformLocation(self.shader_program, "baseColor"), 1, np.array(material.base_color, dtype=np.float32))
-        glUniform3fv(glGetUniformLocation(self.shader_program, "emissiveColor"), 1, np.array(material.emissive_color, dtype=np.float32))
-        glUniform1f(glGetUniformLocation(self.shader_program, "metallic"), material.metallic)
-        glUniform1f(glGetUniformLocation(self.shader_program, "roughness"), material.roughness)
-        glUniform1f(glGetUniformLocation(self.shader_program, "specular"), material.specular)
+        self.apply_material(self.shader_program, material)
 
         # Set lighting (in world space)
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.direction"), -0.5, -1.0, -0.5)
-        glUniform3f(glGetUniformLocation(self.shader_program, "dirLight.color"), 1.0, 1.0, 1.0)
-        glUniform1f(glGetUniformLocation(self.shader_program, "dirLight.intensity"), 1.0)
+        self.apply_lights(self.shader_program)
 
         # Draw the mesh
         #print("Drawing mesh...")
-        glDrawElements(GL_TRIANGLES, index_count, GL_UNSIGNED_INT, None)
+        self.mesh_arena.draw(allocation)
         
         glDisable(GL_BLEND)
         glBindVertexArray(0)
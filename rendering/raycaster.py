@@ -0,0 +1,354 @@
+"""
+Wolfenstein-style 2.5D raycaster over the wall layer (y=0) of game_map.
+
+cast_rays() marches all NUM_RAYS columns through the grid at once with a
+vectorised DDA and returns a per-column depth buffer with the block and
+texture column each ray hit. RaycastRenderer draws those walls on the GPU as
+one batch of textured strips; render_frame() fills a NumPy framebuffer
+without touching GL, for headless tests and benchmarks. Both hide the parts
+of sprites that lie behind the column depths.
+
+Distances are in tiles. Ray i points DELTA_ANGLE * (i + 0.5) right of the
+left edge of the FOV, and a wall at depth d is PROJ_COEFF / d pixels tall on
+a HEIGHT-pixel screen.
+"""
+
+import ctypes
+import math
+import numpy as np
+from PIL import Image
+from OpenGL.GL import *
+from rendering.my_shaders import RAYCAST_VERTEX_SHADER_SRC, RAYCAST_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.texture_loader import load_texture_array
+from rendering.gpu_resources import gpu_resources
+from world.blocks import STONE, block_texture_paths, block_layer_lookup
+from world.chunk_mesher import voxel_grid
+from utils.settings import NUM_RAYS, FOV, MAX_DEPTH, PROJ_COEFF, HEIGHT, TILE_SIZE_M
+
+SIDE_SHADE = 0.7           # walls hit across z are darker, as in Wolfenstein
+CEILING_COLOR = (56, 56, 64)
+FLOOR_COLOR = (96, 88, 80)
+NEAR_DEPTH = 1e-3
+VERTEX_FLOATS = 7          # x, y, depth, u, v, layer, shade
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+
+
+def wall_grid(game_map):
+    """(X, Z) block ids of the map's wall layer"""
+    return np.ascontiguousarray(voxel_grid(game_map)[:, 0, :])
+
+
+class RayColumns:
+    """Per-column result of cast_rays()"""
+    def __init__(self, origin, fov, angles, depth, block, side, u):
+        self.origin = origin  # (x, z, angle) the rays were cast from
+        self.fov = fov
+        self.angles = angles  # world angle of each ray
+        self.depth = depth    # perpendicular distance to the wall (no fisheye), MAX_DEPTH if none
+        self.block = block    # block id hit, 0 if the ray ran out of range
+        self.side = side      # 0 = crossed an x boundary, 1 = a z boundary
+        self.u = u            # texture column in [0, 1)
+
+
+def cast_rays(grid, x, z, angle, num_rays=NUM_RAYS, fov=FOV, max_depth=MAX_DEPTH):
+    """
+    Grid DDA for every column at once. Each pass advances every unfinished
+    ray to its next cell boundary, so the loop runs once per cell crossed by
+    the longest ray rather than once per ray. Cells outside the map count as
+    STONE.
+    """
+    size_x, size_z = grid.shape
+    angles = angle - fov * 0.5 + (np.arange(num_rays) + 0.5) * (fov / num_rays)
+    dir_x = np.cos(angles)
+    dir_z = np.sin(angles)
+    # Keep 1/dir finite for axis-aligned rays
+    dir_x = np.where(np.abs(dir_x) < 1e-12, 1e-12, dir_x)
+    dir_z = np.where(np.abs(dir_z) < 1e-12, 1e-12, dir_z)
+
+    cell_x = np.full(num_rays, math.floor(x), dtype=np.int64)
+    cell_z = np.full(num_rays, math.floor(z), dtype=np.int64)
+    step_x = np.where(dir_x > 0, 1, -1)
+    step_z = np.where(dir_z > 0, 1, -1)
+    delta_x = np.abs(1.0 / dir_x)
+    delta_z = np.abs(1.0 / dir_z)
+    # Ray distance to the first x and z boundary
+    side_x = np.where(dir_x > 0, cell_x + 1 - x, x - cell_x) * delta_x
+    side_z = np.where(dir_z > 0, cell_z + 1 - z, z - cell_z) * delta_z
+
+    distance = np.full(num_rays, float(max_depth))
+    block = np.zeros(num_rays, dtype=grid.dtype)
+    side = np.zeros(num_rays, dtype=np.int8)
+    active = np.arange(num_rays)
+    for _ in range(size_x + size_z + 2):
+        if not len(active):
+            break
+        along_x = side_x[active] < side_z[active]
+        travelled = np.where(along_x, side_x[active], side_z[active])
+        cell_x[active] += np.where(along_x, step_x[active], 0)
+        cell_z[active] += np.where(along_x, 0, step_z[active])
+        side_x[active] += np.where(along_x, delta_x[active], 0.0)
+        side_z[active] += np.where(along_x, 0.0, delta_z[active])
+
+        cx, cz = cell_x[active], cell_z[active]
+        inside = (cx >= 0) & (cx < size_x) & (cz >= 0) & (cz < size_z)
+        values = np.where(inside, grid[np.clip(cx, 0, size_x - 1), np.clip(cz, 0, size_z - 1)], STONE)
+        out_of_range = travelled > max_depth
+        done = (values != 0) | out_of_range
+        finished = active[done]
+        distance[finished] = np.minimum(travelled[done], max_depth)
+        block[finished] = np.where(out_of_range[done], 0, values[done])
+        side[finished] = np.where(along_x[done], 0, 1)
+        active = active[~done]
+
+    # Where along the wall face each ray landed
+    hit_along = np.where(side == 0, z + distance * dir_z, x + distance * dir_x)
+    u = hit_along - np.floor(hit_along)
+    # Mirror so textures read left to right from whichever side the wall is seen
+    u = np.where(((side == 0) & (dir_x < 0)) | ((side == 1) & (dir_z > 0)), 1.0 - u, u)
+
+    depth = np.maximum(distance * np.cos(angles - angle), NEAR_DEPTH)
+    return RayColumns((x, z, angle), fov, angles, depth, block, side, u)
+
+
+def wall_height(depth, height):
+    """Projected wall height in pixels on a height-pixel screen"""
+    return PROJ_COEFF / np.maximum(depth, NEAR_DEPTH) * (height / HEIGHT)
+
+
+def project_sprite(x, z, view_x, view_z, angle, width, height, fov=FOV):
+    """(screen centre x, size in pixels, depth) of a sprite at (x, z), or None if behind the viewer"""
+    dx, dz = x - view_x, z - view_z
+    relative = (math.atan2(dz, dx) - angle + math.pi) % (2 * math.pi) - math.pi
+    depth = math.hypot(dx, dz) * math.cos(relative)
+    if depth <= NEAR_DEPTH or abs(relative) > math.pi * 0.5:
+        return None
+    centre = (relative + fov * 0.5) / fov * width
+    return centre, float(wall_height(depth, height)), depth
+
+
+def load_wall_images(size=64):
+    """(layers, size, size, 3) uint8 block textures in texture array layer order, for render_frame()"""
+    images = []
+    for path in block_texture_paths():
+        image = Image.open(path).convert('RGB')
+        if image.size != (size, size):
+            image = image.resize((size, size), Image.LANCZOS)
+        images.append(np.array(image))
+    return np.stack(images)
+
+
+def render_frame(columns, wall_images, width, height, sprites=(), layer_lookup=None):
+    """
+    Software frame from cast_rays() output: an (height, width, 3) uint8
+    image and the per-pixel-column depth buffer. sprites are (x, z, rgba)
+    in tiles, with rgba an (h, w, 4) uint8 image.
+    """
+    layer_lookup = block_layer_lookup() if layer_lookup is None else layer_lookup
+    num_rays = len(columns.depth)
+    ray = np.arange(width) * num_rays // width
+    column_depth = columns.depth[ray]
+    block = columns.block[ray]
+    size = wall_images.shape[1]
+
+    # Work on packed RGBA words so each pixel moves as one 32-bit value
+    background = np.empty((height, 1, 4), dtype=np.uint8)
+    background[:height // 2, 0] = CEILING_COLOR + (255,)
+    background[height // 2:, 0] = FLOOR_COLOR + (255,)
+
+    strip = wall_height(column_depth, height).astype(np.float32)
+    top = height * 0.5 - strip * 0.5
+    v = (np.arange(height, dtype=np.float32)[:, None] + 0.5 - top[None, :]) / strip[None, :]
+    wall = (v >= 0.0) & (v < 1.0) & (block > 0)[None, :]
+    # Each screen column samples one shaded texture column
+    layer = layer_lookup[np.minimum(block, len(layer_lookup) - 1)].astype(np.int64)
+    texel_u = np.minimum((columns.u[ray] * size).astype(np.int64), size - 1)
+    shade = np.where(columns.side[ray] == 1, SIDE_SHADE, 1.0).astype(np.float32)
+    texture_columns = np.full((size, width, 4), 255, dtype=np.uint8)
+    texture_columns[..., :3] = (wall_images[layer, :, texel_u] * shade[:, None, None]).transpose(1, 0, 2)
+    texel_v = np.clip((v * size).astype(np.int32), 0, size - 1)
+    pixels = np.take(texture_columns.view(np.uint32).reshape(-1), texel_v * width + np.arange(width, dtype=np.int32))
+    packed = np.where(wall, pixels, background.view(np.uint32)[..., 0])
+    frame = packed.view(np.uint8).reshape(height, width, 4)[..., :3]
+
+    if sprites:
+        view_x, view_z, angle = columns.origin
+        projected = []
+        for x, z, image in sprites:
+            placement = project_sprite(x, z, view_x, view_z, angle, width, height, columns.fov)
+            if placement is not None:
+                projected.append((placement, image))
+        # Far to near, so nearer sprites overwrite farther ones
+        projected.sort(key=lambda item: -item[0][2])
+        for (centre, sprite_size, depth), image in projected:
+            _draw_sprite(frame, column_depth, image, centre, sprite_size, depth)
+    return np.ascontiguousarray(frame), column_depth
+
+
+def _draw_sprite(frame, column_depth, image, centre, sprite_size, depth):
+    height, width = frame.shape[:2]
+    sprite_width = sprite_size * image.shape[1] / image.shape[0]
+    x0 = centre - sprite_width * 0.5
+    y0 = height * 0.5 - sprite_size * 0.5
+    cols = np.arange(max(0, int(math.floor(x0))), min(width, int(math.ceil(x0 + sprite_width))))
+    # Column depth test: only columns whose wall is farther than the sprite
+    cols = cols[column_depth[cols] > depth]
+    rows = np.arange(max(0, int(math.floor(y0))), min(height, int(math.ceil(y0 + sprite_size))))
+    if not len(cols) or not len(rows):
+        return
+    texel_u = np.clip(((cols + 0.5 - x0) / sprite_width * image.shape[1]).astype(np.int64), 0, image.shape[1] - 1)
+    texel_v = np.clip(((rows + 0.5 - y0) / sprite_size * image.shape[0]).astype(np.int64), 0, image.shape[0] - 1)
+    texels = image[texel_v[:, None], texel_u[None, :]]
+    opaque = texels[..., 3] >= 128
+    region = frame[rows[0]:rows[-1] + 1, cols]
+    region[opaque] = texels[..., :3][opaque]
+    frame[rows[0]:rows[-1] + 1, cols] = region
+
+
+class RaycastRenderer:
+    """
+    GPU backend for the raycaster. Each frame the wall columns are written
+    as one streaming batch of textured strips and drawn with a single call;
+    enemy sprites follow with depth testing against the strips' column
+    depths.
+    """
+    def __init__(self, game_map, texture_array=None, num_rays=NUM_RAYS):
+        self.grid = wall_grid(game_map)
+        self.num_rays = num_rays
+        self.wall_program = shader_manager.get_program(
+            RAYCAST_VERTEX_SHADER_SRC, RAYCAST_FRAGMENT_SHADER_SRC, ["WALL_STRIPS"], name="raycast")
+        self.sprite_program = shader_manager.get_program(
+            RAYCAST_VERTEX_SHADER_SRC, RAYCAST_FRAGMENT_SHADER_SRC, name="raycast")
+        self.texture_array = texture_array or load_texture_array(block_texture_paths())
+        self.layer_lookup = block_layer_lookup()
+        self.columns = None
+        self.capacity = 0
+        self.vbo = None
+        self.vao = glGenVertexArrays(1)
+        self._ensure_capacity(num_rays + 16)
+
+    def _ensure_capacity(self, quads):
+        if quads <= self.capacity:
+            return
+        capacity = max(quads, self.capacity * 2)
+        if self.vbo is not None:
+            gpu_resources.delete_buffer(self.vbo)
+        self.vbo = gpu_resources.create_buffer("raycast", capacity * 6 * VERTEX_STRIDE, GL_STREAM_DRAW)
+        self.capacity = capacity
+
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(24))
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def wall_vertices(self, columns, width, height):
+        """Two triangles per column that hit a wall"""
+        hit = np.flatnonzero(columns.block > 0)
+        column_width = width / len(columns.depth)
+        x0 = hit * column_width
+        x1 = x0 + column_width
+        strip = wall_height(columns.depth[hit], height)
+        y0 = height * 0.5 - strip * 0.5
+        y1 = y0 + strip
+        depth = np.clip(columns.depth[hit] / MAX_DEPTH, 0.0, 1.0)
+        u = columns.u[hit]
+        layer = self.layer_lookup[np.minimum(columns.block[hit], len(self.layer_lookup) - 1)]
+        shade = np.where(columns.side[hit] == 1, SIDE_SHADE, 1.0)
+        corners = [(x0, y0, 0.0), (x1, y0, 0.0), (x1, y1, 1.0), (x0, y0, 0.0), (x1, y1, 1.0), (x0, y1, 1.0)]
+        vertices = np.empty((len(hit), 6, VERTEX_FLOATS), dtype=np.float32)
+        for i, (x, y, v) in enumerate(corners):
+            # The whole strip samples one texture column
+            vertices[:, i] = np.stack([x, y, depth, u, np.full_like(u, v), layer, shade], axis=1)
+        return vertices.reshape(-1, VERTEX_FLOATS)
+
+    def sprite_vertices(self, enemies, player, width, height):
+        """One quad per visible enemy with its texture id, nearest last"""
+        view_x, view_z = player.x / TILE_SIZE_M, player.y / TILE_SIZE_M
+        quads = []
+        for enemy in enemies:
+            placement = project_sprite(enemy.x / TILE_SIZE_M, enemy.y / TILE_SIZE_M,
+                                       view_x, view_z, player.angle, width, height)
+            if placement is None:
+                continue
+            centre, size, depth = placement
+            u0, v0, u1, v1 = enemy.frame_uvs(player)
+            x0, x1 = centre - size * 0.5, centre + size * 0.5
+            y0, y1 = height * 0.5 - size * 0.5, height * 0.5 + size * 0.5
+            z = min(depth / MAX_DEPTH, 1.0)
+            quad = np.array([
+                (x0, y0, z, u0, v0, 0.0, 1.0), (x1, y0, z, u1, v0, 0.0, 1.0), (x1, y1, z, u1, v1, 0.0, 1.0),
+                (x0, y0, z, u0, v0, 0.0, 1.0), (x1, y1, z, u1, v1, 0.0, 1.0), (x0, y1, z, u0, v1, 0.0, 1.0),
+            ], dtype=np.float32)
+            quads.append((depth, enemy.texture_id, quad))
+        quads.sort(key=lambda item: -item[0])
+        return [(texture_id, quad) for _, texture_id, quad in quads]
+
+    def render(self, player, enemies, width, height):
+        """Draw walls and enemy sprites for the player's view onto the bound width x height target"""
+        self.columns = cast_rays(self.grid, player.x / TILE_SIZE_M, player.y / TILE_SIZE_M,
+                                 player.angle, self.num_rays)
+        walls = self.wall_vertices(self.columns, width, height)
+        sprites = self.sprite_vertices(enemies, player, width, height)
+        vertices = np.concatenate([walls] + [quad for _, quad in sprites])
+        self._ensure_capacity(len(vertices) // 6)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        # Orphan last frame's storage so the upload never waits on the GPU
+        glBufferData(GL_ARRAY_BUFFER, self.capacity * 6 * VERTEX_STRIDE, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        # Ceiling and floor are flat colours
+        glEnable(GL_SCISSOR_TEST)
+        glScissor(0, height // 2, width, height - height // 2)
+        glClearColor(*(c / 255.0 for c in CEILING_COLOR), 1.0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glScissor(0, 0, width, height // 2)
+        glClearColor(*(c / 255.0 for c in FLOOR_COLOR), 1.0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glDisable(GL_SCISSOR_TEST)
+        glClearColor(0.0, 0.0, 0.0, 1.0)
+        glClear(GL_DEPTH_BUFFER_BIT)
+
+        cull_face = glIsEnabled(GL_CULL_FACE)
+        glDisable(GL_CULL_FACE)
+        glEnable(GL_DEPTH_TEST)
+        glDepthFunc(GL_LESS)
+        glBindVertexArray(self.vao)
+
+        glUseProgram(self.wall_program)
+        glUniform2f(glGetUniformLocation(self.wall_program, "screenSize"), width, height)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture_array)
+        glUniform1i(glGetUniformLocation(self.wall_program, "wallTextures"), 0)
+        glDrawArrays(GL_TRIANGLES, 0, len(walls))
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+
+        if sprites:
+            # The wall strips' depths occlude sprites per pixel column
+            glUseProgram(self.sprite_program)
+            glUniform2f(glGetUniformLocation(self.sprite_program, "screenSize"), width, height)
+            glUniform1i(glGetUniformLocation(self.sprite_program, "spriteTexture"), 0)
+            first = len(walls)
+            for texture_id, quad in sprites:
+                glBindTexture(GL_TEXTURE_2D, texture_id)
+                glDrawArrays(GL_TRIANGLES, first, len(quad))
+                first += len(quad)
+            glBindTexture(GL_TEXTURE_2D, 0)
+
+        glBindVertexArray(0)
+        glUseProgram(0)
+        if cull_face:
+            glEnable(GL_CULL_FACE)
+
+    def release(self):
+        if self.vbo is not None:
+            gpu_resources.delete_buffer(self.vbo)
+            self.vbo = None
+        gpu_resources.delete_vertex_array(self.vao)
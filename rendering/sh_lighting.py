@@ -0,0 +1,94 @@
+"""
+Second-order (L2, 9 coefficient) spherical-harmonic irradiance from an
+equirectangular HDR sky, following Ramamoorthi & Hanrahan's
+"An Efficient Representation for Irradiance Environment Maps".
+"""
+
+import math
+import os
+import numpy as np
+import cv2
+from utils.cache import get_cache_path, hash_file
+from utils.logger import logger
+
+# Images are box-filtered down to this width first; irradiance is so
+# low-frequency that more samples do not change the result
+SH_SAMPLE_WIDTH = 256
+
+# Cosine-lobe convolution per band (A_l), pre-divided by pi so the shader
+# can multiply the result straight into the diffuse albedo
+SH_BAND_SCALE = np.array([1.0, 2.0 / 3.0, 2.0 / 3.0, 2.0 / 3.0, 0.25, 0.25, 0.25, 0.25, 0.25], dtype=np.float64)
+
+
+def sh9_basis(directions):
+    """Real SH basis up to l=2 for (N, 3) unit directions, returns (N, 9)"""
+    x, y, z = directions[:, 0], directions[:, 1], directions[:, 2]
+    return np.stack([
+        np.full_like(x, 0.282095),
+        0.488603 * y,
+        0.488603 * z,
+        0.488603 * x,
+        1.092548 * x * y,
+        1.092548 * y * z,
+        0.315392 * (3.0 * z * z - 1.0),
+        1.092548 * x * z,
+        0.546274 * (x * x - y * y),
+    ], axis=1)
+
+
+def equirect_directions(width, height):
+    """
+    World-space direction and solid angle of each pixel, using the same
+    mapping as SKY_FRAGMENT_SHADER_SRC (u from atan(z, x), v from asin(y)).
+    """
+    u = (np.arange(width) + 0.5) / width
+    v = (np.arange(height) + 0.5) / height
+    phi = (u - 0.5) * 2.0 * math.pi
+    lat = (0.5 - v) * math.pi
+    cos_lat = np.cos(lat)[:, None]
+    directions = np.empty((height, width, 3))
+    directions[..., 0] = cos_lat * np.cos(phi)[None, :]
+    directions[..., 1] = np.sin(lat)[:, None]
+    directions[..., 2] = cos_lat * np.sin(phi)[None, :]
+    solid_angle = (2.0 * math.pi / width) * (math.pi / height) * np.broadcast_to(cos_lat, (height, width))
+    return directions.reshape(-1, 3), solid_angle.reshape(-1)
+
+
+def project_equirect_sh9(image):
+    """Project an (H, W, 3) float RGB radiance image into (9, 3) SH coefficients"""
+    height, width = image.shape[:2]
+    if width > SH_SAMPLE_WIDTH:
+        new_height = max(1, int(round(height * SH_SAMPLE_WIDTH / width)))
+        image = cv2.resize(image, (SH_SAMPLE_WIDTH, new_height), interpolation=cv2.INTER_AREA)
+        height, width = image.shape[:2]
+    directions, solid_angle = equirect_directions(width, height)
+    basis = sh9_basis(directions) * solid_angle[:, None]
+    return basis.T @ image.reshape(-1, 3).astype(np.float64)
+
+
+def irradiance_coefficients(radiance_sh):
+    """Convolve radiance SH with the clamped cosine lobe, divided by pi"""
+    return (radiance_sh * SH_BAND_SCALE[:, None]).astype(np.float32)
+
+
+def constant_irradiance(color):
+    """Coefficients for a uniform ambient term, e.g. when no sky is available"""
+    coefficients = np.zeros((9, 3), dtype=np.float32)
+    coefficients[0] = np.asarray(color, dtype=np.float32) / 0.282095
+    return coefficients
+
+
+def load_sky_irradiance(path):
+    """Irradiance SH for an HDR file, cached on disk by the file's content hash"""
+    cache_path = get_cache_path("sh", hash_file(path), "npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise RuntimeError(f"Failed to load HDR image: {path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32)
+    coefficients = irradiance_coefficients(project_equirect_sh9(image))
+    np.save(cache_path, coefficients)
+    logger.log(f"Computed SH irradiance for {path}")
+    return coefficients
@@ -0,0 +1,176 @@
+import os
+import time
+import ctypes
+import numpy as np
+import OpenGL.GL.shaders as shaders
+from OpenGL.GL import *
+from OpenGL import contextdata
+from utils.logger import logger
+from utils.cache import get_cache_path, hash_strings
+
+
+def apply_defines(source, defines):
+    """Insert `#define` lines directly after the `#version` directive"""
+    if not defines:
+        return source
+    lines = source.strip("\n").split("\n")
+    define_lines = [f"#define {name} {value}".rstrip() for name, value in defines]
+    if lines and lines[0].startswith("#version"):
+        return "\n".join(lines[:1] + define_lines + lines[1:]) + "\n"
+    return "\n".join(define_lines + lines) + "\n"
+
+
+def normalize_defines(defines):
+    """Accept a list of names or a dict of name -> value; return a sorted tuple"""
+    if not defines:
+        return ()
+    if isinstance(defines, dict):
+        items = defines.items()
+    else:
+        items = ((name, "") for name in defines)
+    return tuple(sorted((str(name), str(value)) for name, value in items))
+
+
+class ShaderManager:
+    """
+    Compiles shader programs (and their #define variants) on demand.
+
+    Programs are shared per GL context, and linked program binaries are written
+    to the cache directory keyed by driver, source hash and defines so later
+    runs can skip compilation entirely.
+    """
+    def __init__(self, use_binary_cache=True):
+        self.use_binary_cache = use_binary_cache
+        self.programs = {}  # (context, key) -> program id
+        self.timings = {}   # key -> (name, compile_ms, link_ms, from_cache)
+
+    def get_program(self, vertex_src, fragment_src, defines=None, name="program", geometry_src=None,
+                    feedback_varyings=None):
+        """
+        fragment_src may be None for transform-feedback-only programs, which
+        name the outputs to capture (interleaved) in feedback_varyings
+        """
+        defines = normalize_defines(defines)
+        context = self._current_context()
+        driver = self._driver_id()
+        # Programs without the optional stages keep the keys (and cached binaries) they had before those existed
+        extras = [part for part in (geometry_src, feedback_varyings and ",".join(feedback_varyings)) if part]
+        key = hash_strings(driver, vertex_src, fragment_src, defines, *extras)
+        program = self.programs.get((context, key))
+        if program is not None:
+            return program
+
+        label = name + ("[" + ",".join(d[0] for d in defines) + "]" if defines else "")
+        program = self._load_binary(key, label)
+        if program is None:
+            program = self._compile(key, label, apply_defines(vertex_src, defines),
+                                    apply_defines(fragment_src, defines) if fragment_src else None,
+                                    apply_defines(geometry_src, defines) if geometry_src else None,
+                                    feedback_varyings)
+            self._store_binary(key, program)
+
+        self.programs[(context, key)] = program
+        return program
+
+    def _current_context(self):
+        try:
+            return contextdata.getContext()
+        except Exception:
+            return 0
+
+    def _driver_id(self):
+        return "|".join(
+            (glGetString(name) or b"").decode("utf-8", "replace")
+            for name in (GL_VENDOR, GL_RENDERER, GL_VERSION)
+        )
+
+    def _binary_supported(self):
+        if not self.use_binary_cache:
+            return False
+        try:
+            return glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+        except Exception:
+            return False
+
+    def _compile(self, key, label, vertex_src, fragment_src, geometry_src=None, feedback_varyings=None):
+        start = time.perf_counter()
+        stages = [shaders.compileShader(vertex_src, GL_VERTEX_SHADER)]
+        if geometry_src:
+            stages.append(shaders.compileShader(geometry_src, GL_GEOMETRY_SHADER))
+        if fragment_src:
+            stages.append(shaders.compileShader(fragment_src, GL_FRAGMENT_SHADER))
+        compiled = time.perf_counter()
+
+        program = glCreateProgram()
+        for shader in stages:
+            glAttachShader(program, shader)
+        if feedback_varyings:
+            names = (ctypes.c_char_p * len(feedback_varyings))(*[v.encode("utf-8") for v in feedback_varyings])
+            glTransformFeedbackVaryings(program, len(feedback_varyings),
+                                        ctypes.cast(names, ctypes.POINTER(ctypes.POINTER(ctypes.c_char))),
+                                        GL_INTERLEAVED_ATTRIBS)
+        if self._binary_supported():
+            glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+        glLinkProgram(program)
+        linked = time.perf_counter()
+
+        if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+            info = glGetProgramInfoLog(program)
+            glDeleteProgram(program)
+            raise RuntimeError(f"Shader link failure ({label}): {info}")
+        for shader in stages:
+            glDetachShader(program, shader)
+            glDeleteShader(shader)
+
+        compile_ms = (compiled - start) * 1000.0
+        link_ms = (linked - compiled) * 1000.0
+        self.timings[key] = (label, compile_ms, link_ms, False)
+        logger.log(f"Compiled shader program {label}: compile {compile_ms:.2f} ms, link {link_ms:.2f} ms")
+        return program
+
+    def _load_binary(self, key, label):
+        if not self._binary_supported():
+            return None
+        path = get_cache_path("shaders", key, "bin")
+        if not os.path.exists(path):
+            return None
+
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            data = f.read()
+        binary_format = int(np.frombuffer(data[:4], dtype=np.uint32)[0])
+        binary = np.frombuffer(data[4:], dtype=np.uint8)
+
+        program = glCreateProgram()
+        glProgramBinary(program, binary_format, binary, binary.nbytes)
+        if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+            # Driver update or corrupt file: fall back to compiling from source
+            logger.log(f"Cached binary for {label} rejected by driver, recompiling")
+            glDeleteProgram(program)
+            os.remove(path)
+            return None
+
+        load_ms = (time.perf_counter() - start) * 1000.0
+        self.timings[key] = (label, 0.0, load_ms, True)
+        logger.log(f"Loaded cached shader program {label}: {load_ms:.2f} ms")
+        return program
+
+    def _store_binary(self, key, program):
+        if not self._binary_supported():
+            return
+        try:
+            length = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+            if length <= 0:
+                return
+            binary = np.zeros(length, dtype=np.uint8)
+            binary_format = np.zeros(1, dtype=np.uint32)
+            written = np.zeros(1, dtype=np.int32)
+            glGetProgramBinary(program, length, written, binary_format, binary)
+            with open(get_cache_path("shaders", key, "bin"), "wb") as f:
+                f.write(binary_format.tobytes())
+                f.write(binary[:written[0]].tobytes())
+        except Exception as e:
+            logger.log(f"Could not store shader binary: {e}")
+
+
+shader_manager = ShaderManager()
@@ -0,0 +1,244 @@
+"""
+Cascaded shadow maps for the directional light, with the static part cached.
+
+Each cascade covers a slice of the view frustum and owns one tile of a depth
+atlas. Static geometry (the StaticBatcher's batches) is rendered into a
+cached atlas, and a cascade is only re-rendered when the light direction,
+its bounds or a static object's transform change. Every frame the cached
+atlas is copied to a second one and only the dynamic casters are drawn on
+top. The bounds are snapped in light space with some slack around the
+slice, so they stay put while the camera moves or turns a little.
+"""
+
+import math
+import numpy as np
+from OpenGL.GL import *
+from pyrr import Matrix44, Vector3
+from rendering.my_shaders import DEPTH_VERTEX_SHADER_SRC, DEPTH_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.gpu_resources import gpu_resources
+from rendering.static_batcher import mesh_model_matrix
+
+# Fraction of a cascade's radius its bounds may drift before they move
+CASCADE_SLACK = 0.25
+
+
+def cascade_splits(near, far, count, blend=0.75):
+    """View depths where each cascade ends: a blend of logarithmic and uniform splits"""
+    splits = []
+    for i in range(1, count + 1):
+        f = i / count
+        splits.append(blend * near * (far / near) ** f + (1.0 - blend) * (near + (far - near) * f))
+    return splits
+
+
+def projection_clip_planes(projection):
+    """near, far of a pyrr perspective projection"""
+    p22, p32 = projection[2][2], projection[3][2]
+    return p32 / (p22 - 1.0), p32 / (p22 + 1.0)
+
+
+def light_rotation(direction):
+    """View matrix looking along direction from the origin"""
+    direction = Vector3(direction).normalized
+    up = Vector3([0.0, 1.0, 0.0]) if abs(direction.y) < 0.99 else Vector3([1.0, 0.0, 0.0])
+    return Matrix44.look_at(Vector3([0.0, 0.0, 0.0]), direction, up)
+
+
+def slice_sphere(view, projection, near, far):
+    """World-space centre and radius of the smallest sphere on the view axis around the frustum slice [near, far]"""
+    # Squared half-diagonal of the slice per unit depth
+    spread = 1.0 / projection[0][0] ** 2 + 1.0 / projection[1][1] ** 2
+    # Equidistant from the near and far corners, or the far plane's centre for wide slices.
+    # On the view axis, so the radius does not change when the camera turns
+    depth = min(far, (near + far) * (1.0 + spread) * 0.5)
+    radius = math.sqrt(max((far - depth) ** 2 + far * far * spread, (depth - near) ** 2 + near * near * spread))
+    camera = np.linalg.inv(np.asarray(view, dtype=np.float64))
+    return np.array([0.0, 0.0, -depth, 1.0]) @ camera, radius
+
+
+class Cascade:
+    def __init__(self, tile):
+        self.tile = tile  # (column, row) in the atlas
+        self.key = None   # snapped bounds the cached tile was rendered with
+        self.end_depth = 0.0
+        self.texel_world = 0.0
+        self.view_projection = np.identity(4)
+        self.shadow_matrix = np.identity(4)
+
+
+class CascadedShadowMaps:
+    def __init__(self, tile_size=1024, cascade_count=4, distance=60.0, caster_distance=100.0):
+        self.tile_size = tile_size
+        self.grid = math.ceil(math.sqrt(cascade_count))
+        self.atlas_size = tile_size * self.grid
+        self.distance = distance
+        self.caster_distance = caster_distance
+        self.cascades = [Cascade((i % self.grid, i // self.grid)) for i in range(cascade_count)]
+        self.program = shader_manager.get_program(DEPTH_VERTEX_SHADER_SRC, DEPTH_FRAGMENT_SHADER_SRC, name="depth")
+        self.static_atlas, self.static_fbo = self.create_atlas()
+        self.frame_atlas, self.frame_fbo = self.create_atlas()
+        self.texture = self.static_atlas  # the atlas to sample this frame
+        self.light_direction = None
+        self.static_version = None
+        self.static_renders = 0  # cascade re-renders of the cached atlas, for profiling
+
+    def create_atlas(self):
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_DEPTH_COMPONENT24, self.atlas_size, self.atlas_size, 0,
+                     GL_DEPTH_COMPONENT, GL_FLOAT, None)
+        gpu_resources.track("texture", texture, "shadows", self.atlas_size * self.atlas_size * 4)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        # Hardware depth comparison, filtered 2x2 by GL_LINEAR
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_COMPARE_MODE, GL_COMPARE_REF_TO_TEXTURE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_COMPARE_FUNC, GL_LEQUAL)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, texture, 0)
+        glDrawBuffer(GL_NONE)
+        glReadBuffer(GL_NONE)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        return texture, fbo
+
+    def fit_cascades(self, view, projection, light_direction):
+        """Recompute every cascade's bounds; returns the cascades whose snapped bounds moved"""
+        near, far = projection_clip_planes(projection)
+        far = min(far, self.distance)
+        rotation = light_rotation(light_direction)
+        moved = []
+        start = near
+        for cascade, end in zip(self.cascades, cascade_splits(near, far, len(self.cascades))):
+            centre, radius = slice_sphere(view, projection, start, end)
+            half = radius * (1.0 + CASCADE_SLACK)
+            texel = 2.0 * half / self.tile_size
+            # Snapping to whole texels keeps edges from shimmering; to whole steps keeps the cache valid
+            step = max(1.0, math.floor(CASCADE_SLACK * radius / texel)) * texel
+            x, y, z = (centre @ np.asarray(rotation))[:3]
+            x, y, z = (round(v / step) * step for v in (x, y, z))
+            key = (x, y, z, half)
+            if key != cascade.key:
+                cascade.key = key
+                moved.append(cascade)
+
+            # Looking down -z in light space; casters up to caster_distance towards the light are kept
+            ortho = Matrix44.orthogonal_projection(x - half, x + half, y - half, y + half,
+                                                   -z - half - self.caster_distance, -z + half)
+            cascade.view_projection = np.asarray(rotation) @ np.asarray(ortho)
+            column, row = cascade.tile
+            scale, offset = 0.5 / self.grid, 1.0 / self.grid
+            to_atlas = np.array([[scale, 0, 0, 0], [0, scale, 0, 0], [0, 0, 0.5, 0],
+                                 [(column + 0.5) * offset, (row + 0.5) * offset, 0.5, 1]])
+            cascade.shadow_matrix = cascade.view_projection @ to_atlas
+            cascade.end_depth = end
+            cascade.texel_world = texel
+            start = end
+        return moved
+
+    def update(self, view, projection, light_direction, mesh_arena, batcher, objects):
+        """Bring the cached atlas up to date and composite this frame's dynamic casters"""
+        light_direction = tuple(float(v) for v in light_direction)
+        moved = self.fit_cascades(view, projection, light_direction)
+        static_version = batcher.version
+        if light_direction != self.light_direction or static_version != self.static_version:
+            dirty = self.cascades
+        else:
+            dirty = moved
+        self.light_direction = light_direction
+        self.static_version = static_version
+
+        dynamic = [obj for obj in objects if obj.mesh is not None and not obj.static]
+        if not dirty and not dynamic:
+            self.texture = self.static_atlas
+            return
+
+        previous_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+        previous_viewport = glGetIntegerv(GL_VIEWPORT)
+        glUseProgram(self.program)
+        glUniformMatrix4fv(glGetUniformLocation(self.program, "view"), 1, GL_FALSE,
+                           Matrix44.identity().astype('float32'))
+        model_location = glGetUniformLocation(self.program, "model")
+        projection_location = glGetUniformLocation(self.program, "projection")
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_SCISSOR_TEST)
+        glEnable(GL_POLYGON_OFFSET_FILL)
+        glPolygonOffset(1.5, 2.0)
+        mesh_arena.bind()
+
+        if dirty:
+            glBindFramebuffer(GL_FRAMEBUFFER, self.static_fbo)
+            glUniformMatrix4fv(model_location, 1, GL_FALSE, Matrix44.identity().astype('float32'))
+            for cascade in dirty:
+                self.begin_tile(cascade, projection_location, clear=True)
+                for batch in batcher.batches.values():
+                    mesh_arena.multi_draw(*batch.draw_arrays(mesh_arena.generation))
+                self.static_renders += 1
+
+        if dynamic:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.static_fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.frame_fbo)
+            glDisable(GL_SCISSOR_TEST)
+            glBlitFramebuffer(0, 0, self.atlas_size, self.atlas_size, 0, 0, self.atlas_size, self.atlas_size,
+                              GL_DEPTH_BUFFER_BIT, GL_NEAREST)
+            glEnable(GL_SCISSOR_TEST)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.frame_fbo)
+            allocations = [(mesh_arena.get_mesh(obj.mesh), mesh_model_matrix(obj.location, obj.rotation, obj.scale))
+                           for obj in dynamic]
+            mesh_arena.bind()
+            for cascade in self.cascades:
+                self.begin_tile(cascade, projection_location, clear=False)
+                for allocation, model in allocations:
+                    glUniformMatrix4fv(model_location, 1, GL_FALSE, model.astype('float32'))
+                    mesh_arena.draw(allocation)
+            self.texture = self.frame_atlas
+        else:
+            self.texture = self.static_atlas
+
+        glDisable(GL_POLYGON_OFFSET_FILL)
+        glDisable(GL_SCISSOR_TEST)
+        glBindVertexArray(0)
+        glUseProgram(0)
+        glBindFramebuffer(GL_FRAMEBUFFER, int(previous_fbo))
+        glViewport(*[int(v) for v in previous_viewport])
+
+    def begin_tile(self, cascade, projection_location, clear):
+        column, row = cascade.tile
+        x, y = column * self.tile_size, row * self.tile_size
+        glViewport(x, y, self.tile_size, self.tile_size)
+        glScissor(x, y, self.tile_size, self.tile_size)
+        if clear:
+            glClear(GL_DEPTH_BUFFER_BIT)
+        glUniformMatrix4fv(projection_location, 1, GL_FALSE, cascade.view_projection.astype('float32'))
+
+    def bind(self, program, unit):
+        """Atlas and per-cascade uniforms for the SHADOWS variant of the PBR shader"""
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+        count = len(self.cascades)
+        glUniform1i(glGetUniformLocation(program, "shadowAtlas"), unit)
+        glUniform1i(glGetUniformLocation(program, "cascadeCount"), count)
+        glUniformMatrix4fv(glGetUniformLocation(program, "shadowMatrices"), count, GL_FALSE,
+                           np.array([c.shadow_matrix for c in self.cascades], dtype=np.float32))
+        glUniform1fv(glGetUniformLocation(program, "cascadeEnds"), count,
+                     np.array([c.end_depth for c in self.cascades], dtype=np.float32))
+        glUniform1fv(glGetUniformLocation(program, "cascadeTexels"), count,
+                     np.array([c.texel_world for c in self.cascades], dtype=np.float32))
+        glUniform1f(glGetUniformLocation(program, "atlasTexel"), 1.0 / self.atlas_size)
+
+    def release(self):
+        for fbo in (self.static_fbo, self.frame_fbo):
+            gpu_resources.delete_framebuffer(fbo)
+        for texture in (self.static_atlas, self.frame_atlas):
+            gpu_resources.delete_texture(texture)
+
+
+def bind_no_shadows(program, unit):
+    """Uniforms for the SHADOWS variant before any cascade exists: everything lit"""
+    glUniform1i(glGetUniformLocation(program, "shadowAtlas"), unit)
+    glUniform1i(glGetUniformLocation(program, "cascadeCount"), 0)
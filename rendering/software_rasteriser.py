@@ -0,0 +1,386 @@
+"""
+Software rasteriser: draws the same MeshData, Material and camera matrices
+as Rasteriser.draw_mesh into NumPy buffers, with no GL context, so scenes
+can be rendered in tests, thumbnails and on machines without a GPU.
+
+Triangles are clipped against the near plane and set up as edge functions
+in one vectorised pass. A triangle whose screen bounds fit in a small stamp
+is tested against that stamp of pixels; larger ones are binned into
+TILE_SIZE x TILE_SIZE screen tiles and tested tile by tile. Every covered
+pixel becomes a fragment; the nearest fragment per pixel wins the z-test
+and only the winners are shaded, with the equations of FRAGMENT_SHADER_SRC
+(directional light, point/spot lights, SH irradiance and split-sum IBL).
+
+Images are top row first, as PIL expects.
+"""
+
+import math
+import numpy as np
+from rendering.ibl import load_ibl
+from rendering.sh_lighting import load_sky_irradiance
+from rendering.lighting import pack_lights
+from rendering.static_batcher import mesh_model_matrix, transform_mesh
+from rendering.mesh_arena import mesh_vertex_data
+
+TILE_SIZE = 16
+STAMP_SIZES = (2, 4, 8)    # bounding box sizes rasterised in one stamp
+PIXEL_BATCH = 1 << 20      # pixel tests evaluated at once
+DIR_LIGHT_DIRECTION = np.array([-0.5, -1.0, -0.5])  # as Rasteriser.light_direction
+DIR_LIGHT_RADIANCE = np.array([1.0, 1.0, 1.0])
+
+
+def clip_near(vertices):
+    """
+    Clip a (T, 3, K) triangle soup against the near plane (z >= -w in clip
+    space; x, y, z, w are the first four values). Triangles crossing it
+    become one or two triangles with interpolated attributes.
+    """
+    distance = vertices[:, :, 2] + vertices[:, :, 3]
+    inside = distance >= 0.0
+    count = inside.sum(axis=1)
+    parts = [vertices[count == 3]]
+
+    def rolled(mask, odd):
+        # Put the odd vertex first, keeping the winding
+        order = (odd[mask][:, None] + np.arange(3)) % 3
+        v = np.take_along_axis(vertices[mask], order[:, :, None], axis=1)
+        d = np.take_along_axis(distance[mask], order, axis=1)
+        return v, d
+
+    def lerp(v, d, a, b):
+        t = (d[:, a] / (d[:, a] - d[:, b]))[:, None]
+        return v[:, a] + (v[:, b] - v[:, a]) * t
+
+    one = count == 1
+    if one.any():
+        v, d = rolled(one, np.argmax(inside, axis=1))
+        parts.append(np.stack([v[:, 0], lerp(v, d, 0, 1), lerp(v, d, 0, 2)], axis=1))
+    two = count == 2
+    if two.any():
+        v, d = rolled(two, np.argmin(inside, axis=1))
+        near_p, near_q = lerp(v, d, 0, 1), lerp(v, d, 0, 2)
+        parts.append(np.stack([near_p, v[:, 1], v[:, 2]], axis=1))
+        parts.append(np.stack([near_p, v[:, 2], near_q], axis=1))
+    return np.concatenate(parts)
+
+
+class TriangleSetup:
+    """Screen-space edge functions, depth planes and pixel bounds of clipped triangles"""
+    def __init__(self, vertices, width, height):
+        clip = vertices[:, :, :4]
+        inv_w = 1.0 / clip[:, :, 3]
+        x = (clip[:, :, 0] * inv_w * 0.5 + 0.5) * width
+        y = (0.5 - clip[:, :, 1] * inv_w * 0.5) * height
+        z = clip[:, :, 2] * inv_w * 0.5 + 0.5
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (y[:, 1] - y[:, 0]) * (x[:, 2] - x[:, 0])
+
+        # Pixels whose centres can be covered
+        x0 = np.maximum(np.ceil(x.min(axis=1) - 0.5), 0)
+        x1 = np.minimum(np.floor(x.max(axis=1) - 0.5), width - 1)
+        y0 = np.maximum(np.ceil(y.min(axis=1) - 0.5), 0)
+        y1 = np.minimum(np.floor(y.max(axis=1) - 0.5), height - 1)
+        keep = (np.abs(area) > 1e-12) & (x0 <= x1) & (y0 <= y1)
+
+        self.vertices = vertices[keep]
+        self.inv_w = inv_w[keep]
+        x, y, z, area = x[keep], y[keep], z[keep], area[keep]
+        self.bounds = np.stack([x0[keep], y0[keep], x1[keep], y1[keep]], axis=1).astype(np.int64)
+
+        # Barycentric weight i = A_i * px + B_i * py + C_i, opposite edge (i+1, i+2)
+        a_x, a_y = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+        b_x, b_y = np.roll(x, -2, axis=1), np.roll(y, -2, axis=1)
+        self.a = -(b_y - a_y) / area[:, None]
+        self.b = (b_x - a_x) / area[:, None]
+        self.c = ((b_y - a_y) * a_x - (b_x - a_x) * a_y) / area[:, None]
+        # Window depth is affine in screen space
+        self.depth = np.stack([(self.a * z).sum(1), (self.b * z).sum(1), (self.c * z).sum(1)], axis=1)
+
+    def __len__(self):
+        return len(self.bounds)
+
+
+def _cover(setup, triangles, origin_x, origin_y, size, width, height):
+    """Fragments (pixel, depth, triangle, l1, l2) of size x size stamps at the given origins"""
+    dy, dx = np.divmod(np.arange(size * size), size)
+    rows = max(1, PIXEL_BATCH // (size * size))
+    parts = []
+    for start in range(0, len(triangles), rows):
+        tri = triangles[start:start + rows]
+        px = origin_x[start:start + rows, None] + dx[None, :]
+        py = origin_y[start:start + rows, None] + dy[None, :]
+        cx, cy = px + 0.5, py + 0.5
+        a, b, c = setup.a[tri], setup.b[tri], setup.c[tri]
+        l0 = a[:, 0:1] * cx + b[:, 0:1] * cy + c[:, 0:1]
+        l1 = a[:, 1:2] * cx + b[:, 1:2] * cy + c[:, 1:2]
+        l2 = a[:, 2:3] * cx + b[:, 2:3] * cy + c[:, 2:3]
+        covered = (l0 >= 0.0) & (l1 >= 0.0) & (l2 >= 0.0) & (px < width) & (py < height)
+        r, s = np.nonzero(covered)
+        if not len(r):
+            continue
+        t = tri[r]
+        plane = setup.depth[t]
+        depth = plane[:, 0] * cx[r, s] + plane[:, 1] * cy[r, s] + plane[:, 2]
+        parts.append((py[r, s] * width + px[r, s], depth, t, l1[r, s], l2[r, s]))
+    return parts
+
+
+def rasterise(setup, width, height):
+    """All fragments of the set-up triangles as (pixel, depth, triangle, l1, l2) arrays"""
+    bounds = setup.bounds
+    extent = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]) + 1
+    parts = []
+    smaller = 0
+    for size in STAMP_SIZES:
+        triangles = np.flatnonzero((extent > smaller) & (extent <= size))
+        smaller = size
+        if len(triangles):
+            parts += _cover(setup, triangles, bounds[triangles, 0], bounds[triangles, 1], size, width, height)
+
+    # Larger triangles: one (triangle, tile) pair per tile their bounds touch
+    large = np.flatnonzero(extent > STAMP_SIZES[-1])
+    if len(large):
+        tile_x0, tile_y0 = bounds[large, 0] // TILE_SIZE, bounds[large, 1] // TILE_SIZE
+        tiles_x = bounds[large, 2] // TILE_SIZE - tile_x0 + 1
+        tiles_y = bounds[large, 3] // TILE_SIZE - tile_y0 + 1
+        counts = tiles_x * tiles_y
+        pair = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        tiles_x = np.repeat(tiles_x, counts)
+        triangles = np.repeat(large, counts)
+        origin_x = (np.repeat(tile_x0, counts) + pair % tiles_x) * TILE_SIZE
+        origin_y = (np.repeat(tile_y0, counts) + pair // tiles_x) * TILE_SIZE
+        parts += _cover(setup, triangles, origin_x, origin_y, TILE_SIZE, width, height)
+
+    if not parts:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty, empty.astype(np.int64), empty, empty
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def nearest_fragments(pixel, depth):
+    """Index of the nearest fragment for every pixel that has one"""
+    order = np.lexsort((depth, pixel))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pixel[order[1:]] != pixel[order[:-1]]
+    return order[first]
+
+
+def sample_bilinear(image, u, v):
+    """Clamp-to-edge bilinear lookup of (H, W, C) image at normalised u (columns) and v (rows)"""
+    height, width = image.shape[:2]
+    x = np.clip(u * width - 0.5, 0.0, width - 1.0)
+    y = np.clip(v * height - 0.5, 0.0, height - 1.0)
+    x0 = np.minimum(x.astype(np.int64), width - 2) if width > 1 else np.zeros(len(x), dtype=np.int64)
+    y0 = np.minimum(y.astype(np.int64), height - 2) if height > 1 else np.zeros(len(y), dtype=np.int64)
+    fx = (x - x0)[:, None]
+    fy = (y - y0)[:, None]
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    top = image[y0, x0] * (1.0 - fx) + image[y0, x1] * fx
+    bottom = image[y1, x0] * (1.0 - fx) + image[y1, x1] * fx
+    return top * (1.0 - fy) + bottom * fy
+
+
+def sample_cubemap(faces, directions):
+    """
+    Bilinear lookup in (6, S, S, C) faces stored like rendering/ibl.py
+    (GL face order and orientation). Filtering stays within each face.
+    """
+    x, y, z = directions[:, 0], directions[:, 1], directions[:, 2]
+    ax, ay, az = np.abs(x), np.abs(y), np.abs(z)
+    use_x = (ax >= ay) & (ax >= az)
+    use_y = ~use_x & (ay >= az)
+    use_z = ~use_x & ~use_y
+    face = np.where(use_x, np.where(x > 0, 0, 1), np.where(use_y, np.where(y > 0, 2, 3), np.where(z > 0, 4, 5)))
+    major = np.maximum(np.where(use_x, ax, np.where(use_y, ay, az)), 1e-12)
+    sc = np.where(use_x, -z * np.sign(x), np.where(use_y, x, x * np.sign(z)))
+    tc = np.where(use_y, z * np.sign(y), -y)
+    s = (sc / major + 1.0) * 0.5
+    t = (tc / major + 1.0) * 0.5
+
+    result = np.empty((len(directions), faces.shape[-1]), dtype=np.float64)
+    for index in range(6):
+        mask = face == index
+        if mask.any():
+            result[mask] = sample_bilinear(faces[index], s[mask], t[mask])
+    return result
+
+
+def sample_cubemap_lod(mips, directions, lod):
+    """Trilinear lookup across prefiltered mip levels, like textureLod"""
+    lod = np.clip(lod, 0.0, len(mips) - 1.0)
+    low = np.floor(lod).astype(np.int64)
+    high = np.minimum(low + 1, len(mips) - 1)
+    blend = (lod - low)[:, None]
+    result = np.zeros((len(directions), 3))
+    for level in np.unique(np.concatenate([low, high])):
+        weight = np.where(low == level, 1.0 - blend[:, 0], 0.0) + np.where(high == level, blend[:, 0], 0.0)
+        # low == high at the last level: both terms apply, weights still sum to one
+        mask = weight > 0.0
+        if mask.any():
+            result[mask] += sample_cubemap(mips[level], directions[mask]) * weight[mask, None]
+    return result
+
+
+def evaluate_sh(coefficients, n):
+    x, y, z = n[:, 0:1], n[:, 1:2], n[:, 2:3]
+    c = coefficients
+    return (c[0] * 0.282095
+            + c[1] * (0.488603 * y)
+            + c[2] * (0.488603 * z)
+            + c[3] * (0.488603 * x)
+            + c[4] * (1.092548 * x * y)
+            + c[5] * (1.092548 * y * z)
+            + c[6] * (0.315392 * (3.0 * z * z - 1.0))
+            + c[7] * (1.092548 * x * z)
+            + c[8] * (0.546274 * (x * x - y * y)))
+
+
+def _dot(a, b):
+    return np.sum(a * b, axis=1, keepdims=True)
+
+
+def evaluate_light(n, v, l, radiance, f0, base_color, metallic, roughness):
+    """Cook-Torrance BRDF for one light per pixel (the shader's evaluateLight)"""
+    h = v + l
+    h /= np.maximum(np.linalg.norm(h, axis=1, keepdims=True), 1e-12)
+    a2 = roughness ** 4
+    n_dot_h = np.maximum(_dot(n, h), 0.0)
+    denom = n_dot_h * n_dot_h * (a2 - 1.0) + 1.0
+    ndf = a2 / (math.pi * denom * denom)
+    k = (roughness + 1.0) ** 2 / 8.0
+    n_dot_v = np.maximum(_dot(n, v), 0.0)
+    n_dot_l = np.maximum(_dot(n, l), 0.0)
+    geometry = (n_dot_v / (n_dot_v * (1.0 - k) + k)) * (n_dot_l / (n_dot_l * (1.0 - k) + k))
+    fresnel = f0 + (1.0 - f0) * np.clip(1.0 - np.maximum(_dot(h, v), 0.0), 0.0, 1.0) ** 5
+    k_d = (1.0 - fresnel) * (1.0 - metallic)
+    specular = ndf * geometry * fresnel / (4.0 * n_dot_v * n_dot_l + 0.0001)
+    return (k_d * base_color / math.pi + specular) * radiance * n_dot_l
+
+
+def _normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class SoftwareRasteriser:
+    """
+    CPU counterpart of Rasteriser with the same sky lighting. Call
+    begin_frame(), draw meshes, then read image(). Colour is kept in
+    linear HDR until image() tonemaps it like the shader does.
+    """
+    def __init__(self, width, height, sky_path="assets/justSky.hdr"):
+        self.width = width
+        self.height = height
+        self.sky_irradiance = load_sky_irradiance(sky_path).astype(np.float64)
+        self.prefilter_mips, self.brdf_lut = load_ibl(sky_path)
+        self.prefilter_max_lod = float(len(self.prefilter_mips) - 1)
+        self.lights = pack_lights([])
+        self.triangle_count = 0
+        self.fragment_count = 0
+        self.begin_frame()
+
+    def begin_frame(self, clear_color=(0.0, 0.0, 0.0)):
+        self.color = np.empty((self.height * self.width, 3), dtype=np.float32)
+        self.color[:] = clear_color
+        self.depth = np.ones(self.height * self.width)
+        self.triangle_count = 0
+        self.fragment_count = 0
+
+    def update_lights(self, lights):
+        """(position, Light) pairs, as for Rasteriser.update_lights"""
+        self.lights = pack_lights(lights)
+
+    def draw_mesh(self, mesh, position, rotation, scale, material, view, projection, camera_pos):
+        vertex_data, indices = mesh_vertex_data(mesh)
+        model = mesh_model_matrix(position, rotation, scale)
+        world = transform_mesh(vertex_data[:, :3], vertex_data[:, 3:], model)
+        self.draw_triangles(world, indices, material, view, projection, camera_pos)
+
+    def draw_scene(self, scene, view, projection, camera_pos):
+        """Every mesh object of an editor Scene, lit by its light components"""
+        self.update_lights([(obj.location, obj.light) for obj in scene.objects if obj.light is not None])
+        for obj in scene.objects:
+            if obj.mesh is not None:
+                self.draw_mesh(obj.mesh, obj.location, obj.rotation, obj.scale, obj.material,
+                               view, projection, camera_pos)
+
+    def draw_triangles(self, world, indices, material, view, projection, camera_pos):
+        """World-space (N, 6) positions and normals with triangle indices"""
+        world = np.asarray(world, dtype=np.float64)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        if not len(indices):
+            return
+        view_projection = np.asarray(view, dtype=np.float64) @ np.asarray(projection, dtype=np.float64)
+        clip = world[:, :3] @ view_projection[:3] + view_projection[3]
+        soup = clip_near(np.concatenate([clip, world], axis=1)[indices])
+        setup = TriangleSetup(soup, self.width, self.height)
+        self.triangle_count += len(setup)
+        pixel, depth, triangle, l1, l2 = rasterise(setup, self.width, self.height)
+        self.fragment_count += len(pixel)
+
+        # Depth test: the nearest fragment per pixel against the depth buffer
+        nearest = nearest_fragments(pixel, depth)
+        nearest = nearest[(depth[nearest] <= 1.0) & (depth[nearest] < self.depth[pixel[nearest]])]
+        if not len(nearest):
+            return
+        pixel, triangle = pixel[nearest], triangle[nearest]
+        self.depth[pixel] = depth[nearest]
+
+        # Perspective-correct interpolation of world position and normal
+        weights = np.stack([1.0 - l1[nearest] - l2[nearest], l1[nearest], l2[nearest]], axis=1)
+        weights *= setup.inv_w[triangle]
+        weights /= weights.sum(axis=1, keepdims=True)
+        attributes = np.einsum("fi,fik->fk", weights, setup.vertices[triangle, :, 4:10])
+        self.color[pixel] = self.shade(attributes[:, :3], attributes[:, 3:6], material, camera_pos)
+
+    def shade(self, position, normal, material, camera_pos):
+        """Linear HDR colour of each (position, normal), following FRAGMENT_SHADER_SRC"""
+        base_color = np.asarray(material.base_color, dtype=np.float64)
+        metallic = float(material.metallic)
+        roughness = float(material.roughness)
+        n = _normalize(normal)
+        v = _normalize(np.asarray(camera_pos, dtype=np.float64)[None, :] - position)
+        l = _normalize(-DIR_LIGHT_DIRECTION[None, :])
+        f0 = 0.04 * (1.0 - metallic) + base_color * metallic
+        surface = (f0, base_color, metallic, roughness)
+
+        lo = evaluate_light(n, v, l, DIR_LIGHT_RADIANCE, *surface)
+        for position_radius, color_inner, direction_outer in self.lights.astype(np.float64):
+            to_light = position_radius[:3] - position
+            distance = np.linalg.norm(to_light, axis=1, keepdims=True)
+            lit = distance[:, 0] < position_radius[3]
+            if not lit.any():
+                continue
+            light_dir = to_light / np.maximum(distance, 1e-4)
+            # Windowed inverse-square falloff reaching zero at the radius
+            window = np.clip(1.0 - (distance / position_radius[3]) ** 4, 0.0, 1.0)
+            attenuation = window * window / (distance * distance + 1.0)
+            cone = _dot(-light_dir, direction_outer[None, :3])
+            attenuation *= np.clip((cone - direction_outer[3]) / max(color_inner[3] - direction_outer[3], 1e-4), 0.0, 1.0)
+            radiance = color_inner[:3] * attenuation * lit[:, None]
+            lo += evaluate_light(n, v, light_dir, radiance, *surface)
+
+        # Ambient: SH diffuse irradiance plus split-sum specular IBL
+        n_dot_v = np.maximum(_dot(n, v), 0.0)
+        k_s = f0 + (np.maximum(1.0 - roughness, f0) - f0) * np.clip(1.0 - n_dot_v, 0.0, 1.0) ** 5
+        k_d = (1.0 - k_s) * (1.0 - metallic)
+        ambient = k_d * np.maximum(evaluate_sh(self.sky_irradiance, n), 0.0) * base_color
+        reflected = 2.0 * n_dot_v * n - v
+        prefiltered = sample_cubemap_lod(self.prefilter_mips, reflected,
+                                         np.full(len(n), roughness * self.prefilter_max_lod))
+        env_brdf = sample_bilinear(self.brdf_lut, n_dot_v[:, 0], np.full(len(n), roughness))
+        ambient += prefiltered * (k_s * env_brdf[:, 0:1] + env_brdf[:, 1:2])
+        return ambient + lo + np.asarray(material.emissive_color, dtype=np.float64)
+
+    def hdr_image(self):
+        """(height, width, 3) float32 linear colour"""
+        return self.color.reshape(self.height, self.width, 3)
+
+    def image(self):
+        """(height, width, 3) uint8 after the shader's Reinhard tonemap and gamma"""
+        color = np.maximum(self.hdr_image(), 0.0)
+        color = (color / (color + 1.0)) ** (1.0 / 2.2)
+        return (color * 255.0 + 0.5).astype(np.uint8)
+
+    def depth_image(self):
+        """(height, width) window depth, 1.0 where nothing was drawn"""
+        return self.depth.reshape(self.height, self.width)
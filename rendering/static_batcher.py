@@ -0,0 +1,149 @@
+"""
+Static batching: SceneObjects flagged `static` are transformed into world
+space once and stored in the MeshArena, then drawn with one
+glMultiDrawElementsBaseVertex call per material instead of a draw per object.
+"""
+
+import weakref
+import numpy as np
+from pyrr import Matrix44
+from rendering.my_shaders import Material
+from rendering.mesh_arena import interleave, build_draw_arrays
+from utils.logger import logger
+
+
+def mesh_model_matrix(position, rotation, scale):
+    """Model matrix used by Rasteriser.draw_mesh (row-vector convention)"""
+    model = Matrix44.identity()
+    model = model @ Matrix44.from_translation(position)
+    model = model @ Matrix44.from_eulers(rotation)
+    model = model @ Matrix44.from_scale(scale)
+    return np.asarray(model, dtype=np.float64)
+
+
+def material_key(material):
+    return (
+        tuple(material.base_color),
+        float(material.metallic),
+        float(material.roughness),
+        float(material.specular),
+        tuple(material.emissive_color),
+    )
+
+
+def material_from_key(key):
+    base_color, metallic, roughness, specular, emissive_color = key
+    return Material(base_color=base_color, metallic=metallic, roughness=roughness,
+                    specular=specular, emissive_color=emissive_color)
+
+
+def transform_key(obj):
+    return (id(obj.mesh), tuple(obj.location), tuple(obj.rotation), tuple(obj.scale))
+
+
+def transform_mesh(positions, normals, model):
+    """World-space (N, 6) arena vertex data for (N, 3) local positions and normals"""
+    world = positions @ model[:3, :3] + model[3, :3]
+    # Inverse transpose, as the vertex shader does for normals
+    world_normals = normals @ np.linalg.inv(model[:3, :3]).T
+    length = np.linalg.norm(world_normals, axis=1, keepdims=True)
+    np.divide(world_normals, length, out=world_normals, where=length > 0)
+    return interleave(world, world_normals)
+
+
+class StaticBatch:
+    """The arena allocations of every static object sharing one material"""
+    def __init__(self, key):
+        self.key = key
+        self.material = material_from_key(key)
+        self.signature = None
+        self.generation = None
+        self.allocations = []
+        self.counts = self.offsets = self.base_vertices = None
+
+    def draw_arrays(self, generation):
+        """Multi-draw arrays, rebuilt only if allocations were added or moved"""
+        if self.counts is None or self.generation != generation:
+            self.counts, self.offsets, self.base_vertices = build_draw_arrays(self.allocations)
+            self.generation = generation
+        return self.counts, self.offsets, self.base_vertices
+
+
+class StaticBatcher:
+    """
+    Tracks the static objects of a scene and keeps one StaticBatch per
+    material up to date. Call update() once per frame; each object owns an
+    arena allocation holding its world-space vertices, so moving an object
+    only rewrites its own range.
+    """
+    def __init__(self, arena):
+        self.arena = arena
+        self.batches = {}  # material key -> StaticBatch
+        self.local_arrays = weakref.WeakKeyDictionary()  # MeshData -> (positions, normals, indices)
+        self.objects = {}  # id(SceneObject) -> (transform key, MeshAllocation)
+        self.rebuild_count = 0
+        self.version = 0  # bumped whenever static geometry is added, moved or removed
+
+    def update(self, objects):
+        groups = {}
+        for obj in objects:
+            if obj.static and obj.mesh is not None:
+                groups.setdefault(material_key(obj.material), []).append(obj)
+
+        seen = set()
+        for key, members in groups.items():
+            batch = self.batches.get(key)
+            if batch is None:
+                batch = self.batches[key] = StaticBatch(key)
+            allocations = [self.get_allocation(obj) for obj in members]
+            seen.update(id(obj) for obj in members)
+            signature = tuple(id(a) for a in allocations)
+            if signature != batch.signature:
+                batch.allocations = allocations
+                batch.signature = signature
+                batch.counts = None
+                self.rebuild_count += 1
+
+        for key in list(self.batches):
+            if key not in groups:
+                del self.batches[key]
+        for object_id in list(self.objects):
+            if object_id not in seen:
+                self.arena.release(self.objects.pop(object_id)[1])
+                self.version += 1
+
+    def get_local_arrays(self, mesh):
+        arrays = self.local_arrays.get(mesh)
+        if arrays is None:
+            positions = np.asarray(mesh.vertices, dtype=np.float64).reshape(-1, 3)
+            normals = np.zeros_like(positions)
+            if mesh.normals is not None and len(mesh.normals) == positions.size:
+                normals = np.asarray(mesh.normals, dtype=np.float64).reshape(-1, 3)
+            indices = np.asarray(mesh.indices, dtype=np.uint32)
+            arrays = self.local_arrays[mesh] = (positions, normals, indices)
+        return arrays
+
+    def get_allocation(self, obj):
+        key = transform_key(obj)
+        cached = self.objects.get(id(obj))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        positions, normals, indices = self.get_local_arrays(obj.mesh)
+        model = mesh_model_matrix(obj.location, obj.rotation, obj.scale)
+        vertex_data = transform_mesh(positions, normals, model)
+        allocation = cached[1] if cached is not None else None
+        if allocation is not None and allocation.vertex_count == len(vertex_data) \
+                and allocation.index_count == len(indices):
+            # Same size (normally the same mesh moved): rewrite the range in place
+            self.arena.write(allocation, vertex_data, None if cached[0][0] == key[0] else indices)
+        else:
+            if cached is not None:
+                self.arena.release(cached[1])
+            allocation = self.arena.allocate(vertex_data, indices)
+        self.objects[id(obj)] = (key, allocation)
+        self.version += 1
+        return allocation
+
+    def draw_call_count(self):
+        return len(self.batches)
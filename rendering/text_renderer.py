@@ -0,0 +1,306 @@
+"""
+Text rendering from a glyph atlas: every glyph of a font is baked once per
+(font, size) into a single-channel texture, optionally as a signed distance
+field so it stays sharp when scaled. TextBatcher lays strings out into one
+streaming vertex buffer, so all queued text is drawn with a single call.
+"""
+
+import os
+import ctypes
+import numpy as np
+import cv2
+from PIL import Image, ImageDraw, ImageFont
+from OpenGL.GL import *
+from rendering.my_shaders import TEXT_VERTEX_SHADER_SRC, TEXT_FRAGMENT_SHADER_SRC
+from rendering.shader_manager import shader_manager
+from rendering.gpu_resources import gpu_resources, current_context
+from utils.logger import logger
+
+DEFAULT_CHARSET = "".join(chr(c) for c in range(32, 127))
+SDF_SPREAD = 6            # pixels of distance encoded either side of the edge
+VERTEX_FLOATS = 8         # x, y, u, v, r, g, b, a
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+LAYOUT_CACHE_SIZE = 512
+
+_atlases = {}
+
+
+def load_font(font_path, size):
+    """TrueType font at size, falling back to PIL's bundled font if the file is missing"""
+    if font_path and os.path.exists(font_path):
+        return ImageFont.truetype(font_path, size)
+    logger.log(f"Font {font_path} not found, using default font")
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def get_glyph_atlas(font_path, size, sdf=False):
+    """Shared atlas for a font and size; baked on first request"""
+    key = (font_path, size, sdf)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = _atlases[key] = GlyphAtlas(load_font(font_path, size), sdf=sdf)
+    return atlas
+
+
+def signed_distance_field(mask, spread):
+    """Map a 0-255 coverage mask to 0..1 distances, 0.5 on the glyph edge"""
+    inside = (mask >= 128).astype(np.uint8)
+    dist_in = cv2.distanceTransform(inside, cv2.DIST_L2, 5)
+    dist_out = cv2.distanceTransform(1 - inside, cv2.DIST_L2, 5)
+    return np.clip(0.5 + (dist_in - dist_out) / (2.0 * spread), 0.0, 1.0)
+
+
+class GlyphAtlas:
+    """
+    Glyph bitmaps shelf-packed into one texture plus per-glyph metrics, stored
+    as arrays indexed by character code so layout is vectorised.
+    """
+    def __init__(self, font, charset=DEFAULT_CHARSET, sdf=False):
+        self.font = font
+        self.sdf = sdf
+        self.padding = SDF_SPREAD if sdf else 1
+        if isinstance(font, ImageFont.FreeTypeFont):
+            ascent, descent = font.getmetrics()
+            self.anchor = {"anchor": "ls"}
+        else:
+            # Bitmap fonts have no baseline anchor; boxes are relative to the top
+            ascent, descent = 0, font.getbbox("Ag")[3]
+            self.anchor = {}
+        self.ascent = ascent
+        self.line_height = ascent + descent
+        self.textures = {}  # GL context -> texture id
+
+        bitmaps = {}
+        for ch in charset:
+            bitmaps[ch] = self._render_glyph(ch)
+        self.image = self._pack(bitmaps)
+
+    def _render_glyph(self, ch):
+        # Boxes are relative to the pen position on the baseline
+        left, top, right, bottom = self.font.getbbox(ch, **self.anchor)
+        advance = self.font.getlength(ch)
+        if right <= left or bottom <= top:
+            return None, (0, 0, 0, 0), advance
+        pad = self.padding
+        image = Image.new("L", (right - left + 2 * pad, bottom - top + 2 * pad), 0)
+        ImageDraw.Draw(image).text((pad - left, pad - top), ch, font=self.font, fill=255, **self.anchor)
+        bitmap = np.array(image)
+        if self.sdf:
+            bitmap = (signed_distance_field(bitmap, SDF_SPREAD) * 255.0).astype(np.uint8)
+        return bitmap, (left - pad, top - pad, image.width, image.height), advance
+
+    def _pack(self, bitmaps):
+        area = sum(b.size for b, _, _ in bitmaps.values() if b is not None)
+        width = 64
+        while width * width < area * 1.3:
+            width *= 2
+
+        # Shelf packing, tallest glyphs first
+        order = sorted((ch for ch in bitmaps if bitmaps[ch][0] is not None),
+                       key=lambda ch: -bitmaps[ch][0].shape[0])
+        positions = {}
+        x = y = shelf_height = 0
+        for ch in order:
+            h, w = bitmaps[ch][0].shape
+            if x + w > width:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            positions[ch] = (x, y)
+            x += w
+            shelf_height = max(shelf_height, h)
+        height = 1
+        while height < y + shelf_height:
+            height *= 2
+
+        image = np.zeros((height, width), dtype=np.uint8)
+        count = max(ord(ch) for ch in bitmaps) + 1
+        self.advances = np.zeros(count, dtype=np.float32)
+        self.rects = np.zeros((count, 4), dtype=np.float32)  # x offset, y offset, width, height
+        self.uvs = np.zeros((count, 4), dtype=np.float32)    # u0, v0, u1, v1
+        self.visible = np.zeros(count, dtype=bool)
+        self.defined = np.zeros(count, dtype=bool)
+        for ch, (bitmap, rect, advance) in bitmaps.items():
+            code = ord(ch)
+            self.advances[code] = advance
+            self.rects[code] = rect
+            self.defined[code] = True
+            if bitmap is not None:
+                px, py = positions[ch]
+                h, w = bitmap.shape
+                image[py:py + h, px:px + w] = bitmap
+                self.uvs[code] = (px / width, py / height, (px + w) / width, (py + h) / height)
+                self.visible[code] = True
+        self.fallback = ord("?") if "?" in bitmaps else 32
+        return image
+
+    def codes(self, text):
+        codes = np.fromiter(map(ord, text), dtype=np.int64, count=len(text))
+        known = (codes < len(self.defined))
+        known[known] = self.defined[codes[known]]
+        return np.where(known, codes, self.fallback)
+
+    def measure(self, text, scale=1.0):
+        """(width, height) in pixels of text, which may contain newlines"""
+        lines = text.split("\n")
+        width = max(float(self.advances[self.codes(line)].sum()) for line in lines)
+        return width * scale, self.line_height * len(lines) * scale
+
+    def texture(self):
+        """GL texture for the current context, uploaded on first use"""
+        context = current_context()
+        texture = self.textures.get(context)
+        if texture is None:
+            height, width = self.image.shape
+            texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, width, height, 0, GL_RED, GL_UNSIGNED_BYTE, self.image)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+            glBindTexture(GL_TEXTURE_2D, 0)
+            gpu_resources.track("texture", texture, "ui", width * height)
+            self.textures[context] = texture
+        return texture
+
+
+class TextBatcher:
+    """
+    Collects text for a frame and draws it in one glDrawArrays call. Queue
+    strings with add_text() and call flush() once per frame.
+    """
+    def __init__(self, atlas, capacity=1024):
+        self.atlas = atlas
+        self.program = shader_manager.get_program(
+            TEXT_VERTEX_SHADER_SRC, TEXT_FRAGMENT_SHADER_SRC,
+            defines=["SDF_TEXT"] if atlas.sdf else None, name="text")
+        self.layouts = {}  # (text, scale) -> (6 * glyphs, 4) local x, y, u, v
+        self.pending = []
+        self.capacity = 0
+        self.vbo = None
+        self.vao = glGenVertexArrays(1)
+        self._ensure_capacity(capacity)
+        self.glyph_count = 0
+        self.draw_calls = 0
+
+    def _ensure_capacity(self, glyphs):
+        if glyphs <= self.capacity:
+            return
+        capacity = max(glyphs, self.capacity * 2)
+        if self.vbo is not None:
+            gpu_resources.delete_buffer(self.vbo)
+        self.vbo = gpu_resources.create_buffer("ui", capacity * 6 * VERTEX_STRIDE, GL_STREAM_DRAW)
+        self.capacity = capacity
+
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(8))
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(16))
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def layout(self, text, scale=1.0):
+        """Glyph quads for text relative to its top-left corner, cached per string"""
+        key = (text, scale)
+        quads = self.layouts.get(key)
+        if quads is not None:
+            return quads
+
+        atlas = self.atlas
+        lines = []
+        for row, line in enumerate(text.split("\n")):
+            codes = atlas.codes(line)
+            pen_x = np.cumsum(atlas.advances[codes]) - atlas.advances[codes]
+            codes, pen_x = codes[atlas.visible[codes]], pen_x[atlas.visible[codes]]
+            rects = atlas.rects[codes]
+            x0 = (pen_x + rects[:, 0]) * scale
+            y0 = (atlas.ascent + row * atlas.line_height + rects[:, 1]) * scale
+            x1 = x0 + rects[:, 2] * scale
+            y1 = y0 + rects[:, 3] * scale
+            u0, v0, u1, v1 = atlas.uvs[codes].T
+            # Two triangles per glyph
+            corners = np.stack([
+                np.stack([x0, y0, u0, v0], axis=1),
+                np.stack([x1, y0, u1, v0], axis=1),
+                np.stack([x1, y1, u1, v1], axis=1),
+                np.stack([x0, y0, u0, v0], axis=1),
+                np.stack([x1, y1, u1, v1], axis=1),
+                np.stack([x0, y1, u0, v1], axis=1),
+            ], axis=1)
+            lines.append(corners.reshape(-1, 4))
+        quads = np.concatenate(lines).astype(np.float32)
+
+        if len(self.layouts) >= LAYOUT_CACHE_SIZE:
+            self.layouts.clear()
+        self.layouts[key] = quads
+        return quads
+
+    def add_text(self, text, x, y, color=(1.0, 1.0, 1.0, 1.0), scale=1.0, center=False):
+        """Queue text with its top-left corner (or its centre if center=True) at x, y in pixels"""
+        if not text:
+            return
+        if center:
+            width, height = self.atlas.measure(text, scale)
+            x, y = x - width * 0.5, y - height * 0.5
+        quads = self.layout(text, scale)
+        if not len(quads):
+            return
+        vertices = np.empty((len(quads), VERTEX_FLOATS), dtype=np.float32)
+        vertices[:, 0] = quads[:, 0] + x
+        vertices[:, 1] = quads[:, 1] + y
+        vertices[:, 2:4] = quads[:, 2:4]
+        vertices[:, 4:8] = tuple(color) + (1.0,) * (4 - len(color))
+        self.pending.append(vertices)
+
+    def flush(self, width, height):
+        """Draw everything queued since the last flush onto a width x height target"""
+        if not self.pending:
+            self.glyph_count = self.draw_calls = 0
+            return
+        vertices = np.concatenate(self.pending) if len(self.pending) > 1 else self.pending[0]
+        self.pending = []
+        vertex_count = len(vertices)
+        self._ensure_capacity(vertex_count // 6)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        # Orphan last frame's storage so the upload never waits on the GPU
+        glBufferData(GL_ARRAY_BUFFER, self.capacity * 6 * VERTEX_STRIDE, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        depth_test = glIsEnabled(GL_DEPTH_TEST)
+        blend = glIsEnabled(GL_BLEND)
+        cull_face = glIsEnabled(GL_CULL_FACE)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_CULL_FACE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        glUseProgram(self.program)
+        glUniform2f(glGetUniformLocation(self.program, "screenSize"), width, height)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture())
+        glUniform1i(glGetUniformLocation(self.program, "glyphAtlas"), 0)
+        glBindVertexArray(self.vao)
+        glDrawArrays(GL_TRIANGLES, 0, vertex_count)
+        glBindVertexArray(0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glUseProgram(0)
+
+        if depth_test:
+            glEnable(GL_DEPTH_TEST)
+        if not blend:
+            glDisable(GL_BLEND)
+        if cull_face:
+            glEnable(GL_CULL_FACE)
+        self.glyph_count = vertex_count // 6
+        self.draw_calls = 1
@@ -1,6 +1,7 @@
 from PIL import Image
 import numpy as np
 from OpenGL.GL import *
+from rendering.gpu_resources import gpu_resources
 
 def load_texture(path):
     # Load image using PIL
@@ -43,3 +44,28 @@ def load_cubemap(faces):
     glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
     glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
     return tex_id
+
+def load_texture_array(paths, size=256):
+    # Every image is resized to size x size and stored as one layer, so any
+    # mix of block types can be sampled without rebinding
+    layers = np.empty((len(paths), size, size, 4), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        image = Image.open(path).convert('RGBA')
+        if image.size != (size, size):
+            image = image.resize((size, size), Image.LANCZOS)
+        layers[i] = np.array(image)
+
+    tex_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, tex_id)
+    # sRGB storage so the shader samples linear colour
+    glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, GL_SRGB8_ALPHA8, size, size, len(paths), 0, GL_RGBA, GL_UNSIGNED_BYTE, layers)
+    glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_REPEAT)
+    glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_REPEAT)
+    glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+
+    # Full mip chain is 4/3 of the base level
+    gpu_resources.track("texture", tex_id, "textures", layers.nbytes * 4 // 3)
+    return tex_id
@@ -0,0 +1,158 @@
+"""
+Editor debug view modes. "Lit" and "Unlit" are PBR shader variants drawn by
+the Rasteriser; the rest replace scene shading with heatmaps that show where
+frames get expensive:
+
+- Overdraw: every fragment adds one into a float target with additive
+  blending and no depth test, then a fullscreen pass colours the count.
+- Triangle Density: a geometry shader measures each triangle's screen area.
+- Draw Calls: each draw call gets a colour hashed from its index.
+- LOD: objects are coloured by the level of detail they were drawn at.
+"""
+
+from OpenGL.GL import *
+from pyrr import Matrix44
+from rendering.my_shaders import (DEPTH_VERTEX_SHADER_SRC, HEATMAP_GEOMETRY_SHADER_SRC, HEATMAP_FRAGMENT_SHADER_SRC,
+                                  RESOLVE_VERTEX_SHADER_SRC, OVERDRAW_FRAGMENT_SHADER_SRC)
+from rendering.shader_manager import shader_manager
+from rendering.gpu_resources import gpu_resources
+from rendering.static_batcher import mesh_model_matrix
+
+VIEW_MODES = ["Lit", "Unlit", "Overdraw", "Triangle Density", "Draw Calls", "LOD"]
+HEATMAP_MODES = VIEW_MODES[2:]
+
+# Fragments per pixel at the hot end of the overdraw ramp
+MAX_OVERDRAW = 8.0
+
+# LOD 0 first; deeper levels reuse the last colour
+LOD_COLORS = [(0.1, 0.8, 0.1), (0.2, 0.4, 1.0), (1.0, 0.9, 0.1), (1.0, 0.5, 0.0), (0.9, 0.1, 0.1)]
+
+
+def draw_call_color(index):
+    """Stable, well spread colour for a draw call index"""
+    h = (index * 0x9E3779B1 + 0x7F4A7C15) & 0xFFFFFFFF
+    h = ((h ^ (h >> 15)) * 0x2C1B3C6D) & 0xFFFFFFFF
+    h ^= h >> 12
+    # Keep every channel away from black so calls stand out from the background
+    return tuple(0.25 + 0.75 * ((h >> shift) & 0xFF) / 255.0 for shift in (0, 8, 16))
+
+
+class OverdrawTarget:
+    """R16F colour-only target the overdraw count is accumulated in, sized to the scene viewport"""
+    def __init__(self):
+        self.fbo = glGenFramebuffers(1)
+        self.texture = glGenTextures(1)
+        self.size = (0, 0)
+
+    def bind(self, width, height):
+        if (width, height) != self.size:
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_R16F, width, height, 0, GL_RED, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+            self.size = (width, height)
+            gpu_resources.track("texture", self.texture, "render_targets", width * height * 2)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, width, height)
+
+    def release(self):
+        gpu_resources.delete_framebuffer(self.fbo)
+        gpu_resources.delete_texture(self.texture)
+        self.size = (0, 0)
+
+
+class ViewModeRenderer:
+    """Draws the scene in one of HEATMAP_MODES instead of the lit pass"""
+    def __init__(self, mesh_arena, hdr_output=False):
+        self.mesh_arena = mesh_arena
+        defines = ["HDR_OUTPUT"] if hdr_output else []
+        self.programs = {
+            "Overdraw": shader_manager.get_program(
+                DEPTH_VERTEX_SHADER_SRC, HEATMAP_FRAGMENT_SHADER_SRC, defines + ["OVERDRAW"], name="overdraw"),
+            "Triangle Density": shader_manager.get_program(
+                DEPTH_VERTEX_SHADER_SRC, HEATMAP_FRAGMENT_SHADER_SRC, defines + ["TRIANGLE_DENSITY"],
+                name="triangle_density", geometry_src=HEATMAP_GEOMETRY_SHADER_SRC),
+            "Draw Calls": shader_manager.get_program(
+                DEPTH_VERTEX_SHADER_SRC, HEATMAP_FRAGMENT_SHADER_SRC, defines, name="heatmap"),
+        }
+        self.programs["LOD"] = self.programs["Draw Calls"]
+        self.overdraw_resolve = shader_manager.get_program(
+            RESOLVE_VERTEX_SHADER_SRC, OVERDRAW_FRAGMENT_SHADER_SRC, defines, name="overdraw_resolve")
+        self.overdraw_target = OverdrawTarget()
+        self.empty_vao = glGenVertexArrays(1)
+
+    def draw(self, mode, objects, batcher, view, projection):
+        """Draw into the currently bound framebuffer and viewport"""
+        program = self.programs[mode]
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        width, height = int(viewport[2]), int(viewport[3])
+        if mode == "Overdraw":
+            target_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+            clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+            self.overdraw_target.bind(width, height)
+            glClearColor(0.0, 0.0, 0.0, 0.0)
+            glClear(GL_COLOR_BUFFER_BIT)
+            glClearColor(*clear_color)
+            glDisable(GL_DEPTH_TEST)
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_ONE, GL_ONE)
+
+        glUseProgram(program)
+        glUniformMatrix4fv(glGetUniformLocation(program, "view"), 1, GL_FALSE, view.astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE, projection.astype('float32'))
+        glUniform2f(glGetUniformLocation(program, "screenSize"), width, height)
+        self.draw_geometry(program, mode, objects, batcher)
+
+        if mode == "Overdraw":
+            glDisable(GL_BLEND)
+            glBindFramebuffer(GL_FRAMEBUFFER, int(target_fbo))
+            glViewport(*[int(v) for v in viewport])
+            self.resolve_overdraw()
+            glEnable(GL_DEPTH_TEST)
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def draw_geometry(self, program, mode, objects, batcher):
+        """Static batches then dynamic meshes, in the same calls the lit pass makes"""
+        model_location = glGetUniformLocation(program, "model")
+        color_location = glGetUniformLocation(program, "flatColor")
+        self.mesh_arena.bind()
+        call = 0
+        if batcher.batches:
+            glUniformMatrix4fv(model_location, 1, GL_FALSE, Matrix44.identity().astype('float32'))
+            glUniform3f(color_location, *LOD_COLORS[0])
+            for batch in batcher.batches.values():
+                if mode == "Draw Calls":
+                    glUniform3f(color_location, *draw_call_color(call))
+                self.mesh_arena.multi_draw(*batch.draw_arrays(self.mesh_arena.generation))
+                call += 1
+        for obj in objects:
+            if obj.mesh is None or obj.static:
+                continue
+            allocation = self.mesh_arena.get_mesh(obj.mesh)
+            self.mesh_arena.bind()
+            glUniformMatrix4fv(model_location, 1, GL_FALSE,
+                               mesh_model_matrix(obj.location, obj.rotation, obj.scale).astype('float32'))
+            if mode == "Draw Calls":
+                glUniform3f(color_location, *draw_call_color(call))
+            elif mode == "LOD":
+                glUniform3f(color_location, *LOD_COLORS[min(obj.lod, len(LOD_COLORS) - 1)])
+            self.mesh_arena.draw(allocation)
+            call += 1
+
+    def resolve_overdraw(self):
+        glUseProgram(self.overdraw_resolve)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.overdraw_target.texture)
+        glUniform1i(glGetUniformLocation(self.overdraw_resolve, "overdrawCount"), 0)
+        glUniform1f(glGetUniformLocation(self.overdraw_resolve, "maxOverdraw"), MAX_OVERDRAW)
+        glBindVertexArray(self.empty_vao)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def release(self):
+        self.overdraw_target.release()
+        gpu_resources.delete_vertex_array(self.empty_vao)
@@ -0,0 +1,153 @@
+"""
+Draws the voxel map chunk by chunk. Block textures live in one
+GL_TEXTURE_2D_ARRAY and each vertex carries its layer, so a chunk is one
+draw call no matter how many block types it contains. Ambient occlusion is
+baked into the vertices while meshing.
+"""
+
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from pyrr import Matrix44
+from rendering.my_shaders import VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, Material
+from rendering.shader_manager import shader_manager
+from rendering.texture_loader import load_texture_array
+from rendering.gpu_resources import gpu_resources
+from world.blocks import block_texture_paths, block_layer_lookup
+from world.chunk_mesher import CHUNK_SIZE, VERTEX_DTYPE, voxel_grid, chunk_bounds, mesh_region
+from utils.logger import logger
+
+BLOCK_TEXTURE_UNIT = 10
+VERTEX_STRIDE = VERTEX_DTYPE.itemsize
+
+
+class VoxelChunk:
+    """GPU buffers of one chunk mesh"""
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+        self.vao = glGenVertexArrays(1)
+        self.vbo = glGenBuffers(1)
+        self.ebo = glGenBuffers(1)
+        self.index_count = 0
+
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(24))
+        glEnableVertexAttribArray(3)
+        glVertexAttribPointer(3, 1, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(32))
+        glEnableVertexAttribArray(4)
+        glVertexAttribPointer(4, 1, GL_UNSIGNED_BYTE, GL_TRUE, VERTEX_STRIDE, ctypes.c_void_p(36))
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def upload(self, vertices, indices):
+        self.index_count = len(indices)
+        if not self.index_count:
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        # The element binding is VAO state
+        glBindVertexArray(self.vao)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+        gpu_resources.track("buffer", self.vbo, "voxels", vertices.nbytes)
+        gpu_resources.track("buffer", self.ebo, "voxels", indices.nbytes)
+
+    def release(self):
+        gpu_resources.delete_buffer(self.vbo)
+        gpu_resources.delete_buffer(self.ebo)
+        gpu_resources.delete_vertex_array(self.vao)
+
+
+class VoxelRenderer:
+    """
+    Meshes game_map into CHUNK_SIZE x CHUNK_SIZE columns and draws them with
+    the Rasteriser's lighting and a block-textured variant of its shader.
+    set_block() re-meshes only the chunks an edit can affect.
+    """
+    def __init__(self, rasteriser, game_map, texture_array=None, chunk_size=CHUNK_SIZE):
+        self.rasteriser = rasteriser
+        defines = ["BLOCK_TEXTURES", "VERTEX_AO"] + (["HDR_OUTPUT"] if rasteriser.hdr_output else [])
+        self.program = shader_manager.get_program(VERTEX_SHADER_SRC, FRAGMENT_SHADER_SRC, defines, name="pbr")
+        self.texture_array = texture_array or load_texture_array(block_texture_paths())
+        self.layer_lookup = block_layer_lookup()
+        self.material = Material(base_color=(1.0, 1.0, 1.0), roughness=0.9)
+        self.chunk_size = chunk_size
+        self.voxels = voxel_grid(game_map)
+        self.chunks = {}  # (cx, cz) -> VoxelChunk
+        self.build()
+
+    def build(self):
+        for chunk in self.chunks.values():
+            chunk.release()
+        self.chunks = {}
+        for key, lo, hi in chunk_bounds(self.voxels.shape, self.chunk_size):
+            self.chunks[key] = VoxelChunk(lo, hi)
+            self.rebuild_chunk(key)
+        logger.log(f"Meshed {len(self.chunks)} voxel chunks")
+
+    def rebuild_chunk(self, key):
+        chunk = self.chunks[key]
+        chunk.upload(*mesh_region(self.voxels, self.layer_lookup, chunk.lo, chunk.hi))
+
+    def set_block(self, x, y, z, block_id):
+        """Change one block and re-mesh its chunk plus any neighbour whose faces or AO it touches"""
+        self.voxels[x, y, z] = block_id
+        size = self.chunk_size
+        # AO samples diagonal neighbours, so a corner edit reaches the diagonal chunk
+        keys = {((x + dx) // size, (z + dz) // size) for dx in (-1, 0, 1) for dz in (-1, 0, 1)}
+        for key in keys:
+            if key in self.chunks:
+                self.rebuild_chunk(key)
+
+    def draw(self, view, projection, camera_pos, visible_chunks=None, order=None):
+        """
+        Draw every chunk, or only the (cx, cz) keys in visible_chunks (e.g. from
+        the PVS). order lists keys to draw first (e.g. front to back from the
+        BSP) so early depth testing rejects the hidden fragments behind them.
+        """
+        program = self.program
+        glUseProgram(program)
+        glUniformMatrix4fv(glGetUniformLocation(program, "model"), 1, GL_FALSE, Matrix44.identity().astype('float32'))
+        glUniformMatrix4fv(glGetUniformLocation(program, "view"), 1, GL_FALSE, np.asarray(view, dtype=np.float32))
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE, np.asarray(projection, dtype=np.float32))
+        glUniform3fv(glGetUniformLocation(program, "viewPos"), 1, np.asarray(camera_pos, dtype=np.float32))
+        self.rasteriser.apply_material(program, self.material)
+        self.rasteriser.apply_lights(program)
+
+        glActiveTexture(GL_TEXTURE0 + BLOCK_TEXTURE_UNIT)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture_array)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(glGetUniformLocation(program, "blockTextures"), BLOCK_TEXTURE_UNIT)
+
+        # One draw per chunk, whatever mix of block types it holds
+        for key in self.draw_order(order):
+            if visible_chunks is not None and key not in visible_chunks:
+                continue
+            chunk = self.chunks[key]
+            if chunk.index_count:
+                glBindVertexArray(chunk.vao)
+                glDrawElements(GL_TRIANGLES, chunk.index_count, GL_UNSIGNED_INT, None)
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def draw_order(self, order):
+        """Chunk keys with those in order first, then any the order does not mention"""
+        if not order:
+            return list(self.chunks)
+        keys = [key for key in order if key in self.chunks]
+        listed = set(keys)
+        return keys + [key for key in self.chunks if key not in listed]
+
+    def release(self):
+        for chunk in self.chunks.values():
+            chunk.release()
+        self.chunks = {}
@@ -0,0 +1,33 @@
+"""
+Helpers for the on-disk cache of derived data (shader binaries, baked lighting, ...).
+"""
+
+import hashlib
+import os
+from utils.settings import CACHE_DIR
+
+
+def get_cache_dir(category):
+    path = os.path.join(CACHE_DIR, category)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_cache_path(category, key, extension):
+    return os.path.join(get_cache_dir(category), f"{key}.{extension}")
+
+
+def hash_strings(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
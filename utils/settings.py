@@ -21,6 +21,8 @@ DELTA_ANGLE = FOV / NUM_RAYS
 DIST = NUM_RAYS / (2 * math.tan(FOV / 2))
 PROJ_COEFF = 3 * DIST * TILE_SIZE_M
 SCALE = WIDTH // NUM_RAYS
+# "raster" draws the voxel map in 3D; "raycast" uses the 2.5D column raycaster
+RENDER_BACKEND = "raster"
 
 # Player settings
 PLAYER_SPEED = 3
@@ -35,3 +37,26 @@ MOUSE_SENSITIVITY = 0.002
 VERTICAL_LOOK_SCALE = 1000  # Higher = faster pitch
 
 LOG_DEBUG = True
+
+# Directory for derived data (shader binaries, baked lighting, etc.)
+CACHE_DIR = ".cache"
+
+# Meshes not drawn for this many frames give their GPU memory back
+MESH_EVICTION_FRAMES = 1800
+
+# Depth-only pre-pass before PBR shading: "auto" switches it from measured overdraw, or "on" / "off"
+DEPTH_PREPASS = "auto"
+
+# Cascaded shadow maps for the directional light: tile size per cascade (0 disables) and reach in metres
+SHADOW_MAP_SIZE = 1024
+SHADOW_CASCADES = 4  # at most 4
+SHADOW_DISTANCE = 60.0
+
+# Dynamic meshes further than this (metres) from the camera draw as baked octahedral impostors (0 disables)
+IMPOSTOR_DISTANCE = 80.0
+IMPOSTOR_FRAMES = 8       # views per atlas side
+IMPOSTOR_FRAME_SIZE = 64  # pixels per view
+
+
+# Draw a frame-rate counter in the top-left corner of the game window
+SHOW_FPS = False
@@ -0,0 +1,27 @@
+"""
+Block types used in game_map. 0 is air; every other id names the texture
+its faces use. Each texture is one layer of the block texture array, so a
+new block type adds a layer, not a draw call.
+"""
+
+import numpy as np
+
+AIR = 0
+STONE = 1
+
+BLOCK_TEXTURES = {
+    STONE: "assets/Stone_floor.jpg",
+}
+
+
+def block_texture_paths():
+    """Texture paths in layer order"""
+    return [BLOCK_TEXTURES[block_id] for block_id in sorted(BLOCK_TEXTURES)]
+
+
+def block_layer_lookup():
+    """Array mapping block id -> texture array layer (unknown ids use layer 0)"""
+    lookup = np.zeros(max(BLOCK_TEXTURES) + 1, dtype=np.float32)
+    for layer, block_id in enumerate(sorted(BLOCK_TEXTURES)):
+        lookup[block_id] = layer
+    return lookup
@@ -0,0 +1,343 @@
+"""
+2D BSP compiled from the voxel map's wall faces, in the style of Doom's
+node builder.
+
+Every face between a solid and an open cell of the wall layer (y=0) becomes
+a segment in the x/z plane. Collinear neighbours are merged, and each
+segment's normal points into open space. The tree is a solid-leaf BSP.
+Every segment ends up on a splitting line, so each leaf is a convex region
+that is entirely wall or entirely open. Leaves are labelled SOLID or EMPTY
+from the map at their centroid, so point and ray queries can answer "is this
+inside a wall" directly.
+
+Nodes and segments are flat NumPy arrays, so a compiled tree can be saved
+and cached like the PVS.
+"""
+
+import hashlib
+import os
+import numpy as np
+from utils.cache import get_cache_path, hash_strings
+from utils.logger import logger
+
+EMPTY = -1  # child index of an open leaf
+SOLID = -2  # child index of a solid leaf
+EPSILON = 1e-6
+SPLIT_WEIGHT = 8       # cost of one split relative to one segment of imbalance
+MAX_CANDIDATES = 32    # splitters scored per node
+
+NODE_DTYPE = np.dtype([
+    ("normal", np.float64, 2),
+    ("distance", np.float64),
+    ("front", np.int32),
+    ("back", np.int32),
+    ("first_segment", np.int32),
+    ("segment_count", np.int32),
+])
+
+
+def wall_segments(voxels):
+    """
+    (N, 4) segments x0, z0, x1, z1 and (N, 2) normals for the faces of the
+    wall layer of an (X, Y, Z) grid. Outside the map counts as solid.
+    """
+    solid = np.pad(voxels[:, 0, :] != 0, 1, constant_values=True)
+    segments = []
+    normals = []
+    for axis in (0, 1):
+        for sign in (-1, 1):
+            # Faces of solid cells whose neighbour along axis*sign is open
+            neighbour = np.roll(solid, -sign, axis=axis)
+            faces = solid & ~neighbour
+            if axis == 0:
+                faces[0 if sign < 0 else -1, :] = False
+            else:
+                faces[:, 0 if sign < 0 else -1] = False
+            lines = faces if axis == 0 else faces.T
+            # Merge runs along the face direction into single segments
+            padded = np.pad(lines.astype(np.int8), ((0, 0), (1, 1)))
+            edges = np.diff(padded, axis=1)
+            line_index, starts = np.nonzero(edges == 1)
+            _, ends = np.nonzero(edges == -1)
+            # Grid coordinates are offset by the padding cell
+            plane = line_index - 1 + (1 if sign > 0 else 0)
+            starts = starts - 1
+            ends = ends - 1
+            if axis == 0:
+                seg = np.stack([plane, starts, plane, ends], axis=1)
+            else:
+                seg = np.stack([starts, plane, ends, plane], axis=1)
+            normal = np.zeros((len(seg), 2))
+            normal[:, axis] = sign
+            # Orient every segment the same way relative to its normal
+            flip = np.cross(seg[:, 2:4] - seg[:, 0:2], normal) < 0
+            seg[flip] = seg[flip][:, [2, 3, 0, 1]]
+            segments.append(seg)
+            normals.append(normal)
+    return np.concatenate(segments).astype(np.float64), np.concatenate(normals)
+
+
+def score_splitters(segments, normals, candidates):
+    """Split count and front/back imbalance of each candidate's line, vectorised over all segments"""
+    cand_normals = normals[candidates]
+    cand_distance = np.einsum("ij,ij->i", cand_normals, segments[candidates, 0:2])
+    d0 = segments[:, 0:2] @ cand_normals.T - cand_distance
+    d1 = segments[:, 2:4] @ cand_normals.T - cand_distance
+    front = (d0 > EPSILON) | (d1 > EPSILON)
+    back = (d0 < -EPSILON) | (d1 < -EPSILON)
+    splits = (front & back).sum(axis=0)
+    imbalance = np.abs(front.sum(axis=0) - back.sum(axis=0))
+    return splits * SPLIT_WEIGHT + imbalance
+
+
+def partition(segments, normals, normal, distance):
+    """Split segments by a line; returns (front, back, on) as (segments, normals) pairs"""
+    d0 = segments[:, 0:2] @ normal - distance
+    d1 = segments[:, 2:4] @ normal - distance
+    on = (np.abs(d0) <= EPSILON) & (np.abs(d1) <= EPSILON)
+    front = ~on & (d0 >= -EPSILON) & (d1 >= -EPSILON)
+    back = ~on & (d0 <= EPSILON) & (d1 <= EPSILON)
+    spanning = ~(on | front | back)
+
+    span = segments[spanning]
+    t = (d0[spanning] / (d0[spanning] - d1[spanning]))[:, None]
+    middle = span[:, 0:2] + (span[:, 2:4] - span[:, 0:2]) * t
+    first = np.concatenate([span[:, 0:2], middle], axis=1)
+    second = np.concatenate([middle, span[:, 2:4]], axis=1)
+    first_in_front = d0[spanning] > 0
+
+    front_segments = np.concatenate([segments[front], first[first_in_front], second[~first_in_front]])
+    back_segments = np.concatenate([segments[back], first[~first_in_front], second[first_in_front]])
+    span_normals = normals[spanning]
+    front_normals = np.concatenate([normals[front], span_normals[first_in_front], span_normals[~first_in_front]])
+    back_normals = np.concatenate([normals[back], span_normals[~first_in_front], span_normals[first_in_front]])
+    return (front_segments, front_normals), (back_segments, back_normals), (segments[on], normals[on])
+
+
+class BspTree:
+    """
+    Compiled BSP: nodes (NODE_DTYPE), segments (N, 4) and segment normals
+    (N, 2) grouped per node. Child indices >= 0 are nodes, EMPTY or SOLID
+    are leaves.
+    """
+    def __init__(self, nodes, segments, normals):
+        self.nodes = nodes
+        self.segments = segments
+        self.normals = normals
+        self._lists = None
+
+    @classmethod
+    def build(cls, segments, normals, solid, seed=0):
+        """
+        Compile segments from wall_segments(); solid is the (X, Z) wall mask
+        used to label leaves.
+        """
+        rng = np.random.default_rng(seed)
+        bounds = np.array([[0.0, 0.0], [solid.shape[0], 0.0], [solid.shape[0], solid.shape[1]], [0.0, solid.shape[1]]])
+        nodes = []
+        out_segments = []
+        out_normals = []
+        segment_count = 0
+        # (segments, normals, convex region, parent node, is front child)
+        stack = [(segments, normals, bounds, None, True)] if len(segments) else []
+        while stack:
+            segs, norms, region, parent, is_front = stack.pop()
+            count = len(segs)
+            candidates = np.arange(count) if count <= MAX_CANDIDATES else \
+                rng.choice(count, MAX_CANDIDATES, replace=False)
+            best = candidates[np.argmin(score_splitters(segs, norms, candidates))]
+            normal = norms[best]
+            distance = float(normal @ segs[best, 0:2])
+            (front, front_normals), (back, back_normals), (on, on_normals) = \
+                partition(segs, norms, normal, distance)
+            front_region = clip_polygon(region, normal, distance)
+            back_region = clip_polygon(region, -normal, -distance)
+
+            index = len(nodes)
+            nodes.append((normal, distance,
+                          leaf_contents(front_region, solid),
+                          leaf_contents(back_region, solid),
+                          segment_count, len(on)))
+            out_segments.append(on)
+            out_normals.append(on_normals)
+            segment_count += len(on)
+            if parent is not None:
+                nodes[parent] = _set_child(nodes[parent], is_front, index)
+            if len(back):
+                stack.append((back, back_normals, back_region, index, False))
+            if len(front):
+                stack.append((front, front_normals, front_region, index, True))
+
+        if not nodes:
+            return cls(np.zeros(0, dtype=NODE_DTYPE), np.zeros((0, 4)), np.zeros((0, 2)))
+        return cls(np.array(nodes, dtype=NODE_DTYPE), np.concatenate(out_segments), np.concatenate(out_normals))
+
+    # --- serialisation ---
+
+    def save(self, path):
+        np.savez_compressed(path, nodes=self.nodes, segments=self.segments, normals=self.normals)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["nodes"], data["segments"], data["normals"])
+
+    # --- queries ---
+
+    def _plain_nodes(self):
+        """Node fields as Python lists; per-node NumPy indexing dominates traversal otherwise"""
+        if self._lists is None:
+            self._lists = (self.nodes["normal"][:, 0].tolist(), self.nodes["normal"][:, 1].tolist(),
+                           self.nodes["distance"].tolist(), self.nodes["front"].tolist(),
+                           self.nodes["back"].tolist())
+        return self._lists
+
+    def point_contents(self, x, z):
+        """EMPTY or SOLID for a point in the map plane"""
+        nx, nz, distance, front, back = self._plain_nodes()
+        node = 0 if len(self.nodes) else EMPTY
+        while node >= 0:
+            node = front[node] if nx[node] * x + nz[node] * z - distance[node] >= 0 else back[node]
+        return node
+
+    def is_solid(self, x, z):
+        return self.point_contents(x, z) == SOLID
+
+    def trace(self, x0, z0, x1, z1):
+        """Fraction (0-1) along the segment where it first enters a wall, or None if it stays open"""
+        if not len(self.nodes):
+            return None
+        return self._trace(0, 0.0, 1.0, x0, z0, x1 - x0, z1 - z0)
+
+    def _trace(self, node, t0, t1, x, z, dx, dz):
+        if node < 0:
+            return t0 if node == SOLID else None
+        nx, nz, distance, front, back = self._plain_nodes()
+        a = nx[node] * (x + dx * t0) + nz[node] * (z + dz * t0) - distance[node]
+        b = nx[node] * (x + dx * t1) + nz[node] * (z + dz * t1) - distance[node]
+        if a >= 0 and b >= 0:
+            return self._trace(front[node], t0, t1, x, z, dx, dz)
+        if a < 0 and b < 0:
+            return self._trace(back[node], t0, t1, x, z, dx, dz)
+        middle = t0 + (t1 - t0) * a / (a - b)
+        near, far = (front[node], back[node]) if a >= 0 else (back[node], front[node])
+        hit = self._trace(near, t0, middle, x, z, dx, dz)
+        if hit is not None:
+            return hit
+        return self._trace(far, middle, t1, x, z, dx, dz)
+
+    def front_to_back(self, x, z):
+        """Node indices ordered nearest first from the viewpoint (x, z)"""
+        nx, nz, distance, front, back = self._plain_nodes()
+        order = []
+        stack = [0] if len(self.nodes) else []
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                # Emit a node's segments between its near and far subtrees
+                order.append(-node - 3)
+                continue
+            if nx[node] * x + nz[node] * z - distance[node] >= 0:
+                near, far = front[node], back[node]
+            else:
+                near, far = back[node], front[node]
+            # Popped in reverse: near subtree, this node's segments, far subtree
+            if far >= 0:
+                stack.append(far)
+            stack.append(-node - 3)
+            if near >= 0:
+                stack.append(near)
+        return order
+
+    def back_to_front(self, x, z):
+        """Node indices ordered farthest first, e.g. for sorting transparent surfaces"""
+        return self.front_to_back(x, z)[::-1]
+
+    def segment_order(self, x, z, front_to_back=True):
+        """Segment indices in traversal order, skipping segments facing away from the viewpoint"""
+        nodes = self.front_to_back(x, z) if front_to_back else self.back_to_front(x, z)
+        if not nodes:
+            return np.zeros(0, dtype=np.int64)
+        first = self.nodes["first_segment"][nodes].astype(np.int64)
+        count = self.nodes["segment_count"][nodes].astype(np.int64)
+        # Expand each node's [first, first + count) range in traversal order
+        offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        indices = np.repeat(first, count) + offsets
+        facing = np.einsum("ij,ij->i", self.normals[indices], np.array([x, z]) - self.segments[indices, 0:2]) > 0
+        return indices[facing]
+
+    def chunk_order(self, x, z, chunk_size):
+        """(cx, cz) chunk keys in the order their walls first appear front to back"""
+        indices = self.segment_order(x, z)
+        midpoints = (self.segments[indices, 0:2] + self.segments[indices, 2:4]) * 0.5
+        # Nudge into the solid cell the face belongs to
+        cells = np.floor(midpoints - self.normals[indices] * 0.5).astype(np.int64) // chunk_size
+        order = []
+        seen = set()
+        for key in map(tuple, cells.tolist()):
+            if key not in seen:
+                seen.add(key)
+                order.append(key)
+        return order
+
+    def depth(self):
+        depths = np.zeros(len(self.nodes), dtype=np.int64)
+        for index in range(len(self.nodes)):
+            for child in (self.nodes[index]["front"], self.nodes[index]["back"]):
+                if child >= 0:
+                    depths[child] = depths[index] + 1
+        return int(depths.max()) + 1 if len(depths) else 0
+
+
+def clip_polygon(polygon, normal, distance):
+    """Part of a convex (K, 2) polygon on the front side of a line"""
+    if not len(polygon):
+        return polygon
+    side = polygon @ normal - distance
+    points = []
+    for i in range(len(polygon)):
+        j = (i + 1) % len(polygon)
+        if side[i] >= -EPSILON:
+            points.append(polygon[i])
+        if (side[i] > EPSILON and side[j] < -EPSILON) or (side[i] < -EPSILON and side[j] > EPSILON):
+            t = side[i] / (side[i] - side[j])
+            points.append(polygon[i] + (polygon[j] - polygon[i]) * t)
+    return np.array(points).reshape(-1, 2)
+
+
+def leaf_contents(region, solid):
+    """SOLID or EMPTY for a convex leaf region, from the wall mask at its centroid"""
+    if len(region) < 3:
+        return SOLID
+    x, z = np.floor(region.mean(axis=0)).astype(np.int64)
+    if not (0 <= x < solid.shape[0] and 0 <= z < solid.shape[1]):
+        return SOLID
+    return SOLID if solid[x, z] else EMPTY
+
+
+def _set_child(node, is_front, child):
+    normal, distance, front, back, first, count = node
+    if is_front:
+        front = child
+    else:
+        back = child
+    return normal, distance, front, back, first, count
+
+
+def build_bsp(voxels):
+    segments, normals = wall_segments(voxels)
+    return BspTree.build(segments, normals, voxels[:, 0, :] != 0)
+
+
+def load_bsp(voxels):
+    """BSP for a voxel grid, cached on disk keyed by the map contents"""
+    map_hash = hashlib.sha1(np.ascontiguousarray(voxels).tobytes()).hexdigest()
+    key = hash_strings(map_hash, voxels.shape, SPLIT_WEIGHT, MAX_CANDIDATES)
+    cache_path = get_cache_path("bsp", key, "npz")
+    if os.path.exists(cache_path):
+        return BspTree.load(cache_path)
+
+    tree = build_bsp(voxels)
+    tree.save(cache_path)
+    logger.log(f"Compiled BSP: {len(tree.nodes)} nodes, {len(tree.segments)} segments")
+    return tree
@@ -0,0 +1,140 @@
+"""
+Builds chunk meshes from the voxel map with NumPy. Only block faces that
+touch air are emitted. Each vertex carries its block's texture array layer,
+so one chunk of mixed block types is one vertex buffer and one draw call,
+and a baked ambient occlusion byte from the classic three-neighbour test.
+
+Voxel (x, y, z) covers [x, x+1] x [y, y+1] x [z, z+1] in world space, with y up.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 16  # blocks along x and z; chunks span the full map height
+VERTEX_DTYPE = np.dtype([
+    ("position", np.float32, 3),
+    ("normal", np.float32, 3),
+    ("uv", np.float32, 2),
+    ("layer", np.float32),
+    ("ao", np.uint8),          # normalised by the vertex attribute
+    ("padding", np.uint8, 3),  # keep the 40 byte stride 4-aligned
+])
+QUAD_INDICES = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+# Split along the other diagonal when it is brighter, so one dark corner stays in one triangle
+FLIPPED_QUAD_INDICES = np.array([1, 2, 3, 1, 3, 0], dtype=np.uint32)
+# Brightness for 0..3 unoccluded neighbours
+AO_LEVELS = np.round(np.array([0.35, 0.55, 0.8, 1.0]) * 255.0).astype(np.uint8)
+
+
+def voxel_grid(game_map):
+    """game_map[z][y][x] as an (X, Y, Z) array of block ids"""
+    return np.ascontiguousarray(np.asarray(game_map, dtype=np.int32).transpose(2, 1, 0))
+
+
+def _face_templates():
+    """(normal, corner offsets, uvs) per face, corners counter-clockwise seen from outside"""
+    # Texture u/v run along these axes for faces on each axis
+    tangents = {0: (2, 1), 1: (0, 2), 2: (0, 1)}
+    faces = []
+    for axis in range(3):
+        for sign in (-1, 1):
+            normal = np.zeros(3)
+            normal[axis] = sign
+            u_axis, v_axis = tangents[axis]
+            uvs = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32)
+            if np.dot(np.cross(np.eye(3)[u_axis], np.eye(3)[v_axis]), normal) < 0:
+                uvs = uvs[[0, 3, 2, 1]]
+            corners = np.zeros((4, 3), dtype=np.float32)
+            corners[:, axis] = 1.0 if sign > 0 else 0.0
+            corners[:, u_axis] = uvs[:, 0]
+            corners[:, v_axis] = uvs[:, 1]
+            # Which way each corner leans along the tangents, for the AO neighbours
+            offsets = np.zeros((4, 2, 3), dtype=np.int64)
+            offsets[np.arange(4), 0, u_axis] = uvs[:, 0] * 2 - 1
+            offsets[np.arange(4), 1, v_axis] = uvs[:, 1] * 2 - 1
+            faces.append((normal.astype(np.int64), corners, uvs, offsets))
+    return faces
+
+
+FACES = _face_templates()
+
+
+def chunk_bounds(shape, chunk_size=CHUNK_SIZE):
+    """Yield ((cx, cz), lo, hi) for every chunk of an (X, Y, Z) grid"""
+    size_x, size_y, size_z = shape
+    for x0 in range(0, size_x, chunk_size):
+        for z0 in range(0, size_z, chunk_size):
+            lo = (x0, 0, z0)
+            hi = (min(x0 + chunk_size, size_x), size_y, min(z0 + chunk_size, size_z))
+            yield (x0 // chunk_size, z0 // chunk_size), lo, hi
+
+
+def padded_region(voxels, lo, hi):
+    """voxels[lo:hi] with a one block border taken from the neighbours (air outside the map)"""
+    lo = np.asarray(lo)
+    hi = np.asarray(hi)
+    region = np.zeros(tuple(hi - lo + 2), dtype=voxels.dtype)
+    src_lo = np.maximum(lo - 1, 0)
+    src_hi = np.minimum(hi + 1, voxels.shape)
+    dst_lo = src_lo - (lo - 1)
+    dst_hi = dst_lo + (src_hi - src_lo)
+    region[tuple(slice(a, b) for a, b in zip(dst_lo, dst_hi))] = \
+        voxels[tuple(slice(a, b) for a, b in zip(src_lo, src_hi))]
+    return region
+
+
+def vertex_ao(solid, cells, normal, offsets):
+    """
+    AO level (0-3) of the four corners of each face: the two edge neighbours
+    and the diagonal neighbour in the layer in front of the face.
+    cells are (F, 3) indices into the padded solid array.
+    """
+    front = cells + normal
+    ao = np.empty((len(cells), 4), dtype=np.int64)
+    for corner in range(4):
+        side_u, side_v = offsets[corner]
+        s1 = solid[tuple((front + side_u).T)]
+        s2 = solid[tuple((front + side_v).T)]
+        diagonal = solid[tuple((front + side_u + side_v).T)]
+        # Two sides block the corner completely whatever the diagonal holds
+        ao[:, corner] = np.where(s1 & s2, 0, 3 - (s1.astype(np.int64) + s2 + diagonal))
+    return ao
+
+
+def mesh_region(voxels, layer_lookup, lo, hi):
+    """
+    Vertices (VERTEX_DTYPE) and uint32 indices for the visible faces of the
+    blocks in [lo, hi), in world space.
+    """
+    region = padded_region(voxels, lo, hi)
+    solid = region != 0
+    inner = (slice(1, -1),) * 3
+    blocks = region[inner]
+    vertex_parts = []
+    index_parts = []
+    vertex_count = 0
+    for normal, corners, uvs, offsets in FACES:
+        neighbour = tuple(slice(1 + d, solid.shape[i] - 1 + d) for i, d in enumerate(normal))
+        visible = solid[inner] & ~solid[neighbour]
+        coords = np.argwhere(visible)
+        if not len(coords):
+            continue
+        ids = np.minimum(blocks[visible], len(layer_lookup) - 1)
+        ao = vertex_ao(solid, coords + 1, normal, offsets)
+        count = len(coords)
+        vertices = np.zeros((count, 4), dtype=VERTEX_DTYPE)
+        vertices["position"] = (coords + lo)[:, None, :] + corners[None, :, :]
+        vertices["normal"] = normal
+        vertices["uv"] = uvs
+        vertices["layer"] = layer_lookup[ids][:, None]
+        vertices["ao"] = AO_LEVELS[ao]
+        vertex_parts.append(vertices.reshape(-1))
+
+        flip = ao[:, 0] + ao[:, 2] < ao[:, 1] + ao[:, 3]
+        pattern = np.where(flip[:, None], FLIPPED_QUAD_INDICES, QUAD_INDICES)
+        base = vertex_count + np.arange(count, dtype=np.uint32) * 4
+        index_parts.append((base[:, None] + pattern).reshape(-1))
+        vertex_count += count * 4
+
+    if not vertex_parts:
+        return np.zeros(0, dtype=VERTEX_DTYPE), np.zeros(0, dtype=np.uint32)
+    return np.concatenate(vertex_parts), np.concatenate(index_parts).astype(np.uint32)
@@ -0,0 +1,210 @@
+"""
+Potentially visible set (PVS) for the grid map, baked offline.
+
+Walkable floor cells are grouped into square clusters. For each cluster,
+rays are cast in every direction from sample points along its boundary (the
+portals every sight line leaving the cluster crosses) until they reach an
+opaque column. Every
+chunk a ray reaches is potentially visible from that cluster. The result is
+stored as one packed bitset per cluster and cached on disk by map contents,
+so at runtime the renderer only draws the chunks in the player's cluster's
+set.
+
+Visibility is 2D: a column blocks sight only if it is solid over the whole
+eye range. Sampling errors are made conservative by dilating the visible
+cells by one cell before they are reduced to chunks.
+"""
+
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from world.chunk_mesher import CHUNK_SIZE
+from utils.cache import get_cache_path, hash_strings
+from utils.logger import logger
+
+CLUSTER_SIZE = 4          # cells per cluster side
+PORTAL_SPACING = 0.5      # distance between ray origins along a cluster's boundary
+RAY_STEP = 0.25           # cells per marching step
+RAY_SPACING = 0.5         # largest gap between neighbouring rays at full range, in cells
+PARALLEL_CLUSTERS = 64    # bake in worker processes above this many clusters
+RAYS_PER_BATCH = 1 << 16
+
+
+def occupancy(voxels, eye_layers=None):
+    """(X, Z) walkable and opaque masks; eye_layers is the slice of y a viewer can see through"""
+    solid = voxels != 0
+    walkable = ~solid[:, 0, :]
+    eye = solid[:, eye_layers if eye_layers is not None else slice(None), :]
+    opaque = eye.all(axis=1)
+    return walkable, opaque
+
+
+def cluster_grid(shape, cluster_size=CLUSTER_SIZE):
+    """Number of clusters along x and z"""
+    return -(-shape[0] // cluster_size), -(-shape[1] // cluster_size)
+
+
+def chunk_grid(shape, chunk_size=CHUNK_SIZE):
+    return -(-shape[0] // chunk_size), -(-shape[1] // chunk_size)
+
+
+def portal_points(x0, z0, x1, z1):
+    """
+    Points every PORTAL_SPACING cells along the boundary of [x0, x1] x [z0, z1].
+    Any sight line from inside the cluster leaves through this boundary, so
+    rays cast from it cover every viewpoint in the cluster.
+    """
+    xs = np.linspace(x0, x1, int(round((x1 - x0) / PORTAL_SPACING)) + 1)
+    zs = np.linspace(z0, z1, int(round((z1 - z0) / PORTAL_SPACING)) + 1)
+    edges = [
+        np.stack([xs, np.full_like(xs, z0)], axis=1),
+        np.stack([xs, np.full_like(xs, z1)], axis=1),
+        np.stack([np.full_like(zs, x0), zs], axis=1),
+        np.stack([np.full_like(zs, x1), zs], axis=1),
+    ]
+    # Nudge inwards so every point lies in a cell of the cluster
+    points = np.concatenate(edges)
+    return np.unique(np.clip(points, [x0 + 1e-3, z0 + 1e-3], [x1 - 1e-3, z1 - 1e-3]), axis=0)
+
+
+def trace_visible_cells(opaque, origins):
+    """
+    March rays in every direction from each origin; returns an (X, Z) mask
+    of the cells they touch, including the opaque cells that stop them.
+    """
+    size_x, size_z = opaque.shape
+    # The farthest map corner from any origin bounds the ray length
+    corners = np.array([[0, 0], [size_x, 0], [0, size_z], [size_x, size_z]], dtype=np.float64)
+    max_distance = float(np.linalg.norm(origins[:, None, :] - corners[None], axis=2).max())
+    ray_count = max(8, int(math.ceil(2.0 * math.pi * max_distance / RAY_SPACING)))
+    angles = np.arange(ray_count) * (2.0 * math.pi / ray_count)
+    directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    steps = int(math.ceil(max_distance / RAY_STEP))
+
+    visible = np.zeros(opaque.shape, dtype=bool)
+    batch = max(1, RAYS_PER_BATCH // ray_count)
+    for start in range(0, len(origins), batch):
+        ray_origins = np.repeat(origins[start:start + batch], ray_count, axis=0)
+        ray_directions = np.tile(directions, (len(ray_origins) // ray_count, 1))
+        alive = np.ones(len(ray_origins), dtype=bool)
+        for step in range(steps + 1):
+            index = np.flatnonzero(alive)
+            if not len(index):
+                break
+            points = ray_origins[index] + ray_directions[index] * (step * RAY_STEP)
+            cells = np.floor(points).astype(np.int64)
+            inside = (cells[:, 0] >= 0) & (cells[:, 0] < size_x) & (cells[:, 1] >= 0) & (cells[:, 1] < size_z)
+            alive[index[~inside]] = False
+            index, cells = index[inside], cells[inside]
+            visible[cells[:, 0], cells[:, 1]] = True
+            alive[index[opaque[cells[:, 0], cells[:, 1]]]] = False
+    return visible
+
+
+def dilate(mask):
+    """Grow a 2D mask by one cell in all eight directions"""
+    padded = np.pad(mask, 1)
+    out = np.zeros_like(mask)
+    for dx in range(3):
+        for dz in range(3):
+            out |= padded[dx:dx + mask.shape[0], dz:dz + mask.shape[1]]
+    return out
+
+
+def cells_to_chunks(mask, chunk_size=CHUNK_SIZE):
+    """(chunks_x, chunks_z) mask of chunks containing any set cell"""
+    chunks_x, chunks_z = chunk_grid(mask.shape, chunk_size)
+    padded = np.zeros((chunks_x * chunk_size, chunks_z * chunk_size), dtype=bool)
+    padded[:mask.shape[0], :mask.shape[1]] = mask
+    return padded.reshape(chunks_x, chunk_size, chunks_z, chunk_size).any(axis=(1, 3))
+
+
+def bake_cluster(walkable, opaque, cluster, cluster_size=CLUSTER_SIZE, chunk_size=CHUNK_SIZE):
+    """Flat chunk visibility of one cluster (all False if it has no walkable cell)"""
+    cx, cz = cluster
+    region = np.zeros(walkable.shape, dtype=bool)
+    region[cx * cluster_size:(cx + 1) * cluster_size, cz * cluster_size:(cz + 1) * cluster_size] = True
+    if not (region & walkable).any():
+        return np.zeros(int(np.prod(chunk_grid(walkable.shape, chunk_size))), dtype=bool)
+    x1 = min((cx + 1) * cluster_size, walkable.shape[0])
+    z1 = min((cz + 1) * cluster_size, walkable.shape[1])
+    visible = trace_visible_cells(opaque, portal_points(cx * cluster_size, cz * cluster_size, x1, z1))
+    visible |= region
+    return cells_to_chunks(dilate(visible), chunk_size).reshape(-1)
+
+
+def _bake_clusters(walkable, opaque, clusters, cluster_size, chunk_size):
+    return [bake_cluster(walkable, opaque, c, cluster_size, chunk_size) for c in clusters]
+
+
+class PotentiallyVisibleSet:
+    """Packed per-cluster chunk bitsets with lookups by world position"""
+    def __init__(self, bits, map_shape, cluster_size=CLUSTER_SIZE, chunk_size=CHUNK_SIZE):
+        self.bits = bits  # (clusters_x * clusters_z, bytes) uint8 from np.packbits
+        self.map_shape = map_shape
+        self.cluster_size = cluster_size
+        self.chunk_size = chunk_size
+        self.clusters = cluster_grid(map_shape, cluster_size)
+        self.chunks = chunk_grid(map_shape, chunk_size)
+
+    def cluster_at(self, x, z):
+        """Cluster index of a world position, or None outside the map"""
+        cell_x, cell_z = int(math.floor(x)), int(math.floor(z))
+        if not (0 <= cell_x < self.map_shape[0] and 0 <= cell_z < self.map_shape[1]):
+            return None
+        return (cell_x // self.cluster_size) * self.clusters[1] + cell_z // self.cluster_size
+
+    def visible_mask(self, cluster):
+        count = self.chunks[0] * self.chunks[1]
+        return np.unpackbits(self.bits[cluster], count=count).astype(bool).reshape(self.chunks)
+
+    def visible_chunks(self, x, z):
+        """Set of (cx, cz) chunk keys visible from a world position; None means draw everything"""
+        cluster = self.cluster_at(x, z)
+        if cluster is None:
+            return None
+        mask = self.visible_mask(cluster)
+        if not mask.any():
+            # Inside a solid cluster (e.g. noclip): no useful answer
+            return None
+        return {(int(cx), int(cz)) for cx, cz in np.argwhere(mask)}
+
+
+def bake_pvs(voxels, cluster_size=CLUSTER_SIZE, chunk_size=CHUNK_SIZE, eye_layers=None):
+    """Bake the PVS of an (X, Y, Z) voxel grid; large maps use a process pool"""
+    walkable, opaque = occupancy(voxels, eye_layers)
+    clusters_x, clusters_z = cluster_grid(walkable.shape, cluster_size)
+    clusters = [(cx, cz) for cx in range(clusters_x) for cz in range(clusters_z)]
+    if len(clusters) > PARALLEL_CLUSTERS:
+        with ProcessPoolExecutor() as pool:
+            workers = os.cpu_count() or 1
+            groups = [clusters[i::workers] for i in range(workers)]
+            futures = [pool.submit(_bake_clusters, walkable, opaque, group, cluster_size, chunk_size)
+                       for group in groups]
+            results = {}
+            for group, future in zip(groups, futures):
+                results.update(zip(group, future.result()))
+        rows = [results[c] for c in clusters]
+    else:
+        rows = _bake_clusters(walkable, opaque, clusters, cluster_size, chunk_size)
+    bits = np.stack([np.packbits(row) for row in rows])
+    return PotentiallyVisibleSet(bits, walkable.shape, cluster_size, chunk_size)
+
+
+def load_pvs(voxels, cluster_size=CLUSTER_SIZE, chunk_size=CHUNK_SIZE, eye_layers=None):
+    """PVS for a voxel grid, cached on disk keyed by the map contents and bake parameters"""
+    map_hash = hashlib.sha1(np.ascontiguousarray(voxels).tobytes()).hexdigest()
+    key = hash_strings(map_hash, voxels.shape, cluster_size, chunk_size, eye_layers,
+                       PORTAL_SPACING, RAY_STEP, RAY_SPACING)
+    cache_path = get_cache_path("pvs", key, "npz")
+    shape = (voxels.shape[0], voxels.shape[2])
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return PotentiallyVisibleSet(data["bits"], shape, cluster_size, chunk_size)
+
+    pvs = bake_pvs(voxels, cluster_size, chunk_size, eye_layers)
+    np.savez_compressed(cache_path, bits=pvs.bits)
+    logger.log(f"Baked PVS for {pvs.bits.shape[0]} clusters")
+    return pvs